@@ -0,0 +1,112 @@
+"""
+Maintains counts derived from the issues (issues per year, events per
+author, ...) that can be updated one issue at a time. This lets merging
+a delta file (see DataLoader.apply_delta) adjust them by subtracting the
+old version of each changed issue and adding the new one, instead of
+recounting the whole dataset. The counts are stored in the cache so that
+later runs do not have to recount them either.
+"""
+
+from collections import Counter
+from datetime import timezone
+from typing import Dict, Iterable, List
+
+from model import Issue
+
+
+def _update(counter:Counter, key, sign:int):
+    """
+    Adds sign to the count of key, dropping keys whose count reaches zero.
+    """
+    counter[key] += sign
+    if counter[key] == 0:
+        del counter[key]
+
+
+class Aggregates:
+    """
+    Counts over all issues and events of the dataset.
+    """
+
+    # Fields of the issues that are counted (see DataLoader.iter_issues)
+    FIELDS:List[str] = ['created_date', 'state', 'events']
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        # Number of issues created in each year (UTC), without undated issues
+        self.issues_per_year:Counter = Counter()
+        # Number of issues in each state
+        self.issues_per_state:Counter = Counter()
+        # Number of events by each author, without events lacking an author
+        self.events_per_author:Counter = Counter()
+        # Number of events of each type
+        self.events_per_event_type:Counter = Counter()
+
+    @classmethod
+    def from_issues(cls, issues:Iterable[Issue]) -> 'Aggregates':
+        """
+        Counts over the given issues.
+        """
+        aggregates = cls()
+        for issue in issues:
+            aggregates.add(issue)
+        return aggregates
+
+    def add(self, issue:Issue, sign:int=1):
+        """
+        Adds the issue and its events to the counts.
+        """
+        if issue.created_date is not None:
+            created_date = issue.created_date
+            if created_date.tzinfo is not None:
+                created_date = created_date.astimezone(timezone.utc)
+            _update(self.issues_per_year, created_date.year, sign)
+        if issue.state is not None:
+            _update(self.issues_per_state, issue.state.value, sign)
+        for event in issue.events:
+            if event.author is not None:
+                _update(self.events_per_author, event.author, sign)
+            if event.event_type is not None:
+                _update(self.events_per_event_type, event.event_type, sign)
+
+    def merge(self, other:'Aggregates'):
+        """
+        Adds the counts of other, e.g., of another shard of the dataset
+        (see shards.py).
+        """
+        self.issues_per_year.update(other.issues_per_year)
+        self.issues_per_state.update(other.issues_per_state)
+        self.events_per_author.update(other.events_per_author)
+        self.events_per_event_type.update(other.events_per_event_type)
+
+    def remove(self, issue:Issue):
+        """
+        Removes the issue and its events from the counts, e.g., before
+        adding an updated version of it.
+        """
+        self.add(issue, sign=-1)
+
+    def to_json(self) -> Dict[str, Dict[str, int]]:
+        """
+        Converts the counts into a JSON-serializable dict.
+        """
+        return {
+            'issues_per_year': {str(year): count for year, count in self.issues_per_year.items()},
+            'issues_per_state': dict(self.issues_per_state),
+            'events_per_author': dict(self.events_per_author),
+            'events_per_event_type': dict(self.events_per_event_type),
+        }
+
+    @classmethod
+    def from_json(cls, jobj:Dict[str, Dict[str, int]]) -> 'Aggregates':
+        """
+        Restores the counts written by to_json().
+        """
+        aggregates = cls()
+        aggregates.issues_per_year = Counter({int(year): count for year, count in jobj['issues_per_year'].items()})
+        aggregates.issues_per_state = Counter(jobj['issues_per_state'])
+        aggregates.events_per_author = Counter(jobj['events_per_author'])
+        aggregates.events_per_event_type = Counter(jobj['events_per_event_type'])
+        return aggregates
@@ -0,0 +1,430 @@
+
+"""
+Benchmarks for the data loading and analysis code. This module is invoked
+from the command line with the benchmark to run, e.g.:
+
+    python benchmark.py memory
+    python benchmark.py load --workers 1,2,4,8
+    python benchmark.py startup
+    python benchmark.py suite --scales 10,100,1000 --results results.json
+    python benchmark.py topk --capacities 100,1000 --top 50
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+import config
+import synthetic
+import topk
+from data_loader import DataLoader, _iter_json_array
+from model import DATE_PARSER, Event
+from run import FEATURES, load_feature
+
+# Budget for the time spent importing modules when running `run.py --help`.
+# The startup benchmark fails (exit code 1) if it is exceeded.
+STARTUP_BUDGET_MS:float = 100.0
+
+
+class _DictEvent:
+    """
+    Replica of the original Event representation (per-instance __dict__,
+    no string interning) that serves as the baseline for the memory benchmark.
+    """
+
+    def __init__(self, jobj:any):
+        self.event_type:str = jobj.get('event_type')
+        self.author:str = jobj.get('author')
+        self.event_date = DATE_PARSER.parse(jobj.get('event_date'))
+        self.label:str = jobj.get('label')
+        self.comment:str = jobj.get('comment')
+
+
+def _load_raw_events(data_path:str, min_events:int) -> str:
+    """
+    Reads the raw events from the data file and returns them as JSON text,
+    repeated until there are at least min_events so that small data files
+    still give stable numbers.
+    """
+    with open(data_path, 'r') as fin:
+        events = [jevent for jissue in _iter_json_array(fin) for jevent in jissue.get('events', [])]
+    if not events:
+        raise ValueError(f'No events found in {data_path}')
+    repeats = -(-min_events // len(events))
+    return json.dumps(events * repeats)
+
+
+def _bytes_per_event(build:Callable[[dict], any], raw_events:str) -> float:
+    """
+    Measures the memory retained per event after decoding the raw events
+    and building them. Strings that are no longer referenced once the
+    decoded JSON is dropped (e.g., duplicates replaced by interned ones)
+    do not count towards the result.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        jevents = json.loads(raw_events)
+        events = [build(jevent) for jevent in jevents]
+        count = len(jevents)
+        del jevents
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del events
+    return retained / count
+
+
+def bench_memory(data_path:str, min_events:int):
+    """
+    Compares the bytes per event of the original and the current
+    Event representation.
+    """
+    raw_events = _load_raw_events(data_path, min_events)
+    baseline = _bytes_per_event(_DictEvent, raw_events)
+    current = _bytes_per_event(Event, raw_events)
+    print(f'Events measured:            {len(json.loads(raw_events))}')
+    print(f'Bytes/event (dict-based):   {baseline:,.1f}')
+    print(f'Bytes/event (slots+intern): {current:,.1f}')
+    print(f'Reduction:                  {100 * (1 - current / baseline):.1f}%')
+
+
+def bench_load(data_path:str, worker_counts:List[int]):
+    """
+    Measures how the time to parse the data file (bypassing the cache)
+    scales with the number of worker processes. Besides the wall time, the
+    CPU time of the main process is reported: it has to materialize every
+    issue, so it bounds the achievable speedup on hosts with enough cores.
+    """
+    results = []
+    for workers in worker_counts:
+        loader = DataLoader()
+        loader.data_path = data_path
+        loader.use_cache = False
+        loader.workers = workers
+        wall, cpu = time.perf_counter(), time.process_time()
+        issues = loader._load()
+        results.append((workers, time.perf_counter() - wall, time.process_time() - cpu))
+    print(f'Issues loaded: {len(issues)}')
+    print(f"{'Workers':>7} | {'Wall (s)':>8} | {'Main CPU (s)':>12} | {'Speedup':>7}")
+    print('-' * 45)
+    baseline = results[0][1]
+    for workers, wall, cpu in results:
+        print(f'{workers:>7} | {wall:>8.2f} | {cpu:>12.2f} | {baseline / wall:>6.2f}x')
+
+
+def _import_times(args:List[str]) -> List[Tuple[str, int, int]]:
+    """
+    Runs python -X importtime with the given arguments and returns the
+    (module, self time, cumulative time) in microseconds of every top-level
+    import, i.e., those not triggered by another import.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True)
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if not module.startswith('  '):
+            times.append((module.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def bench_startup(budget_ms:float, top:int) -> bool:
+    """
+    Measures the import time of `run.py --help` against the budget and
+    lists the slowest imports, followed by the import time of each
+    analysis module. Returns whether the budget is met.
+    """
+    times = _import_times(['run.py', '--help'])
+    total_ms = sum(cumulative for _, _, cumulative in times) / 1000
+    print(f'Import time of run.py --help: {total_ms:.1f} ms (budget {budget_ms:.1f} ms)')
+    print(f"\n{'Module':<30} | {'Cumulative (ms)':>15}")
+    print('-' * 48)
+    for module, _, cumulative in sorted(times, key=lambda t: -t[2])[:top]:
+        print(f'{module:<30} | {cumulative / 1000:>15.1f}')
+
+    print(f"\n{'Feature':>7} | {'Module':<20} | {'Import (ms)':>11}")
+    print('-' * 44)
+    for feature, (module, _) in sorted(FEATURES.items()):
+        feature_ms = sum(cumulative for _, _, cumulative in _import_times(['-c', f'import {module}'])) / 1000
+        print(f'{feature:>7} | {module:<20} | {feature_ms:>11.1f}')
+
+    within_budget = total_ms <= budget_ms
+    print(f"\nStartup budget {'met' if within_budget else 'EXCEEDED'}.")
+    return within_budget
+
+
+def bench_topk(data_path:str, capacities:List[int], k:int):
+    """
+    Validates the approximate (Space-Saving) top k authors of events against
+    the exact counts: the share of the true top k found, the largest actual
+    overestimation against the reported bound, and the number of counts
+    outside their reported bounds (which must be zero).
+    """
+    config.set_parameter('ENPM611_PROJECT_DATA_PATH', data_path)
+    start = time.perf_counter()
+    exact = Counter(event.author for issue in DataLoader().iter_issues()
+                    for event in issue.events if event.author is not None)
+    exact_s = time.perf_counter() - start
+    true_top = {hitter.item for hitter in topk.exact_top(exact, k)}
+    print(f'Events: {sum(exact.values())}, authors: {len(exact)}, exact counting: {exact_s:.2f}s')
+    print(f"{'Capacity':>8} | {'Time (s)':>8} | {'Recall':>6} | {'Max error':>9} | {'Bound':>5} "
+          f"| {'Guaranteed':>10} | {'Violations':>10}")
+    print('-' * 78)
+    for capacity in capacities:
+        start = time.perf_counter()
+        summary = topk.event_authors(capacity)
+        elapsed = time.perf_counter() - start
+        top = summary.top(k)
+        recall = len(true_top & {hitter.item for hitter in top}) / max(len(true_top), 1)
+        max_error = max((hitter.count - exact[hitter.item] for hitter in top), default=0)
+        violations = sum(1 for hitter in top
+                         if not hitter.count - hitter.error <= exact[hitter.item] <= hitter.count
+                         or (hitter.guaranteed and hitter.item not in true_top))
+        guaranteed = sum(1 for hitter in top if hitter.guaranteed)
+        print(f'{capacity:>8} | {elapsed:>8.2f} | {recall:>6.0%} | {max_error:>9} | {summary.max_error:>5} '
+              f'| {guaranteed:>10} | {violations:>10}')
+
+
+def _peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of the current process in MB,
+    or None on platforms without the resource module.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def measure(data_path:str, feature:int=None) -> Dict[str, float]:
+    """
+    Loads the issues of the data file or, if a feature is given, builds the
+    frames the features use and runs the feature in headless mode with its
+    console output discarded. Meant to run in a fresh process (see
+    _measure_in_subprocess) so that the peak RSS belongs to this measurement.
+    """
+    config.set_parameter('ENPM611_PROJECT_DATA_PATH', data_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader = DataLoader()
+        if feature is None:
+            start = time.perf_counter()
+            issues = loader.get_issues()
+            result = {'load_s': time.perf_counter() - start, 'issues': len(issues),
+                      'events': sum(len(issue.events) for issue in issues)}
+        else:
+            analysis = load_feature(feature)
+            with tempfile.TemporaryDirectory() as output_path:
+                config.set_parameter('output', output_path)
+                # Build the frames and indexes up front, through the same loader path as the
+                # features, so only the analysis itself is timed and the peak RSS does not
+                # include materializing every issue
+                start = time.perf_counter()
+                index = loader.get_index()
+                result = {'index_s': time.perf_counter() - start, 'issues': len(index.issues_df),
+                          'events': len(index.events_df)}
+                start = time.perf_counter()
+                analysis().run()
+                result['analysis_s'] = time.perf_counter() - start
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def _measure_in_subprocess(data_path:str, feature:int=None, use_cache:bool=True) -> Dict[str, float]:
+    """
+    Runs measure() in a new interpreter and returns its results.
+    """
+    command = [sys.executable, os.path.abspath(__file__), 'measure', '--data', data_path]
+    if feature is not None:
+        command += ['--feature', str(feature)]
+    env = dict(os.environ, ENPM611_PROJECT_CACHE=json.dumps(use_cache), MPLBACKEND='Agg')
+    proc = subprocess.run(command, capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(f'Measuring {data_path} (feature {feature}) failed:\n{proc.stderr}')
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def _git_commit() -> str:
+    """
+    Returns the commit the benchmarks run on, or None outside of a git checkout.
+    """
+    try:
+        proc = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def bench_suite(base:int, scales:List[int], seed:int, dump_dir:str, features:List[int]) -> dict:
+    """
+    Generates synthetic data files with base * scale issues and measures,
+    each in a fresh process, the time and peak RSS of parsing the file
+    (no cache), of the first load (parsing and writing the cache), of a
+    cached load and of running each feature. Generated files are reused
+    across runs since they only depend on their size and seed.
+    """
+    os.makedirs(dump_dir, exist_ok=True)
+    runs = []
+    for scale in scales:
+        count = base * scale
+        data_path = os.path.join(dump_dir, f'synthetic_{count}_seed{seed}.json')
+        if not os.path.exists(data_path):
+            print(f'Generating {count} issues into {data_path}')
+            synthetic.write_dump(data_path, count, seed)
+        for derived_path in (data_path + '.cache.npz', data_path + '.store'):
+            if os.path.exists(derived_path):
+                os.remove(derived_path)
+
+        print(f'Measuring {scale}x ({count} issues)')
+        parse = _measure_in_subprocess(data_path, use_cache=False)
+        cold = _measure_in_subprocess(data_path)
+        warm = _measure_in_subprocess(data_path)
+        run = {
+            'scale': scale,
+            'issues': parse['issues'],
+            'events': parse['events'],
+            'file_mb': os.path.getsize(data_path) / (1 << 20),
+            'parse': parse,
+            'cold_load': cold,
+            'cached_load': warm,
+            'features': {str(feature): _measure_in_subprocess(data_path, feature) for feature in features},
+        }
+        runs.append(run)
+        _print_run(run)
+    return {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'base': base,
+        'seed': seed,
+        'runs': runs,
+    }
+
+
+def _print_run(run:dict):
+    """
+    Prints the results of one scale of the benchmark suite.
+    """
+    def rss(result:dict) -> str:
+        return 'n/a' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.0f}"
+
+    print(f"{run['issues']} issues, {run['events']} events, {run['file_mb']:.1f} MB")
+    print(f"{'Step':<14} | {'Time (s)':>8} | {'Peak RSS (MB)':>13}")
+    print('-' * 41)
+    for step in ('parse', 'cold_load', 'cached_load'):
+        print(f"{step:<14} | {run[step]['load_s']:>8.2f} | {rss(run[step]):>13}")
+    for feature, result in run['features'].items():
+        print(f"{'feature ' + feature:<14} | {result['analysis_s']:>8.2f} | {rss(result):>13}")
+    print()
+
+
+def compare_results(previous:dict, current:dict):
+    """
+    Prints the relative change of every time and peak RSS between two
+    results of the benchmark suite, matching runs by their scale.
+    """
+    print(f"Comparing {current.get('commit')} against {previous.get('commit')}")
+    print(f"{'Scale':>6} | {'Metric':<28} | {'Before':>9} | {'After':>9} | {'Change':>8}")
+    print('-' * 72)
+    previous_runs = {run['scale']: run for run in previous['runs']}
+    for run in current['runs']:
+        before_run = previous_runs.get(run['scale'])
+        if before_run is None:
+            continue
+        metrics = [(f'{step}.{key}', run[step], before_run[step])
+                   for step in ('parse', 'cold_load', 'cached_load') for key in ('load_s', 'peak_rss_mb')]
+        metrics += [(f'feature {feature}.{key}', result, before_run['features'][feature])
+                    for feature, result in run['features'].items() if feature in before_run['features']
+                    for key in ('analysis_s', 'peak_rss_mb')]
+        for name, after, before in metrics:
+            key = name.rsplit('.', 1)[1]
+            if after.get(key) is None or not before.get(key):
+                continue
+            change = 100 * (after[key] / before[key] - 1)
+            print(f"{run['scale']:>5}x | {name:<28} | {before[key]:>9.2f} | {after[key]:>9.2f} | {change:>+7.1f}%")
+
+
+def parse_args():
+    """
+    Parses the command line arguments selecting the benchmark to run.
+    """
+    ap = argparse.ArgumentParser("benchmark.py")
+    ap.add_argument('benchmark', choices=['memory', 'load', 'startup', 'suite', 'topk', 'measure'],
+                    help='Which benchmark to run')
+    ap.add_argument('--data', '-d', type=str, required=False,
+                    help='Data file to use instead of ENPM611_PROJECT_DATA_PATH')
+    ap.add_argument('--events', type=int, default=100000,
+                    help='Minimum number of events to build for the memory benchmark')
+    ap.add_argument('--workers', '-w', type=str, default='1,2,4',
+                    help='Comma-separated worker counts for the load benchmark')
+    ap.add_argument('--budget', type=float, default=STARTUP_BUDGET_MS,
+                    help='Import time budget in milliseconds for the startup benchmark')
+    ap.add_argument('--scales', type=str, default='10,100,1000',
+                    help='Comma-separated multiples of --base issues to generate for the suite')
+    ap.add_argument('--base', type=int, required=False,
+                    help='Number of issues at scale 1 (default: the number of issues in the data file)')
+    ap.add_argument('--seed', type=int, default=0,
+                    help='Seed of the synthetic data files')
+    ap.add_argument('--dump-dir', type=str, default=os.path.join(tempfile.gettempdir(), 'enpm611_synthetic'),
+                    help='Directory the synthetic data files are written to')
+    ap.add_argument('--features', type=str, default=','.join(str(f) for f in sorted(FEATURES)),
+                    help='Comma-separated features to time in the suite')
+    ap.add_argument('--results', type=str, default='benchmark_results.json',
+                    help='File the results of the suite are written to as JSON')
+    ap.add_argument('--compare', type=str, required=False,
+                    help='Results of an earlier suite run to compare against')
+    ap.add_argument('--capacities', type=str, default='100,1000,10000',
+                    help='Comma-separated numbers of counters for the topk benchmark')
+    ap.add_argument('--top', type=int, default=50,
+                    help='Number of top authors compared by the topk benchmark')
+    ap.add_argument('--feature', type=int, required=False,
+                    help=argparse.SUPPRESS)
+    return ap.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    data_path = args.data or DataLoader().data_path
+    if args.benchmark == 'memory':
+        bench_memory(data_path, args.events)
+    elif args.benchmark == 'load':
+        bench_load(data_path, [int(w) for w in args.workers.split(',')])
+    elif args.benchmark == 'startup':
+        if not bench_startup(args.budget, top=10):
+            sys.exit(1)
+    elif args.benchmark == 'topk':
+        bench_topk(data_path, [int(c) for c in args.capacities.split(',')], args.top)
+    elif args.benchmark == 'measure':
+        print(json.dumps(measure(data_path, args.feature)))
+    elif args.benchmark == 'suite':
+        if args.base is None:
+            with open(data_path, 'r') as fin:
+                args.base = sum(1 for _ in _iter_json_array(fin))
+        results = bench_suite(args.base, [int(s) for s in args.scales.split(',')], args.seed,
+                              args.dump_dir, [int(f) for f in args.features.split(',')])
+        with open(args.results, 'w') as fout:
+            json.dump(results, fout, indent=2)
+        print(f'Wrote results to {args.results}')
+        if args.compare:
+            with open(args.compare, 'r') as fin:
+                compare_results(json.load(fin), results)
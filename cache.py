@@ -0,0 +1,853 @@
+"""
+Implements an on-disk cache of the parsed issues so that repeated runs
+do not have to re-read and re-parse the JSON data file.
+
+The cache is a NumPy .npz archive stored next to the data file. Issues and
+events are stored column by column: text as UTF-8 blobs with offsets,
+repeated values (authors, event types, labels, ...) as dictionary codes and
+timestamps as microseconds since the epoch. The archive records the path,
+size and modification time of the data file it was built from and is
+ignored (and rebuilt) as soon as any of them change. It also records the
+delta files merged into it (see DataLoader.apply_delta) and the counts
+maintained by aggregates.py.
+
+Since every field is a separate set of columns, issues iterated with
+declared fields (see model.LazyIssue) only read and decode the columns of
+those fields. The other fields are decoded one issue at a time on access.
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import struct
+import zipfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+import profiling
+from model import Event, Issue, LazyEvent, LazyIssue, State, event_fields
+from predicates import IssuePredicate, as_utc
+
+# Bump whenever the layout of the archive changes
+_CACHE_VERSION:int = 1
+
+_CACHE_SUFFIX:str = '.cache.npz'
+
+# Sentinels for missing timestamps and for timestamps without a timezone
+_NO_DATE:int = np.iinfo(np.int64).min
+_NO_TZ:int = np.iinfo(np.int32).min
+
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+def get_cache_path(data_path:str) -> str:
+    """
+    Returns the location of the cache for the given data file.
+    """
+    return data_path + _CACHE_SUFFIX
+
+
+def _fingerprint(data_path:str) -> Dict[str, any]:
+    """
+    Identifies the current version of the data file.
+    """
+    stat = os.stat(data_path)
+    return {
+        'version': _CACHE_VERSION,
+        'path': os.path.abspath(data_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+### ENCODING
+
+def _encode_strings(columns:Dict[str, np.ndarray], name:str, values:List[str]):
+    """
+    Stores arbitrary (possibly missing) strings as one UTF-8 blob with offsets.
+    """
+    encoded = [b'' if v is None else v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in encoded], out=offsets[1:])
+    columns[f'{name}.data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    columns[f'{name}.offsets'] = offsets
+    columns[f'{name}.null'] = np.array([v is None for v in values], dtype=bool)
+
+
+def _encode_categories(columns:Dict[str, np.ndarray], name:str, values:List[str]):
+    """
+    Stores frequently repeated strings as codes into a list of unique values.
+    Missing values are stored as -1.
+    """
+    uniques:Dict[str, int] = {}
+    codes = np.array([-1 if v is None else uniques.setdefault(v, len(uniques)) for v in values],
+                     dtype=np.int32)
+    columns[f'{name}.codes'] = codes
+    _encode_strings(columns, f'{name}.values', list(uniques))
+
+
+def _encode_dates(columns:Dict[str, np.ndarray], name:str, values:List[datetime]):
+    """
+    Stores timestamps as microseconds since the epoch plus their UTC offset.
+    """
+    micros = np.full(len(values), _NO_DATE, dtype=np.int64)
+    offsets = np.full(len(values), _NO_TZ, dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        utcoffset = value.utcoffset()
+        if utcoffset is None:
+            micros[i] = (value - _EPOCH_NAIVE) // _ONE_US
+        else:
+            micros[i] = (value - _EPOCH_UTC) // _ONE_US
+            offsets[i] = int(utcoffset.total_seconds())
+    columns[f'{name}.micros'] = micros
+    columns[f'{name}.tz'] = offsets
+
+
+def _encode_lists(columns:Dict[str, np.ndarray], name:str, values:List[List[str]]):
+    """
+    Stores lists of strings (labels, assignees) as one flat categorical
+    column plus the offsets of each list.
+    """
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    columns[f'{name}.offsets'] = offsets
+    _encode_categories(columns, f'{name}.items', [item for v in values for item in v])
+
+
+class IssueColumns:
+    """
+    Collects the values of the issues column by column in a single pass, so
+    that the cache can be written from a stream of issues (e.g., the one
+    building the frames) without keeping the Issue and Event objects.
+    """
+
+    def __init__(self, issues:Iterable[Issue]=()):
+        """
+        Constructor. Collects the given issues, if any.
+        """
+        self.issues:Dict[str, list] = {name: [] for name in ('url', 'creator', 'labels', 'state', 'assignees',
+                                                             'title', 'text', 'number', 'created_date',
+                                                             'updated_date', 'timeline_url', 'event_count')}
+        self.events:Dict[str, list] = {name: [] for name in ('event_type', 'author', 'event_date',
+                                                             'label', 'comment')}
+        for issue in issues:
+            self.add(issue)
+
+    def add(self, issue:Issue):
+        """
+        Appends the values of an issue and its events.
+        """
+        values = self.issues
+        values['url'].append(issue.url)
+        values['creator'].append(issue.creator)
+        values['labels'].append(issue.labels)
+        values['state'].append(None if issue.state is None else issue.state.value)
+        values['assignees'].append(issue.assignees)
+        values['title'].append(issue.title)
+        values['text'].append(issue.text)
+        values['number'].append(issue.number)
+        values['created_date'].append(issue.created_date)
+        values['updated_date'].append(issue.updated_date)
+        values['timeline_url'].append(issue.timeline_url)
+        values['event_count'].append(len(issue.events))
+        values = self.events
+        for event in issue.events:
+            values['event_type'].append(event.event_type)
+            values['author'].append(event.author)
+            values['event_date'].append(event.event_date)
+            values['label'].append(event.label)
+            values['comment'].append(event.comment)
+
+    def encode(self) -> Dict[str, np.ndarray]:
+        """
+        Converts the collected values into the columns stored in the archive.
+        """
+        issues, events = self.issues, self.events
+        columns:Dict[str, np.ndarray] = {}
+        _encode_strings(columns, 'issue.url', issues['url'])
+        _encode_categories(columns, 'issue.creator', issues['creator'])
+        _encode_lists(columns, 'issue.labels', issues['labels'])
+        _encode_categories(columns, 'issue.state', issues['state'])
+        _encode_lists(columns, 'issue.assignees', issues['assignees'])
+        _encode_strings(columns, 'issue.title', issues['title'])
+        _encode_strings(columns, 'issue.text', issues['text'])
+        columns['issue.number'] = np.array(issues['number'], dtype=np.int64)
+        _encode_dates(columns, 'issue.created_date', issues['created_date'])
+        _encode_dates(columns, 'issue.updated_date', issues['updated_date'])
+        _encode_strings(columns, 'issue.timeline_url', issues['timeline_url'])
+
+        event_offsets = np.zeros(len(issues['event_count']) + 1, dtype=np.int64)
+        np.cumsum(issues['event_count'], out=event_offsets[1:])
+        columns['issue.event_offsets'] = event_offsets
+        _encode_categories(columns, 'event.event_type', events['event_type'])
+        _encode_categories(columns, 'event.author', events['author'])
+        _encode_dates(columns, 'event.event_date', events['event_date'])
+        _encode_categories(columns, 'event.label', events['label'])
+        _encode_strings(columns, 'event.comment', events['comment'])
+        return columns
+
+
+### DECODING
+
+# Number of issues decoded at a time when iterating over the archive
+_BLOCK_SIZE:int = 1024
+
+
+def _next(rows):
+    """
+    Returns the rows following each of the rows, which are either a
+    slice or an array of row positions.
+    """
+    return slice(rows.start + 1, rows.stop + 1) if isinstance(rows, slice) else rows + 1
+
+
+def _ranges(starts:np.ndarray, ends:np.ndarray):
+    """
+    Returns the rows of the ranges [starts[i], ends[i]) one after the
+    other, as a slice if the ranges are adjacent.
+    """
+    if len(starts) == 0:
+        return slice(0, 0)
+    if (starts[1:] == ends[:-1]).all():
+        return slice(int(starts[0]), int(ends[-1]))
+    lengths = ends - starts
+    return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+
+
+def _row_numbers(rows) -> List[int]:
+    return list(range(rows.start, rows.stop)) if isinstance(rows, slice) else rows.tolist()
+
+
+class _Column(ABC):
+    """
+    Decodes the values of a column at given rows (see take).
+    """
+
+    @abstractmethod
+    def take(self, rows) -> list:
+        """
+        Decodes the values at the rows, a slice or an array of row positions.
+        """
+
+    def block(self, start:int, stop:int) -> list:
+        return self.take(slice(start, stop))
+
+
+class _StringColumn(_Column):
+    """
+    Decodes a column stored by _encode_strings.
+    """
+
+    def __init__(self, archive, name:str):
+        data = archive[f'{name}.data']
+        # Mapped blobs (see _MappedArchive) are sliced in place so that only the rows read are paged in
+        self.data = memoryview(data) if isinstance(data, np.memmap) else data.tobytes()
+        self.offsets:np.ndarray = archive[f'{name}.offsets']
+        self.null:np.ndarray = archive[f'{name}.null']
+
+    def __len__(self) -> int:
+        return len(self.null)
+
+    def take(self, rows) -> List[str]:
+        data = self.data
+        values = zip(self.offsets[rows].tolist(), self.offsets[_next(rows)].tolist(), self.null[rows].tolist())
+        if isinstance(data, bytes):
+            return [None if null else data[start:end].decode('utf-8') for start, end, null in values]
+        return [None if null else str(data[start:end], 'utf-8') for start, end, null in values]
+
+
+class _CategoryColumn(_Column):
+    """
+    Decodes a column stored by _encode_categories.
+    """
+
+    def __init__(self, archive, name:str):
+        values = _StringColumn(archive, f'{name}.values')
+        # The trailing None is picked by the -1 code of missing values
+        self.values:List[str] = values.block(0, len(values)) + [None]
+        self.codes:np.ndarray = archive[f'{name}.codes']
+
+    def take(self, rows) -> List[str]:
+        values = self.values
+        return [values[code] for code in self.codes[rows].tolist()]
+
+
+class _DateColumn(_Column):
+    """
+    Decodes a column stored by _encode_dates.
+    """
+
+    def __init__(self, archive, name:str):
+        self.micros:np.ndarray = archive[f'{name}.micros']
+        self.tz:np.ndarray = archive[f'{name}.tz']
+        self.epochs:Dict[int, datetime] = {_NO_TZ: _EPOCH_NAIVE}
+
+    def _epoch(self, tz:int) -> datetime:
+        epoch = self.epochs.get(tz)
+        if epoch is None:
+            epoch = _EPOCH_UTC.astimezone(timezone(timedelta(seconds=tz)))
+            self.epochs[tz] = epoch
+        return epoch
+
+    def take(self, rows) -> List[datetime]:
+        micros = self.micros[rows].tolist()
+        tzs = self.tz[rows]
+        if len(tzs) > 0 and (tzs == tzs[0]).all():
+            # Common case of a single timezone for the whole block
+            epoch = self._epoch(int(tzs[0]))
+            return [None if m == _NO_DATE else epoch + timedelta(microseconds=m) for m in micros]
+        return [None if m == _NO_DATE else self._epoch(tz) + timedelta(microseconds=m)
+                for m, tz in zip(micros, tzs.tolist())]
+
+
+class _ListColumn(_Column):
+    """
+    Decodes a column stored by _encode_lists.
+    """
+
+    def __init__(self, archive, name:str):
+        self.offsets:np.ndarray = archive[f'{name}.offsets']
+        self.items = _CategoryColumn(archive, f'{name}.items')
+
+    def take(self, rows) -> List[List[str]]:
+        starts, ends = self.offsets[rows], self.offsets[_next(rows)]
+        items = self.items.take(_ranges(starts, ends))
+        bounds = [0] + np.cumsum(ends - starts).tolist()
+        return [items[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+
+class _ArrayColumn(_Column):
+    """
+    Decodes a column stored as a plain array.
+    """
+
+    def __init__(self, archive, name:str):
+        self.values:np.ndarray = archive[name]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def take(self, rows) -> List[int]:
+        return self.values[rows].tolist()
+
+
+class _StateColumn(_CategoryColumn):
+    """
+    Decodes the state column into States.
+    """
+
+    def __init__(self, archive, name:str):
+        super().__init__(archive, name)
+        self.values = [None if value is None else State(value) for value in self.values]
+
+
+# Decoder of each column of the archive, by field
+_COLUMNS:Dict[str, type] = {
+    'issue.url': _StringColumn,
+    'issue.creator': _CategoryColumn,
+    'issue.labels': _ListColumn,
+    'issue.state': _StateColumn,
+    'issue.assignees': _ListColumn,
+    'issue.title': _StringColumn,
+    'issue.text': _StringColumn,
+    'issue.number': _ArrayColumn,
+    'issue.created_date': _DateColumn,
+    'issue.updated_date': _DateColumn,
+    'issue.timeline_url': _StringColumn,
+    'issue.event_offsets': _ArrayColumn,
+    'event.event_type': _CategoryColumn,
+    'event.author': _CategoryColumn,
+    'event.event_date': _DateColumn,
+    'event.label': _CategoryColumn,
+    'event.comment': _StringColumn,
+}
+
+
+def _archive_deltas(archive) -> List[Dict[str, any]]:
+    """
+    Returns the fingerprints of the delta files merged into the archive.
+    """
+    if 'deltas' not in archive.files:
+        return []
+    return json.loads(archive['deltas'].tobytes().decode('utf-8'))
+
+
+class _MappedArchive:
+    """
+    Maps the arrays of an archive written by np.savez (whose members are
+    stored uncompressed) from the file instead of reading them, so that
+    decoding a few rows only pages in those rows. Behaves like the NpzFile
+    returned by np.load.
+    """
+
+    def __init__(self, cache_path:str):
+        self.cache_path:str = cache_path
+        self._zip = zipfile.ZipFile(cache_path)
+        self.files:List[str] = [name[:-len('.npy')] for name in self._zip.namelist()]
+
+    def __getitem__(self, name:str) -> np.ndarray:
+        info = self._zip.getinfo(f'{name}.npy')
+        if info.compress_type != zipfile.ZIP_STORED:
+            with self._zip.open(info) as fin:
+                return np.lib.format.read_array(fin)
+        with open(self.cache_path, 'rb') as fin:
+            # The member data follows its local header, which has a name and extra field of its own
+            fin.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', fin.read(4))
+            fin.seek(name_length + extra_length, os.SEEK_CUR)
+            version = np.lib.format.read_magic(fin)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran_order, dtype = read_header(fin)
+            offset = fin.tell()
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.cache_path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self) -> '_MappedArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _ArchiveSource:
+    """
+    Decodes the fields of lazy issues and events (see model.LazyIssue)
+    from the cache of a data file, their keys being their positions in
+    the archive. Columns first used by an access to a single issue are
+    mapped rather than read (see _MappedArchive), so only that issue's
+    rows are paged in.
+    """
+
+    def __init__(self, data_path:str, fields:FrozenSet[str], deltas:List[Dict[str, any]]):
+        """
+        Constructor. fields are the declared fields and deltas the delta
+        files merged into the archive the issues were read from.
+        """
+        self.data_path:str = data_path
+        self.event_fields = event_fields(fields)
+        self.deltas:List[Dict[str, any]] = deltas
+        self._columns:Dict[str, any] = {}
+
+    def __getstate__(self):
+        # Columns are read again rather than copied between processes
+        return {'data_path': self.data_path, 'event_fields': self.event_fields,
+                'deltas': self.deltas, '_columns': {}}
+
+    def column(self, name:str, archive=None):
+        """
+        Returns the decoder of a column, reading it from the archive, which
+        is reopened if not given.
+        """
+        column = self._columns.get(name)
+        if column is not None:
+            return column
+        if archive is None:
+            archive = _open_archive(self.data_path, mapped=True)
+            # Positions only stay valid as long as no delta is merged
+            if archive is None or _archive_deltas(archive) != self.deltas:
+                if archive is not None:
+                    archive.close()
+                raise RuntimeError(f'The cache of {self.data_path} changed while its issues were in use')
+            with archive:
+                column = _COLUMNS[name](archive, name)
+        else:
+            column = _COLUMNS[name](archive, name)
+        self._columns[name] = column
+        return column
+
+    def events(self, rows) -> List[LazyEvent]:
+        """
+        Creates the events at the rows (a slice or an array of rows),
+        decoding their declared attributes right away.
+        """
+        values = [self.column(f'event.{name}').take(rows) for name in self.event_fields]
+        events = []
+        for k, row in enumerate(_row_numbers(rows)):
+            event = LazyEvent.from_source(self, row)
+            for name, column_values in zip(self.event_fields, values):
+                setattr(event, name, column_values[k])
+            events.append(event)
+        return events
+
+    def issue_field(self, position:int, name:str) -> any:
+        if name == 'events':
+            first, last = self.column('issue.event_offsets').block(position, position + 2)
+            return self.events(slice(first, last))
+        return self.column(f'issue.{name}').block(position, position + 1)[0]
+
+    def event_field(self, row:int, name:str) -> any:
+        return self.column(f'event.{name}').block(row, row + 1)[0]
+
+
+def _iter_blocks(count:int, positions:np.ndarray=None) -> Iterator[any]:
+    """
+    Splits the issues at the positions (all count issues if None) into
+    blocks of rows to decode together.
+    """
+    if positions is None:
+        for start in range(0, count, _BLOCK_SIZE):
+            yield slice(start, min(start + _BLOCK_SIZE, count))
+    else:
+        for start in range(0, len(positions), _BLOCK_SIZE):
+            yield positions[start:start + _BLOCK_SIZE]
+
+
+def _event_rows(event_offsets:np.ndarray, rows) -> Tuple[any, List[int]]:
+    """
+    Returns the rows of the events of the issues at the rows, and the
+    bounds of the events of each issue among them.
+    """
+    starts, ends = event_offsets[rows], event_offsets[_next(rows)]
+    return _ranges(starts, ends), [0] + np.cumsum(ends - starts).tolist()
+
+
+def _iter_lazy_issues(archive, data_path:str, fields:FrozenSet[str],
+                      positions:np.ndarray=None) -> Iterator[LazyIssue]:
+    """
+    Creates lazy issues from the archive one at a time, decoding the
+    declared fields in blocks of issues like _iter_decoded_issues.
+    """
+    source = _ArchiveSource(data_path, fields, _archive_deltas(archive))
+    names = [name for name in Issue.__slots__ if name in fields and name != 'events']
+    columns = [source.column(f'issue.{name}', archive) for name in names]
+    event_offsets = source.column('issue.event_offsets', archive).values
+    for name in source.event_fields if 'events' in fields else []:
+        source.column(f'event.{name}', archive)
+
+    for rows in _iter_blocks(len(event_offsets) - 1, positions):
+        values = [column.take(rows) for column in columns]
+        if 'events' in fields:
+            event_rows, bounds = _event_rows(event_offsets, rows)
+            events = source.events(event_rows)
+        for k, position in enumerate(_row_numbers(rows)):
+            issue = LazyIssue.from_source(source, position)
+            for name, column_values in zip(names, values):
+                setattr(issue, name, column_values[k])
+            if 'events' in fields:
+                issue.events = events[bounds[k]:bounds[k + 1]]
+            yield issue
+
+
+def _iter_decoded_issues(archive, positions:np.ndarray=None) -> Iterator[Issue]:
+    """
+    Rebuilds the issues (at the positions, all issues if None) from the
+    columns of the archive one at a time. Columns are decoded in blocks
+    of issues to keep memory bounded.
+    """
+    url = _StringColumn(archive, 'issue.url')
+    creator = _CategoryColumn(archive, 'issue.creator')
+    labels = _ListColumn(archive, 'issue.labels')
+    state = _CategoryColumn(archive, 'issue.state')
+    assignees = _ListColumn(archive, 'issue.assignees')
+    title = _StringColumn(archive, 'issue.title')
+    text = _StringColumn(archive, 'issue.text')
+    number = archive['issue.number']
+    created_date = _DateColumn(archive, 'issue.created_date')
+    updated_date = _DateColumn(archive, 'issue.updated_date')
+    timeline_url = _StringColumn(archive, 'issue.timeline_url')
+    event_offsets = archive['issue.event_offsets']
+    event_type = _CategoryColumn(archive, 'event.event_type')
+    author = _CategoryColumn(archive, 'event.author')
+    event_date = _DateColumn(archive, 'event.event_date')
+    label = _CategoryColumn(archive, 'event.label')
+    comment = _StringColumn(archive, 'event.comment')
+    states = {s.value: s for s in State}
+    states[None] = None
+
+    for rows in _iter_blocks(len(number), positions):
+        event_rows, bounds = _event_rows(event_offsets, rows)
+        events = []
+        for values in zip(event_type.take(event_rows), author.take(event_rows), event_date.take(event_rows),
+                          label.take(event_rows), comment.take(event_rows)):
+            event = Event.__new__(Event)
+            event.event_type, event.author, event.event_date, event.label, event.comment = values
+            events.append(event)
+
+        for k, values in enumerate(zip(url.take(rows), creator.take(rows), labels.take(rows),
+                                       state.take(rows), assignees.take(rows), title.take(rows),
+                                       text.take(rows), number[rows].tolist(), created_date.take(rows),
+                                       updated_date.take(rows), timeline_url.take(rows))):
+            issue = Issue.__new__(Issue)
+            (issue.url, issue.creator, issue.labels, issue.state, issue.assignees, issue.title,
+             issue.text, issue.number, issue.created_date, issue.updated_date,
+             issue.timeline_url) = values
+            issue.state = states[issue.state]
+            issue.events = events[bounds[k]:bounds[k + 1]]
+            yield issue
+
+
+def _category_code(archive, name:str, value:str) -> int:
+    """
+    Returns the code of a value of a column stored by _encode_categories,
+    or -2 (matching no row) if no row holds the value.
+    """
+    values = _StringColumn(archive, f'{name}.values')
+    codes = {v: code for code, v in enumerate(values.block(0, len(values)))}
+    return codes.get(value, -2)
+
+
+def _to_micros(value:datetime) -> int:
+    return (as_utc(value) - _EPOCH_UTC) // _ONE_US
+
+
+def _matching_positions(archive, predicate:IssuePredicate) -> np.ndarray:
+    """
+    Returns the positions of the issues selected by the predicate,
+    evaluated on the columns of the archive without decoding any issue.
+    Timestamps without a timezone are stored as if they were in UTC,
+    which is how predicates treat them.
+    """
+    count = len(archive['issue.event_offsets']) - 1
+    mask = np.ones(count, dtype=bool)
+    for name, value in (('issue.creator', predicate.creator), ('issue.state', predicate.state)):
+        if value is not None:
+            mask &= archive[f'{name}.codes'] == _category_code(archive, name, value)
+    if predicate.label is not None:
+        items = np.flatnonzero(archive['issue.labels.items.codes']
+                               == _category_code(archive, 'issue.labels.items', predicate.label))
+        # Map the matching items back to the issues owning them
+        labeled = np.zeros(count, dtype=bool)
+        labeled[np.searchsorted(archive['issue.labels.offsets'], items, side='right') - 1] = True
+        mask &= labeled
+    for name, since, until in (('issue.created_date', predicate.created_since, predicate.created_until),
+                               ('issue.updated_date', predicate.updated_since, predicate.updated_until)):
+        if since is not None or until is not None:
+            micros = archive[f'{name}.micros']
+            mask &= micros != _NO_DATE
+            if since is not None:
+                mask &= micros >= _to_micros(since)
+            if until is not None:
+                mask &= micros < _to_micros(until)
+    return np.flatnonzero(mask)
+
+
+### PUBLIC API
+
+def _open_archive(data_path:str, mapped:bool=False):
+    """
+    Opens the cache of the data file if it exists and is up to date, with
+    its arrays mapped instead of read if mapped is set (see _MappedArchive).
+    Returns None otherwise.
+    """
+    cache_path = get_cache_path(data_path)
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        archive = _MappedArchive(cache_path) if mapped else np.load(cache_path, allow_pickle=False)
+        meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+    except Exception as e:
+        logger.warning(f'Ignoring unreadable cache {cache_path}: {e}')
+        return None
+    if meta != _fingerprint(data_path):
+        logger.info(f'Cache {cache_path} is stale')
+        archive.close()
+        return None
+    return archive
+
+
+def is_fresh(data_path:str) -> bool:
+    """
+    Whether an up-to-date cache exists for the data file.
+    """
+    archive = _open_archive(data_path)
+    if archive is None:
+        return False
+    archive.close()
+    return True
+
+
+def iter_issues(data_path:str, fields:FrozenSet[str]=None, where:IssuePredicate=None) -> Iterator[Issue]:
+    """
+    Yields the cached issues of the data file one at a time. Yields nothing
+    if there is no up-to-date cache, so callers should check is_fresh() first.
+    If fields are declared (see model.declared_fields), only their columns
+    are read and the issues are LazyIssues decoding the rest on access.
+    With a predicate, only the selected issues and their events are decoded.
+    """
+    archive = _open_archive(data_path)
+    if archive is None:
+        return
+    with archive:
+        positions = None if where is None or where.is_empty() else _matching_positions(archive, where)
+        if fields is None:
+            yield from _iter_decoded_issues(archive, positions)
+        else:
+            yield from _iter_lazy_issues(archive, data_path, fields, positions)
+
+
+def _take(archive, name:str, rows) -> np.ndarray:
+    """
+    Copies the values of an array of the archive at the rows, a slice or
+    an array of row positions.
+    """
+    return np.array(archive[name][rows])
+
+
+def _take_categories(archive, name:str, rows) -> Tuple[np.ndarray, List[str]]:
+    """
+    Returns the codes at the rows of a column stored by _encode_categories,
+    along with the values they refer to.
+    """
+    values = _StringColumn(archive, f'{name}.values')
+    return _take(archive, f'{name}.codes', rows), values.block(0, len(values))
+
+
+def _take_dates(archive, name:str, rows) -> np.ndarray:
+    """
+    Returns the timestamps at the rows of a column stored by _encode_dates
+    as datetime64 in UTC (without a timezone). The missing timestamp
+    sentinel is the representation of NaT.
+    """
+    return _take(archive, f'{name}.micros', rows).view('datetime64[us]')
+
+
+def select_frame_columns(data_path:str, where:IssuePredicate) -> Dict[str, Dict[str, any]]:
+    """
+    Returns the columns of the frames (see frames.build_frames_from_columns)
+    of the issues selected by the predicate, or None if there is no
+    up-to-date cache. The predicate is evaluated on the columns of the
+    cache and only the rows of the selected issues, their events and
+    their labels are read, without decoding any issue.
+    """
+    archive = _open_archive(data_path, mapped=True)
+    if archive is None:
+        return None
+    with archive, profiling.span('read cache'):
+        positions = _matching_positions(archive, where)
+        numbers = _take(archive, 'issue.number', positions)
+        issue_index = np.arange(len(positions))
+        event_offsets = archive['issue.event_offsets']
+        event_counts = event_offsets[positions + 1] - event_offsets[positions]
+        event_rows, _ = _event_rows(event_offsets, positions)
+        label_offsets = archive['issue.labels.offsets']
+        label_counts = label_offsets[positions + 1] - label_offsets[positions]
+        label_rows = _ranges(label_offsets[positions], label_offsets[positions + 1])
+        return {
+            'issues': {
+                'number': numbers,
+                'creator': _take_categories(archive, 'issue.creator', positions),
+                'state': _take_categories(archive, 'issue.state', positions),
+                'created_date': _take_dates(archive, 'issue.created_date', positions),
+                'updated_date': _take_dates(archive, 'issue.updated_date', positions),
+                'event_count': event_counts,
+            },
+            'events': {
+                'issue_number': np.repeat(numbers, event_counts),
+                'issue_index': np.repeat(issue_index, event_counts),
+                'event_index': (np.arange(event_counts.sum())
+                                - np.repeat(np.cumsum(event_counts) - event_counts, event_counts)),
+                'event_type': _take_categories(archive, 'event.event_type', event_rows),
+                'author': _take_categories(archive, 'event.author', event_rows),
+                'event_date': _take_dates(archive, 'event.event_date', event_rows),
+                'label': _take_categories(archive, 'event.label', event_rows),
+            },
+            'labels': {
+                'issue_number': np.repeat(numbers, label_counts),
+                'issue_index': np.repeat(issue_index, label_counts),
+                'label': _take_categories(archive, 'issue.labels.items', label_rows),
+            },
+        }
+
+
+def load_issues(data_path:str) -> List[Issue]:
+    """
+    Returns the cached issues of the data file or None if there is
+    no up-to-date cache.
+    """
+    archive = _open_archive(data_path)
+    if archive is None:
+        return None
+    with archive, profiling.span('read cache'):
+        return list(_iter_decoded_issues(archive))
+
+
+def _load_json(data_path:str, name:str) -> any:
+    """
+    Returns a JSON entry of the cache of the data file or None if there
+    is no up-to-date cache or it does not contain the entry.
+    """
+    archive = _open_archive(data_path)
+    if archive is None:
+        return None
+    with archive:
+        if name not in archive.files:
+            return None
+        return json.loads(archive[name].tobytes().decode('utf-8'))
+
+
+def _encode_json(value:any) -> np.ndarray:
+    return np.frombuffer(json.dumps(value).encode('utf-8'), dtype=np.uint8)
+
+
+def load_aggregates(data_path:str) -> Dict[str, any]:
+    """
+    Returns the counts stored with the cache (see aggregates.py) or None
+    if there is no up-to-date cache or it does not store them.
+    """
+    return _load_json(data_path, 'aggregates')
+
+
+def fingerprint(path:str) -> Dict[str, any]:
+    """
+    Identifies the current version of a data or delta file.
+    """
+    return _fingerprint(path)
+
+
+def applied_deltas(data_path:str) -> List[Dict[str, any]]:
+    """
+    Returns the fingerprints of the delta files merged into the
+    cache of the data file.
+    """
+    return _load_json(data_path, 'deltas') or []
+
+
+def save_issues(data_path:str, issues:Iterable[Issue], aggregates:Dict[str, any]=None,
+                deltas:List[Dict[str, any]]=None):
+    """
+    Writes the cache for the data file, along with the counts over the
+    issues and the fingerprints of the delta files merged into them, if
+    given. Failing to write the cache (e.g., in a read-only directory) is
+    logged but otherwise ignored.
+    """
+    save_columns(data_path, IssueColumns(issues), aggregates, deltas)
+
+
+def save_columns(data_path:str, issue_columns:IssueColumns, aggregates:Dict[str, any]=None,
+                 deltas:List[Dict[str, any]]=None):
+    """
+    Writes the cache for the data file from the values of its issues
+    collected by IssueColumns (see save_issues).
+    """
+    cache_path = get_cache_path(data_path)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with profiling.span('write cache'):
+        try:
+            columns = issue_columns.encode()
+            columns['meta'] = _encode_json(_fingerprint(data_path))
+            columns['deltas'] = _encode_json(deltas or [])
+            if aggregates is not None:
+                columns['aggregates'] = _encode_json(aggregates)
+            with open(tmp_path, 'wb') as fout:
+                np.savez(fout, **columns)
+            # Replace atomically so that concurrent runs never see a partial file
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f'Could not write cache {cache_path}: {e}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
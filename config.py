@@ -1,16 +1,66 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import copy
 import json
 import os
+from collections.abc import Mapping
 
 '''
 Handles the loading of the config file as well as the access of specific
 config parameters.
+
+Parameters are resolved once into an immutable ConfigSnapshot (the config
+file overlaid with the parameters found in the environment), which get_parameter reads from until
+set_parameter invalidates it. Snapshots are picklable, so worker processes
+receive the parameters of the main process with install instead of
+re-parsing the environment.
 '''
 
 _config = None
 
+_snapshot = None
+
+# Environment variables with this prefix are parameters even if the config file does not declare them
+_PREFIX = 'ENPM611_PROJECT_'
+
+# Marks a value written by set_parameter that is JSON rather than a string
+_JSON_MARKER = 'json:'
+
+# The names of the parameters set by set_parameter, e.g., the command line arguments
+_set_names = set()
+
+
+class ConfigSnapshot(Mapping):
+    """
+    An immutable mapping from the names of the config parameters to their
+    typed values at the time it was resolved (see get_snapshot).
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, values:dict):
+        object.__setattr__(self, '_values', dict(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ConfigSnapshot is immutable')
+
+    def __reduce__(self):
+        return (ConfigSnapshot, (self._values,))
+
+    def __getitem__(self, name):
+        value = self._values[name]
+        # Lists and dicts are copied so that callers cannot change the snapshot
+        return copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f'ConfigSnapshot({len(self._values)} parameters)'
+
 
 def _init_config(path=None):
     global _config
@@ -49,24 +99,65 @@ def _get_default_path():
         return config_path
 
 
+def get_snapshot():
+    """
+    Returns the config parameters resolved once into an immutable snapshot.
+    Preference is given to environment variables, and then to the config file.
+    Only the variables that are parameters are overlaid: the keys of the config
+    file, the names given to set_parameter, the names with the project prefix
+    and the values with the JSON marker.
+    The snapshot is resolved again after set_parameter or invalidate.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is None:
+        _init_config()
+        values = dict(_config)
+        for name, value in os.environ.items():
+            if value.startswith(_JSON_MARKER):
+                value = value[len(_JSON_MARKER):]
+            elif name not in _config and name not in _set_names and not name.startswith(_PREFIX):
+                # Skip the rest of the environment instead of parsing every variable as JSON
+                continue
+            values[name] = convert_to_typed_value(value)
+        snapshot = _snapshot = ConfigSnapshot(values)
+    return snapshot
+
+
+def invalidate():
+    """
+    Drops the snapshot so that the parameters are resolved again, e.g.,
+    after changing os.environ directly.
+    """
+    global _snapshot
+    _snapshot = None
+
+
+def install(snapshot):
+    """
+    Makes the parameters of a snapshot taken in another process the
+    parameters of this process, e.g., as the initializer of a worker pool:
+
+        ProcessPoolExecutor(initializer=config.install, initargs=(config.get_snapshot(),))
+    """
+    global _config, _snapshot
+    _config = dict(snapshot._values)
+    _snapshot = snapshot
+
+
 def get_parameter(parameter_name, default=None):
     """
     Main function to access config parameters.
     Preference is given to environment variables, and then to the config file.
     """
-    _init_config()
-    if parameter_name in os.environ:
-        value = os.environ.get(parameter_name)
-        if value.startswith("json:"):
-            value = value[5:]
-        return convert_to_typed_value(value)
-    if parameter_name not in _config:
+    snapshot = get_snapshot()
+    if parameter_name not in snapshot:
         if default:
             return default
         logger.info(f"Config parameter {parameter_name} is not specified")
         return None
     else:
-        return _config[parameter_name]
+        return snapshot[parameter_name]
 
 
 def convert_to_typed_value(value):
@@ -96,10 +187,12 @@ def set_parameter(name, value):
     in the application.
     """
     _init_config()
+    _set_names.add(name)
     if isinstance(value, str):
         os.environ[name] = value
     else:
-        os.environ[name] = "json:{0}".format(json.dumps(value))
+        os.environ[name] = "{0}{1}".format(_JSON_MARKER, json.dumps(value))
+    invalidate()
 
 
 def overwrite_from_args(args):
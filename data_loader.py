@@ -1,13 +1,283 @@
 
+import hashlib
 import json
-from typing import List
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Tuple
 
 import config
-from model import Issue
+import profiling
+from aggregates import Aggregates
+from model import DATE_PARSER, DateParser, Issue, JsonSource, declared_fields
+from predicates import IssuePredicate
 
 # Store issues as singleton to avoid reloads
 _ISSUES:List[Issue] = None
 
+# Columnar views of the issues (see frames.py), built once per process
+_FRAMES:Dict[str, 'pd.DataFrame'] = None
+
+# Secondary indexes over the frames (see indexes.py), built on first use
+_INDEX:'DatasetIndex' = None
+
+# Indexes over the frames of the issues selected by the most recently used
+# predicates (see DataLoader.get_index), built while the frames of all issues are not
+_SELECTED_INDEXES:'OrderedDict[IssuePredicate, DatasetIndex]' = OrderedDict()
+
+# Number of indexes over selected issues kept per process
+_SELECTED_INDEX_COUNT:int = 8
+
+# Counts over the issues (see aggregates.py), loaded or counted on first use
+_AGGREGATES:Aggregates = None
+
+# Fingerprints of the delta files merged in this process while the cache is disabled
+_DELTAS:List[Dict[str, any]] = []
+
+# Identifies the contents of the dataset (see DataLoader.get_version)
+_VERSION:str = None
+
+# Number of characters read from the data file at a time when streaming
+_CHUNK_SIZE:int = 1 << 20
+
+_WHITESPACE = ' \t\n\r'
+
+# Number of issues handed to a worker process at a time when loading in parallel
+_PARALLEL_CHUNK_SIZE:int = 500
+
+# Number of bytes scanned at a time when splitting the data file for the workers
+_SCAN_BLOCK_SIZE:int = 1 << 24
+
+_QUOTE:int = ord('"')
+_BACKSLASH:int = ord('\\')
+
+
+def _iter_json_array(fin, chunk_size:int=_CHUNK_SIZE) -> Iterator[any]:
+    """
+    Incrementally decodes the elements of a top-level JSON array from
+    a text stream. Only the element currently being decoded (plus one
+    read buffer) is held in memory, rather than the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buf:str = ''
+    pos:int = 0
+    eof:bool = False
+
+    def fill(min_size:int):
+        # Drops the consumed prefix of the buffer and reads more data
+        nonlocal buf, pos, eof
+        with profiling.span('read file'):
+            chunk = fin.read(max(chunk_size, min_size))
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill(0)
+
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError('Expected the data file to contain a JSON array')
+    pos += 1
+
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == ']':
+        return
+
+    while True:
+        skip_whitespace()
+        try:
+            with profiling.span('decode JSON'):
+                obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Element is not complete yet, read a larger block and retry
+            fill(2 * (len(buf) - pos))
+            continue
+        if buf[pos] not in '{["' and not eof:
+            # A scalar might continue in the next block (e.g., the number
+            # 2.5 read as 2), so it is complete only once a delimiter follows
+            after = end
+            while after < len(buf) and buf[after] in _WHITESPACE:
+                after += 1
+            if after == len(buf) or buf[after] not in ',]':
+                fill(2 * (len(buf) - pos))
+                continue
+        pos = end
+        yield obj
+
+        skip_whitespace()
+        if pos >= len(buf):
+            raise ValueError('Unexpected end of data file')
+        if buf[pos] == ']':
+            return
+        if buf[pos] != ',':
+            raise ValueError(f'Unexpected character {buf[pos]!r} in data file')
+        pos += 1
+
+
+def _is_escaped(block:'np.ndarray', quotes:'np.ndarray', carried_backslashes:int) -> 'np.ndarray':
+    """
+    Determines which of the quotes are escaped, i.e., preceded by an odd
+    number of backslashes. Backslashes at the end of the previous block
+    are passed in as carried_backslashes.
+    """
+    import numpy as np
+    runs = np.zeros(len(quotes), dtype=np.int64)
+    positions = quotes - 1
+    active = np.ones(len(quotes), dtype=bool)
+    while True:
+        # Runs reaching the start of the block continue in the previous block
+        at_start = active & (positions < 0)
+        runs[at_start] += carried_backslashes
+        active &= positions >= 0
+        idx = np.flatnonzero(active)
+        if len(idx) == 0:
+            return runs % 2 == 1
+        is_backslash = block[positions[idx]] == _BACKSLASH
+        active[idx[~is_backslash]] = False
+        runs[idx[is_backslash]] += 1
+        positions[idx[is_backslash]] -= 1
+
+
+def _iter_element_spans(fin, block_size:int=_SCAN_BLOCK_SIZE) -> Iterator[Tuple[int, int]]:
+    """
+    Yields the (start, end) byte offsets of the elements of a top-level JSON
+    array of objects/arrays, read from a binary stream, without decoding
+    them. Strings are located from the unescaped quotes and the nesting depth
+    from the brackets outside of strings, both with vectorized operations.
+    """
+    # numpy is imported lazily since it is slow to import
+    import numpy as np
+
+    # Depth change caused by each byte outside of strings
+    depth_change = np.zeros(256, dtype=np.int8)
+    depth_change[[ord('{'), ord('[')]] = 1
+    depth_change[[ord('}'), ord(']')]] = -1
+
+    in_string:int = 0
+    depth:int = 0
+    carried_backslashes:int = 0
+    offset:int = 0
+    start:int = None
+    while True:
+        data = fin.read(block_size)
+        if not data:
+            return
+        block = np.frombuffer(data, dtype=np.uint8)
+
+        quotes = np.flatnonzero(block == _QUOTE)
+        candidates = (quotes == 0) | (block[quotes - 1] == _BACKSLASH)
+        if candidates.any():
+            escaped = np.zeros(len(quotes), dtype=bool)
+            escaped[candidates] = _is_escaped(block, quotes[candidates], carried_backslashes)
+            quotes = quotes[~escaped]
+
+        # Brackets are structural if preceded by an even number of quotes
+        change = depth_change[block]
+        brackets = np.flatnonzero(change)
+        brackets = brackets[(np.searchsorted(quotes, brackets) + in_string) % 2 == 0]
+        deltas = change[brackets].astype(np.int64)
+        depths = depth + np.cumsum(deltas)
+
+        # Elements open at depth 2 (inside the top-level array) and close back at 1
+        bounds = ((deltas == 1) & (depths == 2)) | ((deltas == -1) & (depths == 1))
+        for position, delta in zip(brackets[bounds].tolist(), deltas[bounds].tolist()):
+            if delta == 1:
+                start = offset + position
+            else:
+                yield start, offset + position + 1
+
+        if len(depths) > 0:
+            depth = int(depths[-1])
+        in_string = (in_string + len(quotes)) % 2
+        trailing = len(data) - len(data.rstrip(b'\\'))
+        carried_backslashes = trailing + (carried_backslashes if trailing == len(data) else 0)
+        offset += len(data)
+
+
+def _iter_elements(data_path:str) -> Iterator[Tuple[Tuple[int, int], any]]:
+    """
+    Yields the byte span of each element of the top-level JSON array of the
+    data file along with the decoded element.
+    """
+    with open(data_path,'rb') as fin, open(data_path,'rb') as reader:
+        for start, end in _iter_element_spans(fin):
+            with profiling.span('read file'):
+                reader.seek(start)
+                data = reader.read(end - start)
+            with profiling.span('decode JSON'):
+                jobj = json.loads(data)
+            yield (start, end), jobj
+
+
+def _build_issues(data_path:str, spans:List[Tuple[int, int]], profile:bool, fields:FrozenSet[str]=None,
+                  where:IssuePredicate=None) -> Tuple[List[Issue], DateParser, Dict[Tuple[str, ...], List[float]]]:
+    """
+    Decodes and builds the issues stored at the given byte spans of the
+    data file, as lazy issues if fields are declared, and only those
+    selected by the predicate if given. This runs in a worker process, so
+    the date parser counts and (if profile is set) the recorded spans are
+    returned to be merged by the caller.
+    """
+    if profile:
+        profiling.enable(track_allocations=False)
+    DATE_PARSER.reset()
+    with profiling.span('worker'):
+        start = spans[0][0]
+        with open(data_path, 'rb') as fin, profiling.span('read file'):
+            fin.seek(start)
+            data = fin.read(spans[-1][1] - start)
+        with profiling.span('decode JSON'):
+            if fields is None:
+                jobjs = json.loads(b'[' + data + b']')
+            else:
+                # Lazy issues keep the span of their element instead of the element
+                jobjs = [json.loads(data[begin - start:end - start]) for begin, end in spans]
+        selected = range(len(jobjs)) if where is None else [k for k, jobj in enumerate(jobjs)
+                                                              if where.matches_json(jobj)]
+        with profiling.span('build models'):
+            if fields is None:
+                issues = [Issue(jobjs[k]) for k in selected]
+            else:
+                source = JsonSource(data_path, fields)
+                issues = [source.issue(jobjs[k], spans[k]) for k in selected]
+    return issues, DATE_PARSER, profiling.collect()
+
+
+def _collect_chunk(future) -> List[Issue]:
+    """
+    Returns the issues built by a worker and merges its date parser
+    counts and spans.
+    """
+    chunk, parser, spans = future.result()
+    DATE_PARSER.fast_count += parser.fast_count
+    DATE_PARSER.fallback_count += parser.fallback_count
+    DATE_PARSER.failed_count += parser.failed_count
+    profiling.merge(spans)
+    return chunk
+
+
+def reset():
+    """
+    Drops the dataset loaded in this process so that the next DataLoader
+    loads the configured data file again, e.g., another shard (see shards.py).
+    """
+    global _ISSUES, _FRAMES, _INDEX, _AGGREGATES, _DELTAS, _VERSION
+    _ISSUES, _FRAMES, _INDEX, _AGGREGATES, _VERSION = None, None, None, None, None
+    _SELECTED_INDEXES.clear()
+    _DELTAS = []
+
+
 class DataLoader:
     """
     Loads the issue data into a runtime object.
@@ -18,6 +288,11 @@ class DataLoader:
         Constructor
         """
         self.data_path:str = config.get_parameter('ENPM611_PROJECT_DATA_PATH')
+        # Whether to keep a parsed copy of the data file next to it (see cache.py)
+        self.use_cache:bool = config.get_parameter('ENPM611_PROJECT_CACHE', True)
+        # Number of processes building the issues when parsing the data file (--workers)
+        self.workers:int = int(config.get_parameter('workers')
+                               or config.get_parameter('ENPM611_PROJECT_LOAD_WORKERS', 1))
         
     def get_issues(self):
         """
@@ -26,18 +301,345 @@ class DataLoader:
         """
         global _ISSUES # to access it within the function
         if _ISSUES is None:
-            _ISSUES = self._load()
+            with profiling.span('load issues'):
+                _ISSUES = self._load()
             print(f'Loaded {len(_ISSUES)} issues from {self.data_path}.')
         return _ISSUES
+
+    def get_issues_frame(self) -> 'pd.DataFrame':
+        """
+        Returns a DataFrame with one row per issue (number, creator, state,
+        created_date, updated_date, event_count). Row positions match the
+        positions of the issues returned by get_issues().
+        """
+        return self._get_frames()['issues']
+
+    def get_events_frame(self) -> 'pd.DataFrame':
+        """
+        Returns a DataFrame with one row per event (issue_number, issue_index,
+        event_index, event_type, author, event_date, label). Authors, event
+        types and labels are categoricals and event dates are datetime64 (UTC),
+        so analyses can use vectorized groupbys instead of Python loops.
+        """
+        return self._get_frames()['events']
+
+    def get_labels_frame(self) -> 'pd.DataFrame':
+        """
+        Returns a DataFrame with one row per label of each issue
+        (issue_number, issue_index, label).
+        """
+        return self._get_frames()['labels']
+
+    def get_index(self, where:IssuePredicate=None) -> 'DatasetIndex':
+        """
+        Returns the secondary indexes (by author, event type, label, creator
+        and state) over the frames. They are built on first use and kept for
+        the rest of the process, so drill-downs only cost time proportional
+        to the matching rows.
+        With a predicate (see predicates.py), the indexes may only cover the
+        issues it selects: unless the frames of all issues are in memory
+        already, frames of the selected issues are built from
+        iter_issues(where=...), so the other issues and their events are
+        never built. Queries must still pass their filters, since the
+        indexes over all issues are returned if they exist.
+        """
+        global _INDEX
+        if where is not None and not where.is_empty() and _FRAMES is None:
+            return self._get_selected_index(where)
+        if _INDEX is None:
+            from indexes import DatasetIndex
+            issues_df, events_df, labels_df = (self.get_issues_frame(), self.get_events_frame(),
+                                               self.get_labels_frame())
+            with profiling.span('build index'):
+                _INDEX = DatasetIndex(issues_df, events_df, labels_df)
+        return _INDEX
+
+    def _get_selected_index(self, where:IssuePredicate) -> 'DatasetIndex':
+        """
+        Returns the indexes over the frames of the issues selected by the
+        predicate, building them on first use. With the cache, the frames
+        are built from the cached columns of the selected issues, and a
+        missing or stale cache is rebuilt while streaming the issues, like
+        for the frames of all issues.
+        """
+        import cache
+        index = _SELECTED_INDEXES.get(where)
+        if index is not None:
+            _SELECTED_INDEXES.move_to_end(where)
+            return index
+        import frames
+        from indexes import DatasetIndex
+        with profiling.span('build frames'):
+            columns = None
+            if _ISSUES is None and self.use_cache:
+                # The rows of the selected issues are taken from the columns of the cache
+                columns = cache.select_frame_columns(self.data_path, where)
+            if columns is not None:
+                selected = frames.build_frames_from_columns(columns)
+            elif _ISSUES is None and self.use_cache:
+                selected = frames.build_frames(issue for issue in self._iter_caching() if where.matches(issue))
+            else:
+                selected = frames.build_frames(self.iter_issues(fields=frames.FIELDS, where=where))
+        with profiling.span('build index'):
+            index = DatasetIndex(selected['issues'], selected['events'], selected['labels'])
+        _SELECTED_INDEXES[where] = index
+        while len(_SELECTED_INDEXES) > _SELECTED_INDEX_COUNT:
+            _SELECTED_INDEXES.popitem(last=False)
+        return index
+
+    def get_aggregates(self) -> Aggregates:
+        """
+        Returns the counts over the issues (issues per year, events per
+        author, ...). They are stored with the cache, so they are only
+        counted when the cache is disabled or was written by an older version.
+        """
+        import cache
+        global _AGGREGATES
+        if _AGGREGATES is None and _ISSUES is None and self.use_cache and not cache.is_fresh(self.data_path):
+            # Rebuilding a missing or stale cache counts the aggregates as well
+            for _ in self._iter_caching():
+                pass
+        if _AGGREGATES is None:
+            jobj = cache.load_aggregates(self.data_path) if self.use_cache else None
+            if jobj is not None:
+                _AGGREGATES = Aggregates.from_json(jobj)
+            else:
+                with profiling.span('count aggregates'):
+                    _AGGREGATES = Aggregates.from_issues(self.iter_issues(fields=Aggregates.FIELDS))
+        return _AGGREGATES
+
+    def get_version(self) -> str:
+        """
+        Returns a hash identifying the contents of the dataset: the version
+        of the data file and the delta files merged into it. It changes
+        whenever the data file is replaced or a delta is merged, so it can
+        key results derived from the dataset (see memo.py).
+        """
+        import cache
+        global _VERSION
+        if _VERSION is None:
+            deltas = cache.applied_deltas(self.data_path) if self.use_cache else _DELTAS
+            version = json.dumps([cache.fingerprint(self.data_path), deltas], sort_keys=True)
+            _VERSION = hashlib.sha1(version.encode('utf-8')).hexdigest()
+        return _VERSION
+
+    def apply_delta(self, delta_path:str) -> Tuple[int, int]:
+        """
+        Merges a delta file (new or updated issues in the format of the
+        data file) into the dataset by issue number. Updated issues keep
+        their position and new issues are appended. The aggregates are
+        adjusted for the changed issues only and the frames (if built) only
+        convert the changed issues, while the indexes are rebuilt on next
+        use. With the cache enabled, the merged dataset is written to the
+        cache, so later runs see it without re-reading the data file or the
+        delta, until the data file itself changes. Returns the number of
+        issues added and updated.
+        """
+        import cache
+        global _FRAMES, _INDEX, _VERSION
+        deltas = cache.applied_deltas(self.data_path) if self.use_cache else _DELTAS
+        if cache.fingerprint(delta_path) in deltas:
+            print(f'Delta {delta_path} was already merged.')
+            return 0, 0
+
+        issues = self.get_issues()
+        aggregates = self.get_aggregates()
+        old_count = len(issues)
+        positions = {issue.number: position for position, issue in enumerate(issues)}
+        changed = set()
+        with profiling.span('merge delta'), open(delta_path, 'r') as fin:
+            for jobj in _iter_json_array(fin):
+                issue = Issue(jobj)
+                position = positions.get(issue.number)
+                if position is None:
+                    position = positions[issue.number] = len(issues)
+                    issues.append(issue)
+                else:
+                    aggregates.remove(issues[position])
+                    issues[position] = issue
+                aggregates.add(issue)
+                changed.add(position)
+
+        if _FRAMES is not None:
+            import frames
+            with profiling.span('merge frames'):
+                _FRAMES = frames.merge_frames(_FRAMES, issues, sorted(changed))
+        # Event positions shift when issues change, so the indexes are rebuilt on next use
+        _INDEX = None
+        _SELECTED_INDEXES.clear()
+        _VERSION = None
+        if self.use_cache:
+            cache.save_issues(self.data_path, issues, aggregates.to_json(),
+                              deltas + [cache.fingerprint(delta_path)])
+            if _FRAMES is not None:
+                import store
+                store.save_frames(store.get_store_path(self.data_path), _FRAMES, self.get_version())
+        else:
+            _DELTAS.append(cache.fingerprint(delta_path))
+        updated = sum(1 for position in changed if position < old_count)
+        return len(changed) - updated, updated
+
+    def _get_frames(self) -> Dict[str, 'pd.DataFrame']:
+        """
+        Maps the frames from the store next to the data file (see store.py)
+        or builds them on first use. The issues are streamed, so the object
+        graph is not kept in memory unless get_issues() was called already.
+        A missing or stale cache is rebuilt from the same stream so that the
+        next run can stream from it.
+        """
+        import cache
+        global _FRAMES
+        if _FRAMES is None:
+            # pandas is imported lazily since it is slow to import
+            import frames
+            import store
+            issues = None
+            if _ISSUES is None and self.use_cache and not cache.is_fresh(self.data_path):
+                issues = self._iter_caching()
+            elif self.use_cache:
+                with profiling.span('open store'):
+                    _FRAMES = store.open_frames(store.get_store_path(self.data_path), self.get_version())
+            if _FRAMES is None:
+                with profiling.span('build frames'):
+                    if issues is None:
+                        issues = self.iter_issues(fields=frames.FIELDS)
+                    _FRAMES = frames.build_frames(issues)
+                if self.use_cache:
+                    with profiling.span('write store'):
+                        store.save_frames(store.get_store_path(self.data_path), _FRAMES, self.get_version())
+        return _FRAMES
+
+    def iter_issues(self, fields:Iterable[str]=None, where:IssuePredicate=None) -> Iterator[Issue]:
+        """
+        Yields the issues in the data file one at a time. Analyses that only
+        aggregate over the issues should prefer this over get_issues() since
+        it runs in roughly constant memory. If the issues have already been
+        loaded by get_issues(), those are yielded instead of re-reading the file.
+        Analyses can declare the fields they need (see model.FIELDS), e.g.,
+        ['created_date', 'events']. Only those are then decoded and the issues
+        are LazyIssues that decode any other field when it is accessed.
+        With a predicate (see predicates.py), only the selected issues are
+        yielded, and the others are never built: the predicate is evaluated
+        on the columns of the cache or on the JSON of each issue.
+        """
+        import cache
+        if where is not None and where.is_empty():
+            where = None
+        if _ISSUES is not None:
+            yield from (_ISSUES if where is None else (issue for issue in _ISSUES if where.matches(issue)))
+            return
+        fields = None if fields is None else declared_fields(fields)
+        if self.use_cache and cache.is_fresh(self.data_path):
+            yield from cache.iter_issues(self.data_path, fields, where)
+            return
+        yield from self._iter_parsed(fields, where)
+
+    def iter_matching_issues(self, label:str=None, since:datetime=None, until:datetime=None,
+                             fields:Iterable[str]=None, creator:str=None, state:str=None,
+                             updated_since:datetime=None, updated_until:datetime=None) -> Iterator[Issue]:
+        """
+        Yields the issues by the creator with the label and state, created
+        in [since, until) and last updated in [updated_since, updated_until),
+        one at a time (see iter_issues). Dates without a timezone are taken
+        to be in UTC.
+        """
+        yield from self.iter_issues(fields, where=IssuePredicate(creator, label, state, since, until,
+                                                                 updated_since, updated_until))
     
     def _load(self):
         """
-        Loads the issues into memory.
+        Loads the issues into memory, preferring the cache of the
+        data file if it is up to date.
+        """
+        import cache
+        if self.use_cache:
+            issues = cache.load_issues(self.data_path)
+            if issues is not None:
+                return issues
+            with profiling.span('parse file'):
+                return list(self._iter_caching())
+        DATE_PARSER.reset()
+        with profiling.span('parse file'):
+            issues = list(self._iter_parsed())
+        print(f'Timestamps: {DATE_PARSER.summary()}.')
+        return issues
+
+    def _iter_caching(self) -> Iterator[Issue]:
+        """
+        Parses the data file and yields its issues one at a time, collecting
+        their columns and counts on the way, and writes the cache once the
+        last issue was consumed. The issues themselves are not kept, so a
+        stream (e.g., the one building the frames) rebuilds the cache without
+        holding the object graph.
         """
+        import cache
+        global _AGGREGATES
+        DATE_PARSER.reset()
+        columns = cache.IssueColumns()
+        # Count while the issues are at hand so the counts can be stored with the cache
+        aggregates = Aggregates()
+        for issue in self._iter_parsed():
+            columns.add(issue)
+            aggregates.add(issue)
+            yield issue
+        print(f'Timestamps: {DATE_PARSER.summary()}.')
+        _AGGREGATES = aggregates
+        cache.save_columns(self.data_path, columns, aggregates.to_json())
+
+    def _iter_parsed(self, fields:FrozenSet[str]=None, where:IssuePredicate=None) -> Iterator[Issue]:
+        """
+        Builds the issues of the data file one at a time, in parallel if
+        more than one worker is configured. If fields are declared, the
+        issues are LazyIssues decoding only those. With a predicate, only
+        the selected issues are built.
+        """
+        if self.workers > 1:
+            yield from self._iter_parallel(fields, where)
+            return
+        if fields is not None:
+            # Lazy issues keep the byte span of their element to read undeclared fields again
+            source = JsonSource(self.data_path, fields)
+            for span, jobj in _iter_elements(self.data_path):
+                if where is not None and not where.matches_json(jobj):
+                    continue
+                with profiling.span('build models'):
+                    issue = source.issue(jobj, span)
+                yield issue
+            return
         with open(self.data_path,'r') as fin:
-            return [Issue(i) for i in json.load(fin)]
+            for jobj in _iter_json_array(fin):
+                if where is not None and not where.matches_json(jobj):
+                    continue
+                with profiling.span('build models'):
+                    issue = Issue(jobj)
+                yield issue
+
+    def _iter_parallel(self, fields:FrozenSet[str]=None, where:IssuePredicate=None) -> Iterator[Issue]:
+        """
+        Builds the issues in a pool of worker processes. The data file is
+        split into byte ranges of a few hundred issues each, which the workers
+        read and decode themselves. Only a few ranges are in flight at a time
+        and the issues are yielded in the same order as in the data file.
+        """
+        pending = deque()
+        # Workers start with the parameters of this process (see config.install)
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=config.install,
+                                   initargs=(config.get_snapshot(),))
+        with open(self.data_path,'rb') as fin, pool:
+            spans = _iter_element_spans(fin)
+            while True:
+                with profiling.span('scan file'):
+                    chunk = list(islice(spans, _PARALLEL_CHUNK_SIZE))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_build_issues, self.data_path, chunk, profiling.ENABLED,
+                                            fields, where))
+                if len(pending) >= 2 * self.workers:
+                    yield from _collect_chunk(pending.popleft())
+            while pending:
+                yield from _collect_chunk(pending.popleft())
     
 
 if __name__ == '__main__':
     # Run the loader for testing
-    DataLoader().get_issues()
\ No newline at end of file
+    DataLoader().get_issues()
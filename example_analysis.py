@@ -1,12 +1,15 @@
 
-from typing import List
-import matplotlib.pyplot as plt
+from datetime import datetime
+from typing import Tuple
+
 import numpy as np
 import pandas as pd
 
 from data_loader import DataLoader
-from model import Issue,Event
 import config
+import memo
+import output
+import predicates
 
 class ExampleAnalysis:
     """
@@ -20,6 +23,13 @@ class ExampleAnalysis:
         """
         # Parameter is passed in via command line (--user)
         self.USER:str = config.get_parameter('user')
+        # Parameter is passed in via command line (--label)
+        self.LABEL:str = config.get_parameter('label')
+        # Parameters are passed in via command line (--since, --until)
+        self.SINCE:datetime = predicates.get_date_parameter('since')
+        self.UNTIL:datetime = predicates.get_date_parameter('until')
+        # Number of issue creators shown in the bar chart
+        self.TOP_N:int = 50
     
     def run(self):
         """
@@ -28,34 +38,66 @@ class ExampleAnalysis:
         Note: this is just an example analysis. You should replace the code here
         with your own implementation and then implement two more such analyses.
         """
-        issues:List[Issue] = DataLoader().get_issues()
-        
-        ### BASIC STATISTICS
-        # Calculate the total number of events for a specific user (if specified in command line args)
-        total_events:int = 0
-        for issue in issues:
-            total_events += len([e for e in issue.events if self.USER is None or e.author == self.USER])
+        # Results are memoized per user, label and date range (see memo.py)
+        total_events, issue_count, top_creators = memo.memoize(
+            'example_analysis', count_issues_and_events, user=self.USER, label=self.LABEL,
+            since=self.SINCE, until=self.UNTIL, top_n=self.TOP_N)
         
-        output:str = f'Found {total_events} events across {len(issues)} issues'
+        summary:str = f'Found {total_events} events across {issue_count} issues'
+        if self.LABEL is not None:
+            summary += f' labeled {self.LABEL}'
         if self.USER is not None:
-            output += f' for {self.USER}.'
+            summary += f' for {self.USER}.'
         else:
-            output += '.'
-        print('\n\n'+output+'\n\n')
+            summary += '.'
+        print('\n\n'+summary+'\n\n')
         
+        # The label (or date range) may select no issues, leaving nothing to chart
+        if len(top_creators) == 0:
+            if self.LABEL is not None:
+                print(f'No issues with label {self.LABEL}, skipping the chart of top creators.')
+            else:
+                print('No issues match, skipping the chart of top creators.')
+            return
 
         ### BAR CHART
-        # Display a graph of the top 50 creators of issues
-        top_n:int = 50
-        # Create a dataframe (with only the creator's name) to make statistics a lot easier
-        df = pd.DataFrame.from_records([{'creator':issue.creator} for issue in issues])
-        # Determine the number of issues for each creator and generate a bar chart of the top N
-        df_hist = df.groupby(df["creator"]).value_counts().nlargest(top_n).plot(kind="bar", figsize=(14,8), title=f"Top {top_n} issue creators")
-        # Set axes labels
-        df_hist.set_xlabel("Creator Names")
-        df_hist.set_ylabel("# of issues created")
-        # Plot the chart
-        plt.show() 
+        # Plot the top creators of issues (or write the chart to the output directory)
+        output.render('top_issue_creators', plot_top_creators, top_creators, self.TOP_N)
+
+
+def count_issues_and_events(user:str=None, label:str=None, since:datetime=None, until:datetime=None,
+                            top_n:int=50) -> Tuple[int, int, pd.Series]:
+    """
+    Computes the number of events by the user and the number of issues
+    with the label, created in [since, until), and the number of those
+    issues created by each of the top_n creators.
+    """
+    # The index only touches the issues and events matching the
+    # user and label (if specified in command line args), and only
+    # the issues with the label are loaded unless all of them are already
+    where = predicates.IssuePredicate(label=label, created_since=since, created_until=until)
+    index = DataLoader().get_index(where)
+    issues_df:pd.DataFrame = index.issues(label=label, since=since, until=until)
+    
+    ### BASIC STATISTICS
+    # Calculate the total number of events for a specific user (if specified in command line args)
+    total_events:int = len(index.event_positions(author=user, label=label, since=since, until=until))
+
+    # Determine the number of issues for each creator (creators are categorical,
+    # so those without issues among the selected ones are counted as zero)
+    creator_counts:pd.Series = issues_df['creator'].value_counts()
+    top_creators:pd.Series = creator_counts[creator_counts > 0].nlargest(top_n)
+    return total_events, len(issues_df), top_creators
+
+
+def plot_top_creators(top_creators:pd.Series, top_n:int):
+    """
+    Generates a bar chart of the top N issue creators.
+    """
+    df_hist = top_creators.plot(kind="bar", figsize=(14,8), title=f"Top {top_n} issue creators")
+    # Set axes labels
+    df_hist.set_xlabel("Creator Names")
+    df_hist.set_ylabel("# of issues created")
                         
     
 
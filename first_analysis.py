@@ -1,14 +1,14 @@
 
-from typing import List
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-from collections import Counter
-
+from datetime import datetime
+from typing import Dict
 
 from data_loader import DataLoader
-from model import Issue,Event
 import config
+import memo
+import output
+import predicates
+import shards
+import topk
 
 class FirstAnalysis:
 
@@ -18,6 +18,13 @@ class FirstAnalysis:
         """
         # Parameter is passed in via command line (--user)
         self.USER:str = config.get_parameter('user')
+        # Parameter is passed in via command line (--label)
+        self.LABEL:str = config.get_parameter('label')
+        # Parameter is passed in via command line (--category), either 1-4 or a range like A-G
+        self.CATEGORY = config.get_parameter('category')
+        # Parameters are passed in via command line (--since, --until)
+        self.SINCE:datetime = predicates.get_date_parameter('since')
+        self.UNTIL:datetime = predicates.get_date_parameter('until')
 
     def run(self):
     
@@ -29,19 +36,25 @@ class FirstAnalysis:
         """
 
 
-        issues:List[Issue] = DataLoader().get_issues()    
- 
-        author_event_count = {} 
-        
-        for issue in issues:
-            # print(issue.url)
-            for event in issue.events:
-                if event.author is not None:
-                    if event.author not in author_event_count:
-                        author_event_count[event.author] = 1 
-                    else:
-                        author_event_count[event.author] += 1 
-
+        # Number of events per author (events without an author are dropped)
+        capacity = topk.get_capacity()
+        if capacity is None:
+            # Counted per shard and added up with --shards (see shards.py)
+            author_event_count = shards.memoize('first_analysis.author_events', count_author_events,
+                                                shards.add_counts, label=self.LABEL, since=self.SINCE,
+                                                until=self.UNTIL)
+        else:
+            # Approximate counts of the most active authors in one streaming pass (--approximate)
+            summary = memo.memoize('first_analysis.author_events_approximate', topk.event_authors,
+                                   capacity=capacity, label=self.LABEL, since=self.SINCE, until=self.UNTIL)
+            author_event_count = summary.counts()
+            print(f'Counted {summary.total} events approximately, listing the {len(author_event_count)} '
+                  f'most active authors (counts are at most {summary.max_error} too high)')
+
+        # The date range (--since, --until) may select no events
+        if not author_event_count:
+            print("No events match.")
+            return
 
         key_width = max(len(key) for key in author_event_count.keys())
 
@@ -80,58 +93,83 @@ class FirstAnalysis:
             4: 'U-Z'
         }
 
-        # Display choices for the user
-        print("Please select an alphabetical range of author usernames to view:")
-        for num, label in choices.items():
-            print(f"{num}. {label}")
-
-
-        while True: 
-            user_choice = int(input("Enter your choice (1, 2, 3, or 4): "))
-            selected_category = choices.get(user_choice)
-                
-            if selected_category in grouped_keys:
-                print(f"\nCategory: {selected_category}")
-                print(f"{'No.':<3} | {'Author username':{key_width}} | Events")
-                print("-" * (key_width + 15))  # separator line for readability
-
-                for idx, (key, value) in enumerate(grouped_keys[selected_category], start=1):
-                    print(f"{idx:<3} | {key:{key_width}} | {value:>5}")
-                
-                break
-            else:
-                print("Invalid choice. Please select a number between 1 and 4.")
-            
-        
-        while True:
-            user_selection = (input("Enter authors name or No. in list: "))
-            try:
-                # Check if input is an index
-                selection_index = int(user_selection) - 1
-                if 0 <= selection_index < len(grouped_keys[selected_category]):
-                    selected_author = grouped_keys[selected_category][selection_index][0]
-                    print("Event Author found: ", selected_author)
-                    break
-                else:
-                    print("Invalid index. Please try again.")
-            except ValueError:
-                # Check if input matches an author name
-                if any(user_selection == author[0] for author in grouped_keys[selected_category]):
-                    print("Event Author found: ", user_selection)
-                    selected_author = user_selection
+        def print_category(category):
+            print(f"\nCategory: {category}")
+            print(f"{'No.':<3} | {'Author username':{key_width}} | Events")
+            print("-" * (key_width + 15))  # separator line for readability
+
+            for idx, (key, value) in enumerate(grouped_keys[category], start=1):
+                print(f"{idx:<3} | {key:{key_width}} | {value:>5}")
+
+        # The category and author can also be passed in via the command line
+        # (--category, --user) so that the analysis runs without prompting
+        if self.CATEGORY is not None:
+            selected_category = choices.get(self.CATEGORY, self.CATEGORY)
+            if selected_category not in grouped_keys:
+                print(f"Unknown category {self.CATEGORY}. Use 1-4 or one of {', '.join(grouped_keys)}.")
+                return
+            print_category(selected_category)
+        elif self.USER is None and output.is_headless():
+            # Nobody to prompt, so list all categories
+            for category in grouped_keys:
+                print_category(category)
+        elif self.USER is None:
+            # Display choices for the user
+            print("Please select an alphabetical range of author usernames to view:")
+            for num, label in choices.items():
+                print(f"{num}. {label}")
+
+
+            while True: 
+                user_choice = int(input("Enter your choice (1, 2, 3, or 4): "))
+                selected_category = choices.get(user_choice)
+                    
+                if selected_category in grouped_keys:
+                    print_category(selected_category)
                     break
                 else:
-                    print("Author not found in the selected category.")
+                    print("Invalid choice. Please select a number between 1 and 4.")
+            
+        
+        if self.USER is not None:
+            # Authors missing from approximate counts may just not be among the most active
+            if self.USER not in author_event_count and capacity is None:
+                print(f"No events found for author {self.USER}.")
+                return
+            selected_author = self.USER
+            print("Event Author found: ", selected_author)
+        elif output.is_headless():
+            # Without a --user there is no author to drill into
+            return
+        else:
+            while True:
+                user_selection = (input("Enter authors name or No. in list: "))
+                try:
+                    # Check if input is an index
+                    selection_index = int(user_selection) - 1
+                    if 0 <= selection_index < len(grouped_keys[selected_category]):
+                        selected_author = grouped_keys[selected_category][selection_index][0]
+                        print("Event Author found: ", selected_author)
+                        break
+                    else:
+                        print("Invalid index. Please try again.")
+                except ValueError:
+                    # Check if input matches an author name
+                    if any(user_selection == author[0] for author in grouped_keys[selected_category]):
+                        print("Event Author found: ", user_selection)
+                        selected_author = user_selection
+                        break
+                    else:
+                        print("Author not found in the selected category.")
 
-        event_type_count = {}
-        for issue in issues:
-            for event in issue.events:
-                if event.author == selected_author:
+        event_type_count = shards.memoize('first_analysis.event_types', count_event_types, shards.add_counts,
+                                          user=selected_author, label=self.LABEL, since=self.SINCE,
+                                          until=self.UNTIL)
 
-                    if event.event_type not in event_type_count:
-                        event_type_count[event.event_type] = 1 
-                    else:
-                        event_type_count[event.event_type] += 1 
+        # An author untracked by approximate counts may have no events at all
+        if not event_type_count:
+            print(f"No events found for author {selected_author}.")
+            return
 
         #print(event_type_count)
 
@@ -147,6 +185,30 @@ class FirstAnalysis:
             print(f"{idx:<3} | {key:{key_width}} | {value:>{value_width}}")
 
 
+def count_author_events(label:str=None, since:datetime=None, until:datetime=None) -> Dict[str, int]:
+    """
+    Counts the events of each author on the issues with the label
+    created in [since, until).
+    """
+    if label is None and since is None and until is None:
+        return dict(DataLoader().get_aggregates().events_per_author)
+    where = predicates.IssuePredicate(label=label, created_since=since, created_until=until)
+    events = DataLoader().get_index(where).events(label=label, since=since, until=until)
+    author_event_count = events['author'].value_counts(sort=False)
+    return author_event_count[author_event_count > 0].to_dict()
+
+
+def count_event_types(user:str, label:str=None, since:datetime=None, until:datetime=None) -> Dict[str, int]:
+    """
+    Counts the events of each type by the user on the issues with the
+    label created in [since, until).
+    """
+    where = predicates.IssuePredicate(label=label, created_since=since, created_until=until)
+    author_events = DataLoader().get_index(where).events(author=user, label=label, since=since, until=until)
+    event_type_count = author_events['event_type'].value_counts(sort=False)
+    return event_type_count[event_type_count > 0].to_dict()
+
+
 if __name__ == '__main__':
     # Invoke run method when running this module directly
     FirstAnalysis().run()
\ No newline at end of file
@@ -1,11 +1,16 @@
+from datetime import datetime
+from typing import Dict
+
 import config
-from typing import List
 import matplotlib.pyplot as plt
 import pandas as pd
-from collections import Counter
 
 from data_loader import DataLoader
-from model import Issue
+import memo
+import output
+import predicates
+import shards
+import timeseries
 
 
 class FourthAnalysis:
@@ -15,31 +20,103 @@ class FourthAnalysis:
         """
 
         self.USER = config.get_parameter('user')
+        self.LABEL = config.get_parameter('label')
+        # Bucket of time other than years to count the issues by (day, week, month, year)
+        self.GRANULARITY = config.get_parameter('granularity')
+        # Parameters are passed in via command line (--since, --until)
+        self.SINCE = predicates.get_date_parameter('since')
+        self.UNTIL = predicates.get_date_parameter('until')
 
     def run(self):
         """
         Run the analysis for Frequency of Issues per Year.
         """
-        issues: List[Issue]=DataLoader().get_issues()
-        # Convert issues into a DataFrame for easier manipulation
-        issues_data =[{
-            'number':issue.number,
-            'created_date':issue.created_date,
-            'state':issue.state
-        } for issue in issues]
-        issues_df=pd.DataFrame(issues_data)
-        issue_counts_per_year=Counter(pd.to_datetime(issues_df['created_date']).dt.year.dropna())
-        years=sorted(issue_counts_per_year.keys())
-        counts=[issue_counts_per_year[year] for year in years]
-        # Create a figure for the plot
-        plt.figure(figsize=(12,6))
-
-        # Plot Frequency of Issues per Year
-        plt.bar(years, counts, color='skyblue')
-        plt.title('Frequency of Issues per Year')
-        plt.xlabel('Year')
-        plt.ylabel('Number of Issues')
-        for i, count in enumerate(counts):
-            plt.text(years[i],count,str(count),ha='center',va='bottom')
-        plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        # Counted per shard and added up with --shards (see shards.py)
+        if self.GRANULARITY is not None:
+            counts_df=shards.memoize('fourth_analysis.over_time',issues_over_time,timeseries.merge_counts,
+                                     granularity=self.GRANULARITY,user=self.USER,label=self.LABEL,
+                                     since=self.SINCE,until=self.UNTIL)
+            # The date range (--since, --until) may select no issues
+            if counts_df.empty:
+                print('No issues match.')
+                return
+            # Plot the issues created and closed and the open backlog per bucket
+            output.render(f'issues_per_{self.GRANULARITY}', plot_issues_over_time, counts_df, self.GRANULARITY)
+            return
+        per_year=shards.memoize('fourth_analysis.per_year',count_issues_per_year,shards.add_counts,
+                                user=self.USER,label=self.LABEL,since=self.SINCE,until=self.UNTIL)
+        years,counts=_by_year(per_year)
+        # Plot Frequency of Issues per Year (or write it to the output directory)
+        output.render('issues_per_year', plot_issues_per_year, years, counts)
+
+
+def count_issues_per_year(user:str=None, label:str=None, since:datetime=None, until:datetime=None) -> Dict[int, int]:
+    """
+    Counts the issues created in each year by the user with the label,
+    counting the issues created in [since, until).
+    """
+    if user is None and label is None and since is None and until is None:
+        issues_per_year=DataLoader().get_aggregates().issues_per_year
+    else:
+        where=predicates.IssuePredicate(creator=user,label=label,created_since=since,created_until=until)
+        issues_df=DataLoader().get_index(where).issues(creator=user, label=label, since=since, until=until)
+        issues_per_year=issues_df['created_date'].dt.year.dropna().astype(int).value_counts().to_dict()
+    return dict(issues_per_year)
+
+
+def _by_year(issues_per_year:Dict[int, int]):
+    """
+    Returns the years in order and the number of issues of each.
+    """
+    years=sorted(issues_per_year)
+    return years,[issues_per_year[year] for year in years]
+
+
+def issues_per_year(user:str=None, label:str=None, since:datetime=None, until:datetime=None):
+    """
+    Returns the years and the number of issues created in each year by the
+    user with the label, counting the issues created in [since, until).
+    """
+    return _by_year(count_issues_per_year(user=user, label=label, since=since, until=until))
+
+
+def issues_over_time(granularity:str='year', user:str=None, label:str=None, since:datetime=None,
+                     until:datetime=None) -> pd.DataFrame:
+    """
+    Returns the number of issues created and closed in each bucket of the
+    granularity and the open backlog at its end, for the issues created by
+    the user with the label in [since, until) (see timeseries.py).
+    """
+    # The daily counts are kept, so other granularities are rolled up from them
+    series=memo.memoize('timeseries',timeseries.build,user=user,label=label,since=since,until=until)
+    return series.counts(granularity)
+
+
+def plot_issues_per_year(years, counts):
+    """
+    Creates the bar plot of the number of issues per year.
+    """
+    # Create a figure for the plot
+    plt.figure(figsize=(12,6))
+
+    # Plot Frequency of Issues per Year
+    plt.bar(years, counts, color='skyblue')
+    plt.title('Frequency of Issues per Year')
+    plt.xlabel('Year')
+    plt.ylabel('Number of Issues')
+    for i, count in enumerate(counts):
+        plt.text(years[i],count,str(count),ha='center',va='bottom')
+    plt.tight_layout()
+
+
+def plot_issues_over_time(counts_df:pd.DataFrame, granularity:str):
+    """
+    Creates the line plot of the issues created and closed per bucket,
+    with the open backlog on a secondary axis.
+    """
+    ax=counts_df[['created','closed']].plot(figsize=(12,6),title=f'Issues per {granularity}')
+    counts_df['backlog'].plot(ax=ax,secondary_y=True,color='gray',style='--',legend=True)
+    ax.set_xlabel(granularity.capitalize())
+    ax.set_ylabel('Number of Issues')
+    ax.right_ax.set_ylabel('Open Issues')
+    plt.tight_layout()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Builds flat, columnar views (pandas DataFrames) of the issues so that
+analyses can use vectorized operations instead of looping over the
+Issue and Event objects.
+
+- issues: one row per issue (the row position is the issue's position
+  in DataLoader().get_issues())
+- events: one row per event with the issue number as foreign key
+- labels: one row per (issue, label) pair
+
+Repeated strings are stored as categoricals and timestamps as
+datetime64 in UTC.
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from model import Issue
+
+# Fields of the issues the frames are built from (see DataLoader.iter_issues)
+FIELDS:List[str] = ['number', 'creator', 'state', 'created_date', 'updated_date', 'labels', 'events']
+
+
+def _datetimes(values:list) -> pd.DatetimeIndex:
+    return pd.to_datetime(values, utc=True)
+
+
+def _concat(parts:List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates frames with the same columns, keeping categorical
+    columns categorical by extending their categories.
+    """
+    columns = {}
+    for name in parts[0].columns:
+        series = [part[name] for part in parts]
+        if isinstance(series[0].dtype, pd.CategoricalDtype):
+            categories = series[0].cat.categories
+            for other in series[1:]:
+                categories = categories.append(other.cat.categories.difference(categories))
+            series = [other.cat.set_categories(categories) for other in series]
+        columns[name] = pd.concat(series, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def build_frames(issues:Iterable[Issue]) -> Dict[str, pd.DataFrame]:
+    """
+    Builds the issues, events and labels frames in a single pass over
+    the issues. Only the columns are accumulated so the issues can be
+    streamed (e.g., from DataLoader().iter_issues()).
+    """
+    issue_cols = {'number': [], 'creator': [], 'state': [], 'created_date': [],
+                  'updated_date': [], 'event_count': []}
+    event_cols = {'issue_number': [], 'issue_index': [], 'event_index': [], 'event_type': [],
+                  'author': [], 'event_date': [], 'label': []}
+    label_cols = {'issue_number': [], 'issue_index': [], 'label': []}
+
+    for issue_index, issue in enumerate(issues):
+        issue_cols['number'].append(issue.number)
+        issue_cols['creator'].append(issue.creator)
+        issue_cols['state'].append(None if issue.state is None else issue.state.value)
+        issue_cols['created_date'].append(issue.created_date)
+        issue_cols['updated_date'].append(issue.updated_date)
+        issue_cols['event_count'].append(len(issue.events))
+        for event_index, event in enumerate(issue.events):
+            event_cols['issue_number'].append(issue.number)
+            event_cols['issue_index'].append(issue_index)
+            event_cols['event_index'].append(event_index)
+            event_cols['event_type'].append(event.event_type)
+            event_cols['author'].append(event.author)
+            event_cols['event_date'].append(event.event_date)
+            event_cols['label'].append(event.label)
+        for label in issue.labels:
+            label_cols['issue_number'].append(issue.number)
+            label_cols['issue_index'].append(issue_index)
+            label_cols['label'].append(label)
+
+    issues_df = pd.DataFrame({
+        'number': np.asarray(issue_cols['number'], dtype=np.int64),
+        'creator': pd.Categorical(issue_cols['creator']),
+        'state': pd.Categorical(issue_cols['state']),
+        'created_date': _datetimes(issue_cols['created_date']),
+        'updated_date': _datetimes(issue_cols['updated_date']),
+        'event_count': np.asarray(issue_cols['event_count'], dtype=np.int64),
+    })
+    events_df = pd.DataFrame({
+        'issue_number': np.asarray(event_cols['issue_number'], dtype=np.int64),
+        'issue_index': np.asarray(event_cols['issue_index'], dtype=np.int64),
+        'event_index': np.asarray(event_cols['event_index'], dtype=np.int64),
+        'event_type': pd.Categorical(event_cols['event_type']),
+        'author': pd.Categorical(event_cols['author']),
+        'event_date': _datetimes(event_cols['event_date']),
+        'label': pd.Categorical(event_cols['label']),
+    })
+    labels_df = pd.DataFrame({
+        'issue_number': np.asarray(label_cols['issue_number'], dtype=np.int64),
+        'issue_index': np.asarray(label_cols['issue_index'], dtype=np.int64),
+        'label': pd.Categorical(label_cols['label']),
+    })
+    return {'issues': issues_df, 'events': events_df, 'labels': labels_df}
+
+
+def _categorical(codes:np.ndarray, values:List[str]) -> pd.Categorical:
+    """
+    Converts dictionary codes into a categorical of the values they refer
+    to (-1 for missing values). Like in build_frames, the categories are
+    the values present, sorted.
+    """
+    used = np.unique(codes[codes >= 0])
+    categories = np.asarray(values, dtype=object)[used]
+    order = np.argsort(categories)
+    # The trailing -1 keeps missing values missing
+    recode = np.full(len(values) + 1, -1, dtype=np.int64)
+    recode[used[order]] = np.arange(len(used))
+    return pd.Categorical.from_codes(recode[codes], categories=pd.Index(categories[order], dtype='str'))
+
+
+def build_frames_from_columns(columns:Dict[str, Dict[str, any]]) -> Dict[str, pd.DataFrame]:
+    """
+    Builds the frames from their columns in array form (see
+    cache.select_frame_columns): integers as arrays, categoricals as
+    (codes, values) pairs and timestamps as datetime64 in UTC.
+    """
+    built = {}
+    for name, frame_columns in columns.items():
+        built[name] = pd.DataFrame({
+            column: (_categorical(*values) if isinstance(values, tuple)
+                     else _datetimes(values) if values.dtype.kind == 'M' else values)
+            for column, values in frame_columns.items()
+        })
+    return built
+
+
+def merge_frames(frames:Dict[str, pd.DataFrame], issues:List[Issue],
+                 positions:List[int]) -> Dict[str, pd.DataFrame]:
+    """
+    Returns the frames after the issues at the given positions changed:
+    their rows are rebuilt from issues[position], and positions past the
+    end of the frames are appended. Only the changed issues are converted,
+    the rows of all other issues are copied with vectorized operations.
+    Events stay grouped by issue in the order of the issues.
+    """
+    positions = np.asarray(sorted(positions), dtype=np.int64)
+    delta = build_frames([issues[position] for position in positions])
+    for name in ('events', 'labels'):
+        delta[name]['issue_index'] = positions[delta[name]['issue_index'].to_numpy()]
+
+    # Issue rows are ordered by position, with changed rows taken from the delta
+    old_count = len(frames['issues'])
+    rows = np.arange(len(issues))
+    rows[positions] = old_count + np.arange(len(positions))
+    merged = {'issues': _concat([frames['issues'], delta['issues']]).iloc[rows].reset_index(drop=True)}
+
+    unchanged = np.ones(old_count, dtype=bool)
+    unchanged[positions[positions < old_count]] = False
+    for name in ('events', 'labels'):
+        kept = frames[name][unchanged[frames[name]['issue_index'].to_numpy()]]
+        combined = _concat([kept, delta[name]])
+        order = np.argsort(combined['issue_index'].to_numpy(), kind='stable')
+        merged[name] = combined.iloc[order].reset_index(drop=True)
+    return merged
@@ -0,0 +1,255 @@
+"""
+Relates the contributors of the issues to each other in a directed,
+weighted interaction graph:
+
+- commenter -> creator for every comment on an issue by someone other
+  than its creator;
+- assigner -> assignee for every assignment, to each of the assignees of
+  the issue.
+
+The graph is stored as compressed sparse rows (CSR) in NumPy arrays: the
+edges leaving contributor i are indices[indptr[i]:indptr[i + 1]] with the
+number of interactions in weights. It is built from the categorical codes
+of the frames (see frames.py) with vectorized sorting and counting, and
+the metrics (degrees, PageRank, connected components) are computed with
+sparse matrix-vector products and pointer jumping over the edge arrays,
+so they scale to hundreds of thousands of contributors without looping
+over pairs of them in Python.
+
+    python run.py --graph
+"""
+
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+import memo
+from data_loader import DataLoader
+
+
+class RankedContributor(NamedTuple):
+    """
+    A contributor with their score under some metric.
+    """
+    contributor: str
+    score: float
+
+
+class ContributorGraph:
+    """
+    A directed graph between contributors in CSR form.
+    """
+
+    def __init__(self, contributors:np.ndarray, sources:np.ndarray, targets:np.ndarray):
+        """
+        Constructor. Builds the graph from one (source, target) pair of
+        contributor positions per interaction. Repeated pairs are merged
+        into one weighted edge and self-loops are dropped.
+        """
+        self.contributors:np.ndarray = np.asarray(contributors, dtype=object)
+        n = len(self.contributors)
+        keep = sources != targets
+        pairs, weights = np.unique(sources[keep].astype(np.int64) * n + targets[keep], return_counts=True)
+        sources = pairs // n
+        # Edges are sorted by source, so each row is a contiguous range
+        self.indptr:np.ndarray = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.indptr[1:])
+        self.indices:np.ndarray = pairs % n
+        self.weights:np.ndarray = weights.astype(np.float64)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.contributors)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def _sources(self) -> np.ndarray:
+        """
+        Returns the source of each edge.
+        """
+        return np.repeat(np.arange(self.node_count), np.diff(self.indptr))
+
+    def out_degree(self) -> np.ndarray:
+        """
+        Returns the number of distinct contributors each contributor
+        interacted with.
+        """
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        """
+        Returns the number of distinct contributors that interacted with
+        each contributor.
+        """
+        return np.bincount(self.indices, minlength=self.node_count)
+
+    def degree(self) -> np.ndarray:
+        """
+        Returns the in-degree plus the out-degree of each contributor.
+        """
+        return self.in_degree() + self.out_degree()
+
+    def pagerank(self, damping:float=0.85, tolerance:float=1e-10, max_iterations:int=100) -> np.ndarray:
+        """
+        Returns the PageRank of each contributor by power iteration, edges
+        being followed in proportion to their weight. The ranks of
+        contributors without outgoing edges are spread over all of them.
+        The ranks sum to 1.
+        """
+        n = self.node_count
+        if n == 0:
+            return np.zeros(0)
+        sources = self._sources()
+        out_weight = np.bincount(sources, weights=self.weights, minlength=n)
+        dangling = out_weight == 0
+        edge_share = self.weights / out_weight[sources]
+        ranks = np.full(n, 1.0 / n)
+        for _ in range(max_iterations):
+            # Transposed matrix-vector product: each edge carries a share of its source's rank
+            spread = np.bincount(self.indices, weights=edge_share * ranks[sources], minlength=n)
+            updated = (1 - damping) / n + damping * (spread + ranks[dangling].sum() / n)
+            converged = np.abs(updated - ranks).sum() < tolerance
+            ranks = updated
+            if converged:
+                break
+        return ranks
+
+    def connected_components(self) -> Tuple[int, np.ndarray]:
+        """
+        Returns the number of weakly connected components and the
+        component of each contributor, numbered from 0 by their smallest
+        contributor position.
+        """
+        parent = np.arange(self.node_count)
+        sources, targets = self._sources(), self.indices
+        while True:
+            # Hook the larger of the roots of both ends of each edge under the smaller
+            source_roots, target_roots = parent[sources], parent[targets]
+            lower = np.minimum(source_roots, target_roots)
+            higher = np.maximum(source_roots, target_roots)
+            merging = lower != higher
+            if not merging.any():
+                break
+            np.minimum.at(parent, higher[merging], lower[merging])
+            # Point every contributor to its root by pointer jumping
+            while True:
+                grandparent = parent[parent]
+                if (grandparent == parent).all():
+                    break
+                parent = grandparent
+        roots, components = np.unique(parent, return_inverse=True)
+        return len(roots), components
+
+    def top(self, scores:np.ndarray, n:int=10) -> List[RankedContributor]:
+        """
+        Returns the n contributors with the highest scores (e.g., from
+        pagerank or degree), highest first.
+        """
+        return [RankedContributor(self.contributors[i], scores[i].item()) for i in _top_positions(scores, n)]
+
+
+def _top_positions(scores:np.ndarray, n:int) -> np.ndarray:
+    """
+    Returns the positions of the n highest scores, highest first.
+    """
+    return np.argsort(-scores, kind='stable')[:n]
+
+
+def _codes(values:pd.Categorical, contributors:pd.Index) -> np.ndarray:
+    """
+    Returns the positions of categorical values among the contributors
+    (-1 for missing values).
+    """
+    lookup = np.append(contributors.get_indexer(values.categories), -1)
+    return lookup[values.codes]
+
+
+def _assignees(issue_count:int) -> Tuple[np.ndarray, List[str]]:
+    """
+    Returns, in CSR form, the assignees of the issues at their positions
+    in the frames: the assignees of issue i are assignees[offsets[i]:offsets[i + 1]].
+    The issues are streamed in the order the frames were built in, so
+    their positions are the issue_index of the frames even if an issue
+    number appears twice.
+    """
+    counts = np.zeros(issue_count, dtype=np.int64)
+    assignees = []
+    for position, issue in enumerate(DataLoader().iter_issues(fields=['assignees'])):
+        counts[position] = len(issue.assignees)
+        assignees.extend(issue.assignees)
+    offsets = np.zeros(issue_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, assignees
+
+
+def build_graph() -> ContributorGraph:
+    """
+    Builds the interaction graph of the contributors of the dataset.
+    """
+    loader = DataLoader()
+    issues_df = loader.get_issues_frame()
+    events_df = loader.get_events_frame()
+    offsets, assignees = _assignees(len(issues_df))
+
+    authors = events_df['author'].array
+    creators = issues_df['creator'].array
+    contributors = pd.Index(authors.categories).union(pd.Index(creators.categories)).union(pd.Index(assignees).unique())
+    contributors = contributors[contributors.notna()]
+    author_codes = _codes(authors, contributors)
+    creator_codes = _codes(creators, contributors)
+    assignee_codes = contributors.get_indexer(pd.Index(assignees, dtype=object))
+    issue_index = events_df['issue_index'].to_numpy()
+
+    # Commenter -> creator
+    comments = (events_df['event_type'] == 'commented').to_numpy() & (author_codes >= 0)
+    sources = [author_codes[comments]]
+    targets = [creator_codes[issue_index[comments]]]
+
+    # Assigner -> each assignee of the issue
+    assignments = (events_df['event_type'] == 'assigned').to_numpy() & (author_codes >= 0)
+    starts, ends = offsets[issue_index[assignments]], offsets[issue_index[assignments] + 1]
+    counts = ends - starts
+    rows = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    sources.append(np.repeat(author_codes[assignments], counts))
+    targets.append(assignee_codes[rows])
+
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    known = (sources >= 0) & (targets >= 0)
+    return ContributorGraph(contributors.to_numpy(dtype=object), sources[known], targets[known])
+
+
+def get_graph() -> ContributorGraph:
+    """
+    Returns the interaction graph, memoized per version of the dataset
+    (see memo.py).
+    """
+    return memo.memoize('graph', build_graph)
+
+
+def print_report(top_n:int=10):
+    """
+    Prints the size of the interaction graph, its connected components
+    and the most central contributors by PageRank and by degree.
+    """
+    graph = get_graph()
+    component_count, components = graph.connected_components()
+    sizes = np.bincount(components, minlength=component_count)
+    print(f'{graph.node_count} contributors, {graph.edge_count} interactions between pairs of them '
+          f'({int(graph.weights.sum())} in total)')
+    print(f'{component_count} connected components, the largest with {sizes.max() if len(sizes) else 0} '
+          f'contributors, {int((sizes == 1).sum())} contributors without interactions')
+
+    pagerank, degree = graph.pagerank(), graph.degree()
+    in_degree, out_degree = graph.in_degree(), graph.out_degree()
+    print(f"\n{'No.':<4} | {'Contributor':<30} | {'PageRank':>9} | {'In':>6} | {'Out':>6}")
+    print('-' * 68)
+    for rank, i in enumerate(_top_positions(pagerank, top_n), start=1):
+        print(f'{rank:<4} | {graph.contributors[i]:<30} | {pagerank[i]:>9.5f} | '
+              f'{in_degree[i]:>6} | {out_degree[i]:>6}')
+
+    print(f'\nTop {top_n} contributors by degree:')
+    for contributor, score in graph.top(degree, top_n):
+        print(f'{contributor:<30} | {int(score):>6}')
@@ -0,0 +1,165 @@
+"""
+Implements secondary indexes over the columnar views of the issues
+(see frames.py) so that drill-downs to a specific author, event type,
+label or state only touch the matching rows instead of scanning
+the whole dataset.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def _positions_by_value(column:pd.Series) -> Dict[str, np.ndarray]:
+    """
+    Maps each value of a categorical column to the sorted row positions
+    holding that value. Missing values are not indexed.
+    """
+    codes = column.cat.codes.to_numpy()
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories))
+    # Rows with missing values (code -1) sort first and are skipped
+    start = len(codes) - counts.sum()
+    positions = {}
+    for value, count in zip(column.cat.categories, counts.tolist()):
+        if count > 0:
+            positions[value] = order[start:start + count]
+        start += count
+    return positions
+
+
+def _to_utc(value:datetime) -> pd.Timestamp:
+    """
+    Converts a date to a UTC timestamp, taking dates without a
+    timezone to be in UTC.
+    """
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def _intersect(candidates:List[np.ndarray]) -> np.ndarray:
+    """
+    Intersects sorted row positions, starting with the smallest set.
+    """
+    candidates = sorted(candidates, key=len)
+    result = candidates[0]
+    for other in candidates[1:]:
+        result = np.intersect1d(result, other, assume_unique=True)
+    return result
+
+
+class DatasetIndex:
+    """
+    Secondary indexes mapping authors, event types, labels and states
+    to positions in the issues and events frames.
+    """
+
+    def __init__(self, issues_df:pd.DataFrame, events_df:pd.DataFrame, labels_df:pd.DataFrame):
+        """
+        Constructor. Builds all indexes in a single pass over each frame.
+        """
+        self.issues_df:pd.DataFrame = issues_df
+        self.events_df:pd.DataFrame = events_df
+        self.events_by_author:Dict[str, np.ndarray] = _positions_by_value(events_df['author'])
+        self.events_by_event_type:Dict[str, np.ndarray] = _positions_by_value(events_df['event_type'])
+        self.issues_by_creator:Dict[str, np.ndarray] = _positions_by_value(issues_df['creator'])
+        self.issues_by_state:Dict[str, np.ndarray] = _positions_by_value(issues_df['state'])
+        label_issue_index = labels_df['issue_index'].to_numpy()
+        self.issues_by_label:Dict[str, np.ndarray] = {
+            label: np.unique(label_issue_index[rows])
+            for label, rows in _positions_by_value(labels_df['label']).items()
+        }
+        # Events are stored grouped by issue, so each issue owns a contiguous range of rows
+        self.event_offsets:np.ndarray = np.zeros(len(issues_df) + 1, dtype=np.int64)
+        np.cumsum(issues_df['event_count'].to_numpy(), out=self.event_offsets[1:])
+
+    def issue_positions(self, label:str=None, state:str=None, creator:str=None,
+                        since:datetime=None, until:datetime=None) -> np.ndarray:
+        """
+        Returns the positions of the issues matching all given filters.
+        since and until select the issues created in [since, until).
+        """
+        candidates = []
+        if since is not None or until is not None:
+            candidates.append(self._created_between(since, until))
+        if label is not None:
+            candidates.append(self.issues_by_label.get(label, np.empty(0, dtype=np.int64)))
+        if state is not None:
+            candidates.append(self.issues_by_state.get(state, np.empty(0, dtype=np.int64)))
+        if creator is not None:
+            candidates.append(self.issues_by_creator.get(creator, np.empty(0, dtype=np.int64)))
+        if not candidates:
+            return np.arange(len(self.issues_df))
+        return _intersect(candidates)
+
+    def event_positions(self, author:str=None, event_type:str=None, label:str=None,
+                        state:str=None, since:datetime=None, until:datetime=None) -> np.ndarray:
+        """
+        Returns the positions of the events matching all given filters.
+        Label, state, since and until filter on the issue the event belongs to.
+        """
+        candidates = []
+        if author is not None:
+            candidates.append(self.events_by_author.get(author, np.empty(0, dtype=np.int64)))
+        if event_type is not None:
+            candidates.append(self.events_by_event_type.get(event_type, np.empty(0, dtype=np.int64)))
+        if label is not None or state is not None or since is not None or until is not None:
+            issue_positions = self.issue_positions(label=label, state=state, since=since, until=until)
+            if candidates:
+                # Keep the candidate events whose issue matches
+                event_issue_index = self.events_df['issue_index'].to_numpy()
+                candidates = [rows[np.isin(event_issue_index[rows], issue_positions)] for rows in candidates]
+            else:
+                candidates.append(self._event_rows_of_issues(issue_positions))
+        if not candidates:
+            return np.arange(len(self.events_df))
+        return _intersect(candidates)
+
+    def _created_between(self, since:datetime, until:datetime) -> np.ndarray:
+        """
+        Returns the positions of the issues created in [since, until).
+        """
+        created = self.issues_df['created_date']
+        mask = created.notna().to_numpy()
+        if since is not None:
+            mask = mask & (created >= _to_utc(since)).to_numpy()
+        if until is not None:
+            mask = mask & (created < _to_utc(until)).to_numpy()
+        return np.flatnonzero(mask)
+
+    def _event_rows_of_issues(self, issue_positions:np.ndarray) -> np.ndarray:
+        """
+        Returns the event rows belonging to the given issues.
+        """
+        starts = self.event_offsets[issue_positions]
+        counts = self.event_offsets[issue_positions + 1] - starts
+        keep = counts > 0
+        starts, counts = starts[keep], counts[keep]
+        if len(counts) == 0:
+            return np.empty(0, dtype=np.int64)
+        # Expand each (start, count) pair into the range start..start+count-1
+        # with a cumulative sum over steps that jump to the next start
+        ends = np.cumsum(counts)
+        steps = np.ones(ends[-1], dtype=np.int64)
+        steps[0] = starts[0]
+        steps[ends[:-1]] = starts[1:] - (starts[:-1] + counts[:-1] - 1)
+        return np.cumsum(steps)
+
+    def issues(self, label:str=None, state:str=None, creator:str=None,
+               since:datetime=None, until:datetime=None) -> pd.DataFrame:
+        """
+        Returns the rows of the issues frame matching all given filters.
+        """
+        return self.issues_df.iloc[self.issue_positions(label=label, state=state, creator=creator,
+                                                        since=since, until=until)]
+
+    def events(self, author:str=None, event_type:str=None, label:str=None, state:str=None,
+               since:datetime=None, until:datetime=None) -> pd.DataFrame:
+        """
+        Returns the rows of the events frame matching all given filters.
+        """
+        return self.events_df.iloc[self.event_positions(author=author, event_type=event_type,
+                                                        label=label, state=state,
+                                                        since=since, until=until)]
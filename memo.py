@@ -0,0 +1,239 @@
+"""
+Memoizes the results of the analyses so that repeated queries (e.g., the
+same feature with the same --user and --label) do not recompute them.
+
+Results are keyed by the name of the analysis step, its parameters, the
+version of the dataset (see DataLoader.get_version) and the source code of
+the application (all of its modules, since results also depend on the
+helpers an analysis calls, e.g., resolution.py or frames.py), so merging a
+delta, replacing the data file or editing any module all lead to a
+recomputation. Results are kept in a
+bounded in-memory LRU cache (ENPM611_PROJECT_MEMO_SIZE entries) and, if a
+directory is configured (--memo-dir or ENPM611_PROJECT_MEMO_PATH), also
+pickled to that directory, which is pruned to the least recently used
+ENPM611_PROJECT_MEMO_DISK_SIZE files. The disk tier lets later runs skip
+loading the dataset altogether.
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import glob
+import hashlib
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+import config
+import profiling
+from data_loader import DataLoader
+
+T = TypeVar('T')
+
+_MEMO_SUFFIX:str = '.memo.pickle'
+
+# Hashes of the source of the application and the module computing results, by module name
+_CODE_VERSIONS:Dict[str, str] = {}
+
+
+class LRUCache:
+    """
+    Mapping that holds at most max_entries items and evicts the least
+    recently used item when full.
+    """
+
+    def __init__(self, max_entries:int):
+        """
+        Constructor
+        """
+        self.max_entries:int = max_entries
+        self._items:OrderedDict = OrderedDict()
+
+    def get(self, key:Hashable, default=None):
+        """
+        Returns the item for the key (marking it as most recently used),
+        or default if there is none.
+        """
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key:Hashable, value):
+        """
+        Stores the item, evicting the least recently used items if needed.
+        """
+        if self.max_entries <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def __contains__(self, key:Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# In-memory tier, created on first use so that its size can be configured
+_MEMORY:LRUCache = None
+
+
+def _get_memory() -> LRUCache:
+    global _MEMORY
+    if _MEMORY is None:
+        _MEMORY = LRUCache(int(config.get_parameter('ENPM611_PROJECT_MEMO_SIZE', 128)))
+    return _MEMORY
+
+
+def get_memo_path() -> str:
+    """
+    Returns the directory of the disk tier, or None if it is disabled.
+    """
+    return config.get_parameter('memo_dir') or config.get_parameter('ENPM611_PROJECT_MEMO_PATH')
+
+
+def _code_version(compute:Callable) -> str:
+    """
+    Hashes the source files of the application, along with the module
+    defining compute if it lives elsewhere, so that results are recomputed
+    after the analysis or any module it depends on was changed.
+    """
+    module_name = compute.__module__
+    if module_name not in _CODE_VERSIONS:
+        paths = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py')))
+        path = getattr(sys.modules.get(module_name), '__file__', None)
+        if path is not None and os.path.isfile(path) and os.path.abspath(path) not in paths:
+            paths.append(os.path.abspath(path))
+        digest = hashlib.sha1()
+        for path in paths:
+            digest.update(os.path.basename(path).encode('utf-8'))
+            with open(path, 'rb') as fin:
+                digest.update(fin.read())
+        _CODE_VERSIONS[module_name] = digest.hexdigest()
+    return _CODE_VERSIONS[module_name]
+
+
+def _read_disk(path:str):
+    """
+    Returns the result pickled at path, or raises KeyError if there is
+    none or it cannot be read.
+    """
+    try:
+        with open(path, 'rb') as fin:
+            value = pickle.load(fin)
+    except FileNotFoundError:
+        raise KeyError(path)
+    except Exception as e:
+        logger.warning(f'Ignoring unreadable memo {path}: {e}')
+        raise KeyError(path)
+    # The modification time tracks the last use for pruning
+    os.utime(path)
+    return value
+
+
+def _write_disk(memo_path:str, path:str, value):
+    """
+    Pickles the result to path and prunes the directory. Failing to write
+    (e.g., for results that cannot be pickled) is logged but otherwise ignored.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(memo_path, exist_ok=True)
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(value, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        _prune_disk(memo_path, int(config.get_parameter('ENPM611_PROJECT_MEMO_DISK_SIZE', 1024)))
+    except (OSError, pickle.PicklingError, AttributeError, TypeError) as e:
+        logger.warning(f'Could not write memo {path}: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _prune_disk(memo_path:str, max_entries:int):
+    """
+    Removes the least recently used results beyond max_entries.
+    """
+    entries = [entry for entry in os.scandir(memo_path) if entry.name.endswith(_MEMO_SUFFIX)]
+    if len(entries) <= max_entries:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def make_key(name:str, compute:Callable[..., T], params:Dict[str, any]) -> tuple:
+    """
+    Returns the key of the result of compute(**params).
+    """
+    return (name, DataLoader().get_version(), _code_version(compute), tuple(sorted(params.items())))
+
+
+def _get_disk_path(key:tuple) -> str:
+    memo_path = get_memo_path()
+    if memo_path is None:
+        return None
+    return os.path.join(memo_path, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + _MEMO_SUFFIX)
+
+
+def lookup(key:tuple) -> Tuple[bool, any]:
+    """
+    Looks the result up in memory, then on disk. Returns whether it
+    was found and the result.
+    """
+    memory = _get_memory()
+    if key in memory:
+        return True, memory.get(key)
+    path = _get_disk_path(key)
+    if path is not None:
+        try:
+            with profiling.span(f'memo {key[0]}'):
+                value = _read_disk(path)
+            memory.put(key, value)
+            return True, value
+        except KeyError:
+            pass
+    return False, None
+
+
+def store(key:tuple, value):
+    """
+    Keeps the result in memory and, if configured, on disk.
+    """
+    _get_memory().put(key, value)
+    path = _get_disk_path(key)
+    if path is not None:
+        _write_disk(os.path.dirname(path), path, value)
+
+
+def memoize(name:str, compute:Callable[..., T], **params) -> T:
+    """
+    Returns the result of compute(**params), which must only depend on the
+    dataset and the given parameters (e.g., user=..., label=...). The result
+    is looked up in memory, then on disk, and only computed if neither has
+    it. Callers must not modify the returned result since it is shared.
+    """
+    key = make_key(name, compute, params)
+    found, value = lookup(key)
+    if not found:
+        with profiling.span(f'compute {name}'):
+            value = compute(**params)
+        store(key, value)
+    return value
+
+
+def clear():
+    """
+    Drops the results held in memory, e.g., in tests or benchmarks.
+    """
+    _get_memory().clear()
@@ -1,13 +1,23 @@
 """
 Implements a runtime data model that can be used to access
 the properties contained in the issues JSON.
+
+Issues can also be loaded lazily (see LazyIssue) for analyses that only
+need some of their fields: the declared fields are decoded up front and
+the others only when they are first accessed, e.g., the bodies and
+comments that make up most of the data file.
 """
 
-from typing import List, Dict, Set, Tuple
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
 from enum import Enum
 from datetime import datetime
+import json
+import os
+import sys
 from dateutil import parser
 
+import profiling
+
 
 class State(str, Enum):
     """
@@ -17,7 +27,115 @@ class State(str, Enum):
     closed = 'closed'
 
 
+class DateParser:
+    """
+    Parses the timestamps of the data file. The GitHub export uses ISO-8601
+    throughout, which is handled by the fast datetime.fromisoformat path.
+    Anything else falls back to the much slower dateutil parser. The number
+    of values parsed by each path is counted so that it can be reported.
+    """
+
+    def __init__(self):
+        self.fast_count:int = 0
+        self.fallback_count:int = 0
+        self.failed_count:int = 0
+
+    def parse(self, value:str) -> datetime:
+        """
+        Parses a timestamp string, returning None for missing or
+        unparseable values.
+        """
+        if value is None:
+            return None
+        # Checked here since this runs for every timestamp of the data file
+        if profiling.ENABLED:
+            with profiling.span('parse dates'):
+                return self._parse(value)
+        return self._parse(value)
+
+    def _parse(self, value:str) -> datetime:
+        try:
+            result = datetime.fromisoformat(value)
+            self.fast_count += 1
+            return result
+        except (TypeError, ValueError):
+            pass
+        try:
+            result = parser.parse(value)
+            self.fallback_count += 1
+            return result
+        except (TypeError, ValueError, OverflowError):
+            self.failed_count += 1
+            return None
+
+    def reset(self):
+        """
+        Resets the counters, e.g., before loading another file.
+        """
+        self.fast_count = 0
+        self.fallback_count = 0
+        self.failed_count = 0
+
+    def summary(self) -> str:
+        """
+        Describes how the parsed timestamps were handled.
+        """
+        return (f'{self.fast_count} timestamps parsed as ISO-8601, '
+                f'{self.fallback_count} fell back to dateutil, '
+                f'{self.failed_count} could not be parsed')
+
+
+# Shared parser so that the counts cover everything that was loaded
+DATE_PARSER = DateParser()
+
+
+def intern(value:str) -> str:
+    """
+    Interns strings that repeat across many issues and events (event types,
+    authors, labels) so that every occurrence shares a single object.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def _restore_event(event_type, author, event_date, label, comment):
+    """
+    Recreates a pickled Event (see Event.__reduce__).
+    """
+    event = Event.__new__(Event)
+    event.event_type = event_type
+    event.author = author
+    event.event_date = event_date
+    event.label = label
+    event.comment = comment
+    return event
+
+
+def _restore_issue(url, creator, labels, state, assignees, title, text, number,
+                   created_date, updated_date, timeline_url, events):
+    """
+    Recreates a pickled Issue (see Issue.__reduce__).
+    """
+    issue = Issue.__new__(Issue)
+    issue.url = url
+    issue.creator = creator
+    issue.labels = labels
+    issue.state = state
+    issue.assignees = assignees
+    issue.title = title
+    issue.text = text
+    issue.number = number
+    issue.created_date = created_date
+    issue.updated_date = updated_date
+    issue.timeline_url = timeline_url
+    issue.events = events
+    return issue
+
+
 class Event:
+    # Slots avoid a per-instance __dict__, which dominates memory with millions of events
+    __slots__ = ('event_type', 'author', 'event_date', 'label', 'comment')
     
     def __init__(self, jobj:any):
         self.event_type:str = None
@@ -28,19 +146,24 @@ class Event:
         
         if jobj is not None:
             self.from_json(jobj)
+
+    def __reduce__(self):
+        # Pickles as a plain tuple, which is much cheaper to transfer
+        # between processes than the generic slots protocol
+        return (_restore_event, (self.event_type, self.author, self.event_date,
+                                 self.label, self.comment))
     
     def from_json(self, jobj:any):
-        self.event_type = jobj.get('event_type')
-        self.author = jobj.get('author')
-        try:
-            self.event_date = parser.parse(jobj.get('event_date'))
-        except:
-            pass
-        self.label = jobj.get('label')
+        self.event_type = intern(jobj.get('event_type'))
+        self.author = intern(jobj.get('author'))
+        self.event_date = DATE_PARSER.parse(jobj.get('event_date'))
+        self.label = intern(jobj.get('label'))
         self.comment = jobj.get('comment')
         
         
 class Issue:
+    __slots__ = ('url', 'creator', 'labels', 'state', 'assignees', 'title', 'text',
+                 'number', 'created_date', 'updated_date', 'timeline_url', 'events')
     
     def __init__(self, jobj:any=None):
         self.url:str = None
@@ -58,26 +181,268 @@ class Issue:
         
         if jobj is not None:
             self.from_json(jobj)
+
+    def __reduce__(self):
+        # See Event.__reduce__
+        return (_restore_issue, (self.url, self.creator, self.labels, self.state, self.assignees,
+                                 self.title, self.text, self.number, self.created_date,
+                                 self.updated_date, self.timeline_url, self.events))
     
     def from_json(self, jobj:any):
         self.url = jobj.get('url')
-        self.creator = jobj.get('creator')
-        self.labels = jobj.get('labels',[])
+        self.creator = intern(jobj.get('creator'))
+        self.labels = [intern(label) for label in jobj.get('labels',[])]
         self.state = State[jobj.get('state')]
-        self.assignees = jobj.get('assignees',[])
+        self.assignees = [intern(assignee) for assignee in jobj.get('assignees',[])]
         self.title = jobj.get('title')
         self.text = jobj.get('text')
         try:
             self.number = int(jobj.get('number','-1'))
         except:
             pass
+        self.created_date = DATE_PARSER.parse(jobj.get('created_date'))
+        self.updated_date = DATE_PARSER.parse(jobj.get('updated_date'))
+        self.timeline_url = jobj.get('timeline_url')
+        self.events = [Event(jevent) for jevent in jobj.get('events',[])]
+
+
+# Declares the comments of the events, which are otherwise decoded on access
+# even when the events are declared
+COMMENTS:str = 'comments'
+
+# Fields that can be declared when loading issues lazily
+FIELDS:FrozenSet[str] = frozenset(Issue.__slots__) | {COMMENTS}
+
+
+def declared_fields(fields:Iterable[str]) -> FrozenSet[str]:
+    """
+    Validates the fields declared by an analysis. Declaring the comments
+    declares the events as well.
+    """
+    fields = frozenset(fields)
+    unknown = fields - FIELDS
+    if unknown:
+        raise ValueError(f'Unknown fields {", ".join(sorted(unknown))}, expected some of {", ".join(sorted(FIELDS))}')
+    return fields | {'events'} if COMMENTS in fields else fields
+
+
+def event_fields(fields:FrozenSet[str]) -> Tuple[str, ...]:
+    """
+    Returns the attributes of the events decoded up front for the declared fields.
+    """
+    return tuple(name for name in Event.__slots__ if name != 'comment' or COMMENTS in fields)
+
+
+def _parse_number(jobj:any) -> int:
+    try:
+        return int(jobj.get('number','-1'))
+    except:
+        return -1
+
+
+# Decodes each attribute from the JSON object, like Issue.from_json and Event.from_json
+_ISSUE_PARSERS:Dict[str, Any] = {
+    'url': lambda jobj: jobj.get('url'),
+    'creator': lambda jobj: intern(jobj.get('creator')),
+    'labels': lambda jobj: [intern(label) for label in jobj.get('labels',[])],
+    'state': lambda jobj: State[jobj.get('state')],
+    'assignees': lambda jobj: [intern(assignee) for assignee in jobj.get('assignees',[])],
+    'title': lambda jobj: jobj.get('title'),
+    'text': lambda jobj: jobj.get('text'),
+    'number': _parse_number,
+    'created_date': lambda jobj: DATE_PARSER.parse(jobj.get('created_date')),
+    'updated_date': lambda jobj: DATE_PARSER.parse(jobj.get('updated_date')),
+    'timeline_url': lambda jobj: jobj.get('timeline_url'),
+}
+_EVENT_PARSERS:Dict[str, Any] = {
+    'event_type': lambda jobj: intern(jobj.get('event_type')),
+    'author': lambda jobj: intern(jobj.get('author')),
+    'event_date': lambda jobj: DATE_PARSER.parse(jobj.get('event_date')),
+    'label': lambda jobj: intern(jobj.get('label')),
+    'comment': lambda jobj: jobj.get('comment'),
+}
+
+
+def _loaded_values(obj:any, cls:type) -> Dict[str, any]:
+    """
+    Returns the attributes of obj that have been decoded, without
+    decoding the others.
+    """
+    values = {}
+    for name in cls.__slots__:
         try:
-            self.created_date = parser.parse(jobj.get('created_date'))
-        except:
-            pass
-        try:
-            self.updated_date = parser.parse(jobj.get('updated_date'))
-        except:
+            # The slot descriptor raises instead of falling back to __getattr__
+            values[name] = getattr(cls, name).__get__(obj)
+        except AttributeError:
             pass
-        self.timeline_url = jobj.get('timeline_url')
-        self.events = [Event(jevent) for jevent in jobj.get('events',[])]
\ No newline at end of file
+    return values
+
+
+def _restore_lazy(cls:type, source:any, key:any, values:Dict[str, any]):
+    """
+    Recreates a pickled LazyIssue or LazyEvent (see LazyIssue.__reduce__).
+    """
+    obj = cls.from_source(source, key)
+    for name, value in values.items():
+        setattr(obj, name, value)
+    return obj
+
+
+class LazyEvent(Event):
+    """
+    Event whose attributes are decoded from its source on first access.
+    """
+    __slots__ = ('_source', '_key')
+
+    @classmethod
+    def from_source(cls, source:any, key:any, fields:Iterable[str]=()) -> 'LazyEvent':
+        """
+        Creates the event stored under key in the source (see
+        JsonSource), decoding the given attributes right away.
+        """
+        event = cls.__new__(cls)
+        event._source = source
+        event._key = key
+        for name in fields:
+            setattr(event, name, source.event_field(key, name))
+        return event
+
+    def __getattr__(self, name:str):
+        # Only called for attributes that are not set yet
+        if name not in Event.__slots__:
+            raise AttributeError(name)
+        value = self._source.event_field(self._key, name)
+        setattr(self, name, value)
+        return value
+
+    def __reduce__(self):
+        # Attributes that were not decoded stay lazy
+        return (_restore_lazy, (LazyEvent, self._source, self._key, _loaded_values(self, Event)))
+
+
+class LazyIssue(Issue):
+    """
+    Issue whose fields are decoded from its source on first access, so
+    loading it only costs the fields an analysis declared.
+    """
+    __slots__ = ('_source', '_key')
+
+    @classmethod
+    def from_source(cls, source:any, key:any, fields:Iterable[str]=()) -> 'LazyIssue':
+        """
+        Creates the issue stored under key in the source (see JsonSource),
+        decoding the given fields right away.
+        """
+        issue = cls.__new__(cls)
+        issue._source = source
+        issue._key = key
+        for name in fields:
+            setattr(issue, name, source.issue_field(key, name))
+        return issue
+
+    def __getattr__(self, name:str):
+        # See LazyEvent.__getattr__
+        if name not in Issue.__slots__:
+            raise AttributeError(name)
+        value = self._source.issue_field(self._key, name)
+        setattr(self, name, value)
+        return value
+
+    def __reduce__(self):
+        # See LazyEvent.__reduce__
+        return (_restore_lazy, (LazyIssue, self._source, self._key, _loaded_values(self, Issue)))
+
+
+class JsonSource:
+    """
+    Decodes the fields of lazy issues and events from the data file. The
+    key of an issue is the (start, end) byte span of its JSON object in
+    the file and the key of an event is the span of its issue and its
+    position among the events, so fields that were not declared (e.g., the
+    text and comments) are not held in memory but read again on access.
+    """
+
+    def __init__(self, data_path:str, fields:FrozenSet[str]):
+        """
+        Constructor. fields are the declared fields (see declared_fields).
+        """
+        self.data_path:str = data_path
+        self.fields:FrozenSet[str] = fields
+        self.issue_fields:Tuple[str, ...] = tuple(name for name in Issue.__slots__ if name in fields)
+        self.event_fields:Tuple[str, ...] = event_fields(fields)
+        # Resolved once since this runs for every issue and event
+        self._issue_parsers = [(name, _ISSUE_PARSERS[name]) for name in self.issue_fields if name != 'events']
+        self._event_parsers = [(name, _EVENT_PARSERS[name]) for name in self.event_fields]
+        # Spans only stay valid as long as the data file does not change
+        self._version:Tuple[int, int] = self._stat()
+        # Last object read back, since fields of an issue tend to be accessed together
+        self._last:Tuple[Tuple[int, int], any] = (None, None)
+
+    def __reduce__(self):
+        # The parsers are looked up again rather than pickled
+        return (_restore_json_source, (self.data_path, self.fields, self._version))
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.data_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _read(self, span:Tuple[int, int]) -> any:
+        """
+        Decodes the JSON object stored at the byte span of the data file.
+        """
+        last_span, jobj = self._last
+        if last_span == span:
+            return jobj
+        if self._stat() != self._version:
+            raise RuntimeError(f'{self.data_path} changed while its issues were in use')
+        start, end = span
+        with open(self.data_path, 'rb') as fin:
+            fin.seek(start)
+            jobj = json.loads(fin.read(end - start))
+        self._last = (span, jobj)
+        return jobj
+
+    def issue(self, jobj:any, span:Tuple[int, int]) -> LazyIssue:
+        """
+        Creates the lazy issue of a JSON object read from the byte span of
+        the data file. Only the declared fields are kept.
+        """
+        issue = LazyIssue.__new__(LazyIssue)
+        issue._source = self
+        issue._key = span
+        for name, parse in self._issue_parsers:
+            setattr(issue, name, parse(jobj))
+        if 'events' in self.issue_fields:
+            issue.events = self._events(jobj, span)
+        return issue
+
+    def _events(self, jobj:any, span:Tuple[int, int]) -> List[LazyEvent]:
+        events = []
+        for index, jevent in enumerate(jobj.get('events',[])):
+            event = LazyEvent.__new__(LazyEvent)
+            event._source = self
+            event._key = (span, index)
+            for name, parse in self._event_parsers:
+                setattr(event, name, parse(jevent))
+            events.append(event)
+        return events
+
+    def issue_field(self, span:Tuple[int, int], name:str) -> any:
+        jobj = self._read(span)
+        if name == 'events':
+            return self._events(jobj, span)
+        return _ISSUE_PARSERS[name](jobj)
+
+    def event_field(self, key:Tuple[Tuple[int, int], int], name:str) -> any:
+        span, index = key
+        return _EVENT_PARSERS[name](self._read(span)['events'][index])
+
+
+def _restore_json_source(data_path:str, fields:FrozenSet[str], version:Tuple[int, int]) -> JsonSource:
+    """
+    Recreates a pickled JsonSource (see JsonSource.__reduce__), keeping the
+    version of the data file its spans were read from.
+    """
+    source = JsonSource(data_path, fields)
+    source._version = version
+    return source
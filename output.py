@@ -0,0 +1,104 @@
+"""
+Handles the output of the figures produced by the analyses. By default,
+figures are shown in a window. If an output directory is configured
+(--output or ENPM611_PROJECT_OUTPUT_PATH), the application runs headless:
+the non-GUI Agg backend is used and every figure is written to a PNG file
+in that directory. Headless rendering can optionally be farmed out to a
+pool of worker processes (--render-workers).
+"""
+
+import os
+from typing import Callable, List
+
+import config
+import profiling
+
+# Pool rendering figures in headless mode, created on first use
+_POOL:'ProcessPoolExecutor' = None
+
+# Figures submitted to the pool that have not been waited for yet
+_PENDING:List['Future'] = []
+
+
+def get_output_path() -> str:
+    """
+    Returns the directory figures are written to, or None if figures
+    should be shown interactively.
+    """
+    return config.get_parameter('output') or config.get_parameter('ENPM611_PROJECT_OUTPUT_PATH')
+
+
+def is_headless() -> bool:
+    """
+    Whether figures are written to files instead of being shown.
+    """
+    return get_output_path() is not None
+
+
+def configure():
+    """
+    Selects the non-GUI backend in headless mode so that no GUI toolkit
+    is imported. This has to happen before the first figure is created.
+    """
+    if is_headless():
+        # matplotlib is imported lazily since it is slow to import
+        import matplotlib
+        matplotlib.use('Agg')
+
+
+def _render_to_file(path:str, plot:Callable[..., None], args:tuple):
+    """
+    Draws a figure and writes it to a file. This may run in a worker process.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plot(*args)
+    plt.savefig(path)
+    plt.close('all')
+
+
+def render(name:str, plot:Callable[..., None], *args):
+    """
+    Draws a figure by calling plot(*args), which should only use plain data
+    passed in as arguments. The figure is shown, or written to <name>.png in
+    the output directory in headless mode. With more than one render worker,
+    headless figures are drawn in a worker process, in which case plot has
+    to be a module-level function.
+    """
+    with profiling.span(f'render {name}'):
+        _render(name, plot, args)
+
+
+def _render(name:str, plot:Callable[..., None], args:tuple):
+    configure()
+    import matplotlib.pyplot as plt
+    output_path = get_output_path()
+    if output_path is None:
+        plot(*args)
+        plt.show()
+        return
+
+    os.makedirs(output_path, exist_ok=True)
+    path = os.path.join(output_path, f'{name}.png')
+    workers = int(config.get_parameter('render_workers')
+                  or config.get_parameter('ENPM611_PROJECT_RENDER_WORKERS', 1))
+    if workers > 1:
+        global _POOL
+        if _POOL is None:
+            from concurrent.futures import ProcessPoolExecutor
+            _POOL = ProcessPoolExecutor(max_workers=workers, initializer=config.install,
+                                        initargs=(config.get_snapshot(),))
+        _PENDING.append(_POOL.submit(_render_to_file, path, plot, args))
+    else:
+        _render_to_file(path, plot, args)
+    print(f'Writing figure to {path}')
+
+
+def wait():
+    """
+    Waits for the figures still being rendered by worker processes and
+    raises the first error that occurred while rendering them.
+    """
+    while _PENDING:
+        _PENDING.pop(0).result()
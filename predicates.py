@@ -0,0 +1,103 @@
+"""
+Predicates selecting issues by creator, label, state and creation or
+update date, which the loader pushes down (see DataLoader.iter_issues
+and DataLoader.get_index): with the cache they are evaluated on the
+stored columns so that only the rows of the matching issues and their
+events are read, and when parsing the data file they are checked on the
+decoded JSON before any Issue or Event is built. Selective runs thus cost
+in proportion to the issues they select.
+
+Date bounds select [since, until), and dates without a timezone are taken
+to be in UTC. The creation date range can be given on the command line:
+
+    python run.py --feature 2 --since 2024-01-01 --until 2024-07-01
+"""
+
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import config
+from model import DATE_PARSER, Issue
+
+
+def as_utc(value:datetime) -> datetime:
+    """
+    Converts a date to UTC, taking dates without a timezone to be in UTC.
+    """
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _between(value:datetime, since:datetime, until:datetime) -> bool:
+    """
+    Whether the date is in [since, until), either bound being optional.
+    """
+    if since is None and until is None:
+        return True
+    if value is None:
+        return False
+    value = as_utc(value)
+    return (since is None or value >= as_utc(since)) and (until is None or value < as_utc(until))
+
+
+def get_date_parameter(name:str) -> datetime:
+    """
+    Returns a date config parameter (e.g., --since), given as ISO-8601,
+    or None if it is not set.
+    """
+    value = config.get_parameter(name)
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+class IssuePredicate(NamedTuple):
+    """
+    Selects the issues matching all of the given conditions.
+    """
+    creator: str = None
+    label: str = None
+    # 'open' or 'closed'
+    state: str = None
+    created_since: datetime = None
+    created_until: datetime = None
+    updated_since: datetime = None
+    updated_until: datetime = None
+
+    def is_empty(self) -> bool:
+        """
+        Whether the predicate selects all issues.
+        """
+        return all(condition is None for condition in self)
+
+    def matches(self, issue:Issue) -> bool:
+        """
+        Whether the issue is selected.
+        """
+        if self.creator is not None and issue.creator != self.creator:
+            return False
+        if self.label is not None and self.label not in issue.labels:
+            return False
+        if self.state is not None and (issue.state is None or issue.state.value != self.state):
+            return False
+        return (_between(issue.created_date, self.created_since, self.created_until)
+                and _between(issue.updated_date, self.updated_since, self.updated_until))
+
+    def matches_json(self, jobj:any) -> bool:
+        """
+        Whether the issue decoded from the data file is selected, only
+        parsing the dates that are bounded.
+        """
+        if self.creator is not None and jobj.get('creator') != self.creator:
+            return False
+        if self.label is not None and self.label not in jobj.get('labels',[]):
+            return False
+        if self.state is not None and jobj.get('state') != self.state:
+            return False
+        for name, since, until in (('created_date', self.created_since, self.created_until),
+                                   ('updated_date', self.updated_since, self.updated_until)):
+            if (since is not None or until is not None) and not _between(DATE_PARSER.parse(jobj.get(name)),
+                                                                          since, until):
+                return False
+        return True
@@ -0,0 +1,189 @@
+"""
+Lightweight instrumentation of the application's hot paths. Code marks
+a phase with a span:
+
+    with profiling.span('build frames'):
+        ...
+
+While profiling is enabled (--profile or ENPM611_PROJECT_PROFILE), every
+span records its number of calls, wall time, CPU time and the net memory
+allocated (via tracemalloc), keyed by the path of enclosing spans. At the
+end of the run, report() prints the spans as a tree and optionally writes
+a cProfile dump (--profile-output) that can be inspected with pstats or
+turned into a flame graph (e.g., with snakeviz or flameprof).
+
+While profiling is disabled, span() returns a shared no-op context
+manager, so spans can stay in place in the hot paths. Spans must not be
+held open across a yield since they are tracked on a stack.
+"""
+
+import contextlib
+import time
+import tracemalloc
+from typing import Dict, List, Set, Tuple
+
+import config
+
+# Whether spans are recorded
+ENABLED:bool = False
+
+# Statistics [calls, wall time, CPU time, allocated bytes] by span path,
+# in the order the spans were first entered
+_STATS:Dict[Tuple[str, ...], List[float]] = {}
+
+# Paths of the spans merged from other processes, whose time overlaps
+# rather than adds up to the time of the span they were merged below
+_PARALLEL:Set[Tuple[str, ...]] = set()
+
+# Names of the spans currently open
+_STACK:List[str] = []
+
+# Profiler started by configure() if a cProfile dump was requested
+_PROFILER:'cProfile.Profile' = None
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    """
+    Records the resources used between entering and exiting a span.
+    """
+    __slots__ = ('name', 'path', 'wall', 'cpu', 'memory')
+
+    def __init__(self, name:str):
+        self.name:str = name
+
+    def __enter__(self):
+        _STACK.append(self.name)
+        self.path = tuple(_STACK)
+        if self.path not in _STATS:
+            _STATS[self.path] = [0, 0.0, 0.0, 0]
+        self.memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        memory = tracemalloc.get_traced_memory()[0] - self.memory if tracemalloc.is_tracing() else 0
+        _STACK.pop()
+        stats = _STATS[self.path]
+        stats[0] += 1
+        stats[1] += wall
+        stats[2] += cpu
+        stats[3] += memory
+        return False
+
+
+def span(name:str):
+    """
+    Returns a context manager recording the resources used by the
+    enclosed code under the given name, if profiling is enabled.
+    """
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def enable(track_allocations:bool=True):
+    """
+    Starts recording spans, discarding any recorded or open before (e.g.,
+    those inherited by a forked worker process). Tracking allocations
+    slows down allocation-heavy code such as loading.
+    """
+    global ENABLED
+    ENABLED = True
+    _STATS.clear()
+    _STACK.clear()
+    _PARALLEL.clear()
+    if track_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def collect() -> Dict[Tuple[str, ...], List[float]]:
+    """
+    Returns the recorded statistics, e.g., to send them from a
+    worker process to the main process.
+    """
+    return dict(_STATS)
+
+
+def merge(stats:Dict[Tuple[str, ...], List[float]]):
+    """
+    Adds statistics recorded elsewhere (e.g., in a worker process)
+    below the spans currently open. Their outermost spans are marked as
+    parallel, as they ran alongside the spans currently open.
+    """
+    prefix = tuple(_STACK)
+    for path, values in stats.items():
+        if len(path) == 1:
+            _PARALLEL.add(prefix + path)
+        totals = _STATS.setdefault(prefix + path, [0, 0.0, 0.0, 0])
+        for i, value in enumerate(values):
+            totals[i] += value
+
+
+def is_configured() -> bool:
+    """
+    Whether profiling was requested on the command line or in the config.
+    """
+    return bool(config.get_parameter('profile') or config.get_parameter('profile_output')
+                or config.get_parameter('ENPM611_PROJECT_PROFILE'))
+
+
+def configure():
+    """
+    Enables profiling if it was requested, and starts cProfile if a
+    profile output file is configured.
+    """
+    global _PROFILER
+    if not is_configured():
+        return
+    enable()
+    if config.get_parameter('profile_output'):
+        import cProfile
+        _PROFILER = cProfile.Profile()
+        _PROFILER.enable()
+
+
+def report():
+    """
+    Prints the recorded spans as a tree and writes the cProfile dump, if
+    profiling is enabled. The self time of a span is the part of its wall
+    time not covered by the spans nested in it. Spans merged from worker
+    processes are marked as parallel and are not subtracted, since their
+    summed wall time overlaps that of their parent.
+    """
+    if not ENABLED:
+        return
+    if _PROFILER is not None:
+        _PROFILER.disable()
+        path = config.get_parameter('profile_output')
+        _PROFILER.dump_stats(path)
+        print(f'Writing cProfile stats to {path}')
+
+    child_wall:Dict[Tuple[str, ...], float] = {}
+    for path, stats in _STATS.items():
+        if len(path) > 1 and path not in _PARALLEL:
+            child_wall[path[:-1]] = child_wall.get(path[:-1], 0.0) + stats[1]
+
+    print(f"\n{'Span':<40} | {'Calls':>8} | {'Wall (s)':>8} | {'Self (s)':>8} | {'CPU (s)':>8} | {'Alloc (MB)':>10}")
+    print('-' * 97)
+    # Children are listed below their parent, in the order they were first entered
+    for path in sorted(_STATS, key=_tree_order()):
+        calls, wall, cpu, memory = _STATS[path]
+        name = '  ' * (len(path) - 1) + path[-1] + (' (parallel)' if path in _PARALLEL else '')
+        self_wall = max(wall - child_wall.get(path, 0.0), 0.0)
+        print(f'{name:<40} | {calls:>8} | {wall:>8.3f} | {self_wall:>8.3f} '
+              f'| {cpu:>8.3f} | {memory / (1 << 20):>10.1f}')
+
+
+def _tree_order():
+    """
+    Returns a sort key listing each span after its parent, with siblings
+    in the order they were first recorded.
+    """
+    first_seen = {path: i for i, path in enumerate(_STATS)}
+
+    def key(path:Tuple[str, ...]) -> List[int]:
+        return [first_seen.get(path[:depth], -1) for depth in range(1, len(path) + 1)]
+    return key
@@ -0,0 +1,137 @@
+"""
+Vectorized computation of how long issues take to reach events (e.g., their
+first labeling or assignment) and to be resolved, over the columnar frames
+of the dataset (see frames.py). The time to the first event of each type is
+computed for all issues in one pass with a groupby-min over the events,
+instead of scanning the events of each issue, so it scales to millions of
+events. The resulting durations can be summarized with percentiles and
+related to the resolution time with binned correlations.
+
+Durations are in days. With whole_days (the default), they are rounded
+down to whole days like Timedelta.days.
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Resolution time column of the frame returned by time_to_first_event
+RESOLUTION_TIME:str = 'resolution_time'
+
+_DAY_NS:int = 24 * 3600 * 10**9
+
+DEFAULT_PERCENTILES:Sequence[float] = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def _to_days(durations_ns:np.ndarray, whole_days:bool) -> np.ndarray:
+    """
+    Converts durations in nanoseconds (NaN if missing) to days.
+    """
+    days = durations_ns / _DAY_NS
+    return np.floor(days) if whole_days else days
+
+
+def _timestamps_ns(dates:pd.Series) -> np.ndarray:
+    """
+    Returns the dates (datetime64 in UTC) as nanoseconds since the epoch,
+    with NaN for missing dates.
+    """
+    values = dates.to_numpy(dtype='datetime64[ns]').view(np.int64).astype(np.float64)
+    values[dates.isna().to_numpy()] = np.nan
+    return values
+
+
+def time_to_first_event(issues_df:pd.DataFrame, events_df:pd.DataFrame, event_types:Sequence[str],
+                        whole_days:bool=True) -> pd.DataFrame:
+    """
+    Returns, for each issue of issues_df (a selection of the rows of the
+    issues frame) that has a creation date, its resolution time (from its
+    creation to its last update) and the time from its creation to its
+    first event of each of the event_types (NaN if it has none), one
+    column per event type.
+    events_df is (a selection of the rows of) the events frame, whose
+    issue_index refers to the rows of the issues frame.
+    """
+    issues_df = issues_df[issues_df['created_date'].notna()]
+    created = _timestamps_ns(issues_df['created_date'])
+    result = pd.DataFrame({
+        RESOLUTION_TIME: _to_days(_timestamps_ns(issues_df['updated_date']) - created, whole_days),
+    }, index=issues_df.index)
+    if len(event_types) == 0:
+        return result
+
+    # One key per (issue, event type), so a single groupby-min finds all first events
+    type_codes = pd.Categorical(events_df['event_type'], categories=list(event_types)).codes
+    selected = (type_codes >= 0) & events_df['event_date'].notna().to_numpy()
+    rows = issues_df.index.get_indexer(events_df['issue_index'].to_numpy()[selected])
+    type_codes = type_codes[selected][rows >= 0]
+    dates = events_df['event_date'].to_numpy(dtype='datetime64[ns]').view(np.int64)[selected][rows >= 0]
+    rows = rows[rows >= 0]
+    keys = rows.astype(np.int64) * len(event_types) + type_codes
+    first_dates = pd.Series(dates).groupby(keys).min()
+
+    first = np.full(len(issues_df) * len(event_types), np.nan)
+    first[first_dates.index.to_numpy()] = first_dates.to_numpy()
+    first = first.reshape(len(issues_df), len(event_types))
+    for column, event_type in enumerate(event_types):
+        result[event_type] = _to_days(first[:, column] - created, whole_days)
+    return result
+
+
+def percentiles(durations_df:pd.DataFrame, levels:Sequence[float]=DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """
+    Returns, for each column of durations (e.g., from time_to_first_event),
+    the number of issues with a value and the given percentiles (as
+    fractions) of the values.
+    """
+    summary = durations_df.quantile(list(levels)).T
+    summary.columns = [f'p{level * 100:g}' for level in levels]
+    summary.insert(0, 'count', durations_df.notna().sum())
+    return summary
+
+
+def correlation(x:pd.Series, y:pd.Series) -> Dict[str, float]:
+    """
+    Returns the Pearson and Spearman (rank) correlations between x and
+    y over the rows where both have a value.
+    """
+    both = x.notna() & y.notna()
+    x, y = x[both], y[both]
+    # Correlations are undefined if either has a single value
+    if x.nunique() < 2 or y.nunique() < 2:
+        return {'count': int(len(x)), 'pearson': float('nan'), 'spearman': float('nan')}
+    return {
+        'count': int(len(x)),
+        'pearson': float(x.corr(y)),
+        # Spearman is Pearson over the ranks, computed here so scipy is not needed
+        'spearman': float(x.rank().corr(y.rank())),
+    }
+
+
+def binned_correlation(x:pd.Series, y:pd.Series, bins:int=10) -> pd.DataFrame:
+    """
+    Splits the rows where both x and y have a value into bins of equal
+    width over x, and returns for each bin its bounds, its number of rows
+    and the mean and percentiles of y, e.g., the resolution time of issues
+    labeled within 0-3 days, 3-6 days, ...
+    """
+    both = (x.notna() & y.notna()).to_numpy()
+    x_values, y_values = x.to_numpy(dtype=np.float64)[both], y.to_numpy(dtype=np.float64)[both]
+    if len(x_values) == 0:
+        return pd.DataFrame(columns=['bin_start', 'bin_end', 'count', 'mean', 'p25', 'p50', 'p75'])
+    edges = np.histogram_bin_edges(x_values, bins=bins)
+    # The last bin includes its upper edge, like numpy.histogram
+    bin_numbers = np.clip(np.searchsorted(edges, x_values, side='right') - 1, 0, len(edges) - 2)
+    grouped = pd.Series(y_values).groupby(bin_numbers)
+    result = pd.DataFrame({
+        'count': grouped.size(),
+        'mean': grouped.mean(),
+        'p25': grouped.quantile(0.25),
+        'p50': grouped.median(),
+        'p75': grouped.quantile(0.75),
+    }).reindex(range(len(edges) - 1))
+    result['count'] = result['count'].fillna(0).astype(np.int64)
+    result.insert(0, 'bin_start', edges[:-1])
+    result.insert(1, 'bin_end', edges[1:])
+    return result.reset_index(drop=True)
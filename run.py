@@ -5,15 +5,73 @@ the command line to run the analyses.
 """
 
 import argparse
+import importlib
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
 
 import config
-from example_analysis import ExampleAnalysis
-from first_analysis import FirstAnalysis
-from second_analysis import Second_analysis
-from third_analysis import ThirdFeatureAnalysis
-from fourth_analysis import FourthAnalysis
+import output
+import profiling
 
 
+# Analyses that can be selected with the --feature flag, as (module, class).
+# Modules are only imported once their feature is selected, so that only the
+# selected analyses pay for importing pandas, numpy and matplotlib.
+FEATURES = {
+    0: ('example_analysis', 'ExampleAnalysis'),
+    1: ('first_analysis', 'FirstAnalysis'),
+    2: ('second_analysis', 'Second_analysis'),
+    3: ('third_analysis', 'ThirdFeatureAnalysis'),
+    4: ('fourth_analysis', 'FourthAnalysis'),
+}
+
+# Analyses that prompt on the command line and therefore always
+# run in the main process
+INTERACTIVE_FEATURES = {1}
+
+# Analyses that can run over the shards given with --shards (see shards.py)
+SHARD_FEATURES = {1, 2, 4}
+
+
+def parse_features(value:str) -> List[int]:
+    """
+    Parses a comma-separated list of features, e.g., "1,2,3".
+    """
+    try:
+        features = [int(feature) for feature in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid feature list: {value!r}')
+    for feature in features:
+        if feature not in FEATURES:
+            raise argparse.ArgumentTypeError(f'unknown feature: {feature}')
+    return features
+
+
+def parse_capacity(value:str) -> int:
+    """
+    Parses the number of counters of --approximate, which must be at least 1.
+    """
+    try:
+        capacity = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid capacity: {value!r}')
+    if capacity < 1:
+        raise argparse.ArgumentTypeError(f'the capacity must be at least 1, got {capacity}')
+    return capacity
+
+
+def parse_date(value:str) -> str:
+    """
+    Checks that a date is given as ISO-8601, e.g., 2024-01-01. It is kept
+    as given and parsed by the analyses (see predicates.get_date_parameter).
+    """
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid ISO-8601 date: {value!r}')
+    return value
+
 
 def parse_args():
     """
@@ -27,9 +85,16 @@ def parse_args():
     """
     ap = argparse.ArgumentParser("run.py")
     
-    # Required parameter specifying what analysis to run
-    ap.add_argument('--feature', '-f', type=int, required=True,
-                    help='Which of the three features to run')
+    # Required parameter specifying what analysis (or analyses) to run
+    features = ap.add_mutually_exclusive_group()
+    features.add_argument('--feature', '-f', type=parse_features,
+                          help='Which feature to run, or a comma-separated list of features (e.g., 1,2,3)')
+    features.add_argument('--all', action='store_true',
+                          help='Run all features in one process')
+    
+    # Optional parameter to run the selected features concurrently
+    ap.add_argument('--parallel', action='store_true',
+                    help='Run the selected features concurrently in separate processes')
     
     # Optional parameter for analyses focusing on a specific user (i.e., contributor)
     ap.add_argument('--user', '-u', type=str, required=False,
@@ -39,25 +104,217 @@ def parse_args():
     ap.add_argument('--label', '-l', type=str, required=False,
                     help='Optional parameter for analyses focusing on a specific label')
     
-    return ap.parse_args()
+    # Optional parameters for analyses focusing on the issues created in [since, until)
+    ap.add_argument('--since', type=parse_date, required=False, metavar='DATE',
+                    help='Optional ISO-8601 date, e.g., 2024-01-01, of the first issues the analyses consider')
+    ap.add_argument('--until', type=parse_date, required=False, metavar='DATE',
+                    help='Optional ISO-8601 date before which the issues the analyses consider were created')
+    
+    # Optional parameter for the alphabetical range of authors listed by feature 1
+    ap.add_argument('--category', '-c', type=str, required=False,
+                    help='Optional range of author usernames for feature 1 (1-4 or A-G, H-N, O-T, U-Z)')
+    
+    # Optional parameter for the bucket of time feature 4 counts issues by
+    ap.add_argument('--granularity', '-g', type=str, required=False, choices=['day', 'week', 'month', 'year'],
+                    help='Optional granularity for feature 4 to plot issues created and closed and the open backlog')
+    
+    # Optional parameter for the state of the issues to search (--search)
+    ap.add_argument('--state', type=str, required=False, choices=['open', 'closed'],
+                    help='Optional state of the issues returned by --search')
+    
+    # Optional parameter to count authors approximately in bounded memory
+    ap.add_argument('--approximate', type=parse_capacity, required=False, metavar='CAPACITY',
+                    help='Count the authors of features 1 and 2 in one streaming pass, tracking at most '
+                         'CAPACITY authors (Space-Saving), and report error bounds')
+    
+    # Optional parameter to run headless and write figures to a directory instead of showing them
+    ap.add_argument('--output', '-o', type=str, required=False,
+                    help='Optional directory to write figures to instead of showing them')
+    
+    # Optional parameter for the number of processes rendering figures in headless mode
+    ap.add_argument('--render-workers', type=int, required=False,
+                    help='Optional number of processes rendering figures when writing them to --output')
+    
+    # Optional parameter for the number of processes used to parse the data file
+    ap.add_argument('--workers', '-w', type=int, required=False,
+                    help='Optional number of processes used to load the data file')
+    
+    # Optional delta files of new or updated issues to merge into the dataset
+    ap.add_argument('--delta', type=str, action='append', required=False,
+                    help='Merge a file of new or updated issues into the dataset by issue number (repeatable)')
+    
+    # Optional directory keeping the results of the analyses across runs
+    ap.add_argument('--memo-dir', type=str, required=False,
+                    help='Optional directory to keep analysis results in, so repeated runs skip recomputing them')
+    
+    # Optional query to search the titles, bodies and comments of the issues instead of running features
+    ap.add_argument('--search', '-s', type=str, required=False, metavar='QUERY',
+                    help='Print the issues containing all words and "quoted phrases" of QUERY '
+                         '(filtered by --state, --label and --user as creator)')
+    
+    # Optional data files (or glob patterns) of several repositories to report on or run features over
+    ap.add_argument('--shards', type=str, action='append', required=False, metavar='PATTERN',
+                    help='Print a report across the repositories of the given data files or glob patterns '
+                         '(repeatable), or run features 1, 2 and 4 over them, computed per file in parallel')
+    ap.add_argument('--shard-workers', type=int, required=False,
+                    help='Optional number of processes computing the report or features over --shards '
+                         '(default one per core)')
+    
+    # Optional parameter to report on the interactions between contributors instead of running features
+    ap.add_argument('--graph', action='store_true',
+                    help='Print the most central contributors of the graph of comments on and assignments '
+                         'to issues of others (PageRank, degree) and its connected components')
+    
+    # Optional parameters to answer queries over HTTP instead of running features
+    ap.add_argument('--serve', action='store_true',
+                    help='Keep the dataset loaded and serve the analyses as JSON on localhost')
+    ap.add_argument('--port', type=int, required=False,
+                    help='Optional port of the server started by --serve (default 8611)')
+    ap.add_argument('--serve-workers', type=int, required=False,
+                    help='Optional number of processes computing the requests of the server (default 2)')
+    
+    # Optional parameters to print where the time and memory went
+    ap.add_argument('--profile', action='store_true',
+                    help='Print the time, CPU time and allocations of each phase after the run')
+    ap.add_argument('--profile-output', type=str, required=False,
+                    help='Optional file to write cProfile stats to (implies --profile)')
+    
+    args = ap.parse_args()
+    # A feature is required unless only delta files are merged, the issues are searched, the
+    # shards or the contributor graph are reported on or the server is started
+    if (args.feature is None and not args.all and not args.delta and not args.search and not args.shards
+            and not args.graph and not args.serve):
+        ap.error('one of the arguments --feature/-f --all is required')
+    # Only some features run over the shards, and each of them already runs on all cores
+    if args.shards and (args.all or not SHARD_FEATURES.issuperset(args.feature or [])):
+        ap.error(f'--shards can only run features {", ".join(map(str, sorted(SHARD_FEATURES)))}')
+    if args.shards and (args.approximate is not None or args.parallel):
+        ap.error('--shards cannot be combined with --approximate or --parallel')
+    return args
+
+
+
+def load_feature(feature:int) -> type:
+    """
+    Imports the module of an analysis and returns the analysis class.
+    """
+    module_name, class_name = FEATURES[feature]
+    return getattr(importlib.import_module(module_name), class_name)
+
 
+def run_feature(feature:int) -> float:
+    """
+    Runs a single analysis and returns its wall time in seconds
+    (not counting the import of its module).
+    """
+    analysis = load_feature(feature)
+    start = time.perf_counter()
+    with profiling.span(f'feature {feature}'):
+        with profiling.span('setup'):
+            instance = analysis()
+        with profiling.span('run'):
+            instance.run()
+    return time.perf_counter() - start
 
 
-# Parse feature to call from command line arguments
-args = parse_args()
-# Add arguments to config so that they can be accessed in other parts of the application
-config.overwrite_from_args(args)
+def _run_feature_in_worker(feature:int) -> Tuple[float, Dict[Tuple[str, ...], List[float]]]:
+    """
+    Runs a single analysis in a worker process and returns its wall time
+    along with the spans it recorded.
+    """
+    if profiling.is_configured():
+        profiling.enable(track_allocations=False)
+    return run_feature(feature), profiling.collect()
+
+
+def run_features(features:List[int], parallel:bool) -> Dict[int, float]:
+    """
+    Runs the analyses one after the other over the shared dataset, or
+    concurrently if parallel is set. In that case the dataset is loaded
+    before starting the worker processes so that (where processes are
+    forked) they share it instead of loading it again. Interactive
+    analyses still run in the main process.
+    """
+    timings:Dict[int, float] = {}
+    background = [f for f in features if f not in INTERACTIVE_FEATURES]
+    if not parallel or len(background) < 2:
+        for feature in features:
+            timings[feature] = run_feature(feature)
+            print(f'Feature {feature} finished in {timings[feature]:.2f}s')
+        return timings
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from data_loader import DataLoader
+    from predicates import IssuePredicate, get_date_parameter
+    # The issues selected by --label and the date range are shared by the features
+    DataLoader().get_index(IssuePredicate(label=config.get_parameter('label'),
+                                          created_since=get_date_parameter('since'),
+                                          created_until=get_date_parameter('until')))
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=len(background), mp_context=context) as pool:
+        futures = {feature: pool.submit(_run_feature_in_worker, feature) for feature in background}
+        for feature in features:
+            if feature in INTERACTIVE_FEATURES:
+                timings[feature] = run_feature(feature)
+                print(f'Feature {feature} finished in {timings[feature]:.2f}s')
+        for feature, future in futures.items():
+            timings[feature], spans = future.result()
+            profiling.merge(spans)
+            print(f'Feature {feature} finished in {timings[feature]:.2f}s')
+    return timings
+
+
+if __name__ == '__main__':
+    # Parse feature to call from command line arguments
+    args = parse_args()
+    features:List[int] = sorted(FEATURES) if args.all else (args.feature or [])
+    # Add arguments to config so that they can be accessed in other parts of the application
+    config.overwrite_from_args(args)
+    
+    # Select the non-GUI backend before any figure is created when writing figures to files
+    output.configure()
+    # Start recording spans if --profile is set
+    profiling.configure()
+    
+    # Merge the delta files specified in the --delta flags
+    if args.delta:
+        from data_loader import DataLoader
+        for delta_path in args.delta:
+            added, updated = DataLoader().apply_delta(delta_path)
+            print(f'Merged {delta_path}: {added} issues added, {updated} updated.')
+    
+    # Print the issues matching the query if --search is set
+    if args.search:
+        import search
+        search.print_results(args.search, state=args.state, label=args.label, creator=args.user)
+    
+    # Print the report across the repositories if --shards is set without features
+    elif args.shards and not features:
+        import shards
+        shards.print_report(shards.get_shards())
+    
+    # Print the report on the contributor graph if --graph is set
+    elif args.graph:
+        import graph
+        graph.print_report()
+    
+    # Answer queries until interrupted if --serve is set
+    elif args.serve:
+        import server
+        server.serve()
+    
+    # Run the features specified in the --feature (or --all) flag
+    else:
+        start = time.perf_counter()
+        timings = run_features(features, args.parallel)
+        output.wait()
+        if len(features) > 1:
+            print(f'\n{"Feature":>7} | Wall time')
+            print('-' * 20)
+            for feature in features:
+                print(f'{feature:>7} | {timings[feature]:>8.2f}s')
+            print(f'{"Total":>7} | {time.perf_counter() - start:>8.2f}s')
     
-# Run the feature specified in the --feature flag
-if args.feature == 0:
-    ExampleAnalysis().run()
-elif args.feature == 1:
-    FirstAnalysis().run()
-elif args.feature == 2:
-    Second_analysis().run()
-elif args.feature == 3:
-    ThirdFeatureAnalysis().run()
-elif args.feature == 4:
-    FourthAnalysis().run()
-else:
-    print('Need to specify which feature to run with --feature flag.')
\ No newline at end of file
+    # Print the spans and write the cProfile dump of any of the modes if --profile is set
+    profiling.report()
@@ -0,0 +1,289 @@
+"""
+Full-text search over the titles, bodies and comments of the issues.
+
+An inverted index maps every term to the positions where it occurs: the
+issue (its position in DataLoader().get_issues()) and the word offset
+within the issue's text, which is its title, body and comments in that
+order. The offsets make phrase queries possible, and are spaced so that
+a phrase never spans two of these fields. The index is built from the
+loaded dataset on first use and, unless the cache is disabled, saved next
+to the data file (<data file>.search.npz) together with the version of the
+dataset (see DataLoader.get_version), so it is rebuilt after the data file
+changes or a delta is merged.
+
+Queries are words and "quoted phrases" that must all occur in an issue,
+e.g., `"lock file" install`. Matching is case-insensitive on words made of
+letters, digits and underscores. Results can be filtered on the state,
+label and creator of the issues (via the dataset index, see indexes.py) and
+are ranked by the number of occurrences of the query terms, newest first
+among ties. It can be queried from the command line:
+
+    python run.py --search '"lock file"' --state open --label Bug
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+import profiling
+from data_loader import DataLoader
+from model import Issue
+
+_INDEX_SUFFIX:str = '.search.npz'
+
+# Bump whenever the tokenization or the layout of the archive changes
+_INDEX_VERSION:int = 1
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+_QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Search index of the dataset, loaded or built on first use
+_SEARCH_INDEX:'SearchIndex' = None
+
+
+def tokenize(text:str) -> List[str]:
+    """
+    Splits text into lowercase terms.
+    """
+    return _TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def parse_query(query:str) -> List[List[str]]:
+    """
+    Splits a query into its phrases, each a list of terms. Unquoted
+    words are phrases of one term.
+    """
+    phrases = []
+    for quoted, word in _QUERY_PATTERN.findall(query):
+        terms = tokenize(quoted if quoted else word)
+        if terms:
+            phrases.append(terms)
+    return phrases
+
+
+def _issue_fields(issue:Issue) -> Iterable[str]:
+    yield issue.title
+    yield issue.text
+    for event in issue.events:
+        if event.comment:
+            yield event.comment
+
+
+class SearchHit(NamedTuple):
+    """
+    An issue matching a query.
+    """
+    # Position of the issue in DataLoader().get_issues()
+    position: int
+    # Number of occurrences of the query terms in the issue
+    score: int
+
+
+class SearchIndex:
+    """
+    Positional inverted index of the terms of the issues.
+    """
+
+    def __init__(self, terms:List[str], offsets:np.ndarray, docs:np.ndarray, positions:np.ndarray):
+        """
+        Constructor. The occurrences of the i-th term are those in
+        [offsets[i], offsets[i + 1]) of docs (issue positions) and
+        positions (word offsets), sorted by issue and offset.
+        """
+        self.terms:List[str] = terms
+        self.term_ids:Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.offsets:np.ndarray = offsets
+        self.docs:np.ndarray = docs
+        self.positions:np.ndarray = positions
+        # Version of the dataset the index was built from
+        self.version:str = None
+
+    @classmethod
+    def build(cls, issues:Iterable[Issue]) -> 'SearchIndex':
+        """
+        Indexes the titles, bodies and comments of the issues.
+        """
+        term_ids:Dict[str, int] = {}
+        occurrence_terms, occurrence_docs, occurrence_positions = array('i'), array('i'), array('i')
+        for doc, issue in enumerate(issues):
+            position = 0
+            for text in _issue_fields(issue):
+                tokens = tokenize(text)
+                occurrence_terms.extend([term_ids.setdefault(token, len(term_ids)) for token in tokens])
+                occurrence_positions.extend(range(position, position + len(tokens)))
+                # Leave a gap so that phrases do not match across fields
+                position += len(tokens) + 1
+            occurrence_docs.extend([doc] * (len(occurrence_terms) - len(occurrence_docs)))
+
+        occurrence_terms = np.frombuffer(occurrence_terms, dtype=np.int32)
+        # Occurrences were added by issue and offset, which a stable sort keeps within each term
+        order = np.argsort(occurrence_terms, kind='stable')
+        offsets = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(occurrence_terms, minlength=len(term_ids)), out=offsets[1:])
+        return cls(list(term_ids), offsets, np.frombuffer(occurrence_docs, dtype=np.int32)[order],
+                   np.frombuffer(occurrence_positions, dtype=np.int32)[order])
+
+    def save(self, path:str, version:str):
+        """
+        Writes the index to path, recording the version of the dataset.
+        Failing to write it is logged but otherwise ignored.
+        """
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        meta = {'index_version': _INDEX_VERSION, 'dataset_version': version}
+        try:
+            with open(tmp_path, 'wb') as fout:
+                np.savez(fout, meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+                         terms=np.frombuffer('\n'.join(self.terms).encode('utf-8'), dtype=np.uint8),
+                         offsets=self.offsets, docs=self.docs, positions=self.positions)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f'Could not write search index {path}: {e}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path:str, version:str) -> 'SearchIndex':
+        """
+        Reads the index saved at path, or returns None if there is none
+        or it was built from another version of the dataset.
+        """
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+                if meta != {'index_version': _INDEX_VERSION, 'dataset_version': version}:
+                    logger.info(f'Search index {path} is stale')
+                    return None
+                terms = archive['terms'].tobytes().decode('utf-8')
+                return cls(terms.split('\n') if terms else [], archive['offsets'], archive['docs'],
+                           archive['positions'])
+        except Exception as e:
+            logger.warning(f'Ignoring unreadable search index {path}: {e}')
+            return None
+
+    def _occurrences(self, term:str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the issue positions and word offsets of the term.
+        """
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.docs[start:end], self.positions[start:end]
+
+    def match_phrase(self, terms:List[str]) -> np.ndarray:
+        """
+        Returns the issue position of every occurrence of the phrase.
+        """
+        # An occurrence of the phrase starting at offset p in an issue has
+        # its i-th term at p + i, so the (issue, p) keys of all terms match
+        keys = None
+        for i, term in enumerate(terms):
+            docs, positions = self._occurrences(term)
+            term_keys = (docs.astype(np.int64) << 32) | (positions.astype(np.int64) - i + (1 << 31))
+            keys = term_keys if keys is None else np.intersect1d(keys, term_keys, assume_unique=True)
+            if len(keys) == 0:
+                break
+        return (keys >> 32).astype(np.int64)
+
+    def match(self, query:str) -> List[SearchHit]:
+        """
+        Returns the issues containing all phrases of the query, ranked by
+        the number of occurrences of the phrases.
+        """
+        matches, scores = None, None
+        for phrase in parse_query(query):
+            docs, counts = np.unique(self.match_phrase(phrase), return_counts=True)
+            if matches is None:
+                matches, scores = docs, counts
+            else:
+                keep = np.isin(matches, docs)
+                matches, scores = matches[keep], scores[keep] + counts[np.isin(docs, matches)]
+        if matches is None:
+            return []
+        # Most occurrences first, newest (last) issues first among ties
+        order = np.lexsort((-matches, -scores))
+        return [SearchHit(int(matches[i]), int(scores[i])) for i in order]
+
+
+def get_index_path(data_path:str) -> str:
+    """
+    Returns the location of the search index for the given data file.
+    """
+    return data_path + _INDEX_SUFFIX
+
+
+def get_search_index() -> SearchIndex:
+    """
+    Returns the search index of the dataset, loading it from next to the
+    data file or building (and saving) it if it is missing or stale.
+    """
+    global _SEARCH_INDEX
+    loader = DataLoader()
+    version = loader.get_version()
+    if _SEARCH_INDEX is not None and _SEARCH_INDEX.version == version:
+        return _SEARCH_INDEX
+    path = get_index_path(loader.data_path)
+    with profiling.span('load search index'):
+        index = SearchIndex.load(path, version) if loader.use_cache else None
+    if index is None:
+        with profiling.span('build search index'):
+            index = SearchIndex.build(loader.get_issues())
+        if loader.use_cache:
+            index.save(path, version)
+    index.version = version
+    _SEARCH_INDEX = index
+    return index
+
+
+def search(query:str, state:str=None, label:str=None, creator:str=None, limit:int=20) -> List[SearchHit]:
+    """
+    Returns the (at most limit) issues best matching the query, keeping
+    those with the given state, label and creator.
+    """
+    hits = get_search_index().match(query)
+    if state is not None or label is not None or creator is not None:
+        allowed = set(DataLoader().get_index().issue_positions(label=label, state=state, creator=creator).tolist())
+        hits = [hit for hit in hits if hit.position in allowed]
+    return hits[:limit] if limit is not None else hits
+
+
+def snippet(issue:Issue, query:str, width:int=80) -> str:
+    """
+    Returns the text around the first occurrence of the query's first
+    term in the issue's title, body or comments.
+    """
+    phrases = parse_query(query)
+    if not phrases:
+        return ''
+    pattern = re.compile(r'\b' + r'\W+'.join(re.escape(term) for term in phrases[0]) + r'\b', re.IGNORECASE)
+    for text in _issue_fields(issue):
+        found = pattern.search(text or '')
+        if found is not None:
+            start = max(0, found.start() - width // 2)
+            excerpt = ' '.join(text[start:start + width].split())
+            return ('...' if start > 0 else '') + excerpt + ('...' if start + width < len(text) else '')
+    return ''
+
+
+def print_results(query:str, state:str=None, label:str=None, creator:str=None, limit:int=20):
+    """
+    Prints the issues best matching the query.
+    """
+    hits = search(query, state=state, label=label, creator=creator, limit=None)
+    issues = DataLoader().get_issues()
+    print(f'{len(hits)} issues match {query}')
+    for hit in hits[:limit]:
+        issue = issues[hit.position]
+        state_name = issue.state.value if issue.state is not None else ''
+        print(f'\n#{issue.number} [{state_name}] {issue.title} ({hit.score} matches)')
+        print(f'    {snippet(issue, query)}')
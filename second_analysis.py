@@ -1,9 +1,14 @@
-from collections import Counter
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Tuple
+
 import config
 import matplotlib.pyplot as plt
 from data_loader import DataLoader
-from model import Issue
+import memo
+import output
+import predicates
+import shards
+import topk
 
 
 class Second_analysis:
@@ -13,38 +18,99 @@ class Second_analysis:
         """
         # Parameter is passed in via command line (--user)
         self.USER:str = config.get_parameter('user')
+        # Parameter is passed in via command line (--label)
+        self.LABEL:str = config.get_parameter('label')
+        # Parameters are passed in via command line (--since, --until)
+        self.SINCE:datetime = predicates.get_date_parameter('since')
+        self.UNTIL:datetime = predicates.get_date_parameter('until')
 
     def run(self):
-        issues:List[Issue] = DataLoader().get_issues()
-        bug_creators = []
-        for issue in issues:
-            for event in issue.events:
-                if event.event_type == 'commented': 
-                    bug_creators.append(event.author)
-           
-        # Get the top 50 bug creators
-        bug_creator_counts = Counter(bug_creators)
-        top_50_creators = bug_creator_counts.most_common(50)
-
-        # Prepare data for plotting
-        creators, counts = zip(*top_50_creators) if top_50_creators else ([], [])
-
-        # Create the bar plot
-        plt.figure(figsize=(15, 10))
-        bars = plt.bar(creators, counts)
-        plt.title('Top 50 Commenters')
-        plt.xlabel('Creator')
-        plt.ylabel('Number of Comments')
-        plt.xticks(rotation=90)
-
-        # Add frequency count on top of each bar
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height}',
-                    ha='center', va='bottom')
-
-        plt.tight_layout()
-
-        # Show the plot
-        plt.show()
\ No newline at end of file
+        capacity = topk.get_capacity()
+        if capacity is not None:
+            # Approximate counts in one streaming pass (--approximate)
+            summary = memo.memoize('second_analysis.approximate', topk.event_authors,
+                                   capacity=capacity, event_type='commented', label=self.LABEL,
+                                   since=self.SINCE, until=self.UNTIL)
+            top_50 = summary.top(50)
+            print_approximate_commenters(top_50, summary)
+            output.render('top_50_commenters', plot_top_commenters, [hitter.item for hitter in top_50],
+                          [hitter.count for hitter in top_50], [hitter.error for hitter in top_50])
+            return
+
+        # Counted per shard and added up with --shards (see shards.py)
+        commenter_counts = shards.memoize('second_analysis.commenters', count_commenters, shards.add_counts,
+                                          label=self.LABEL, since=self.SINCE, until=self.UNTIL)
+        creators, counts = top_commenters_of(commenter_counts, 50)
+
+        # Show the plot (or write it to the output directory)
+        output.render('top_50_commenters', plot_top_commenters, list(creators), list(counts))
+
+
+def count_commenters(label:str=None, since:datetime=None, until:datetime=None) -> Dict[str, int]:
+    """
+    Counts the comments of each author on the issues with the label
+    created in [since, until). Authors are in the order of their first
+    comment, like in a Counter of the comments.
+    """
+    where = predicates.IssuePredicate(label=label, created_since=since, created_until=until)
+    comments = DataLoader().get_index(where).events(event_type='commented', label=label, since=since, until=until)
+    commenters = comments['author'].dropna()
+    bug_creator_counts = commenters.value_counts(sort=False)
+    return {author: int(bug_creator_counts[author]) for author in commenters.unique()}
+
+
+def top_commenters_of(commenter_counts:Dict[str, int], n:int) -> Tuple[tuple, tuple]:
+    """
+    Returns the n authors with the most comments and their number of
+    comments, most first. Ties keep the order of the counts, so counts
+    from count_commenters rank like Counter.most_common.
+    """
+    # Get the top 50 bug creators
+    top_50_creators = sorted(commenter_counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    # Prepare data for plotting
+    creators, counts = zip(*top_50_creators) if top_50_creators else ([], [])
+    return creators, counts
+
+
+def top_commenters(label:str=None, since:datetime=None, until:datetime=None):
+    """
+    Returns the authors of the most comments on the issues with the label
+    created in [since, until), and their number of comments.
+    """
+    return top_commenters_of(count_commenters(label=label, since=since, until=until), 50)
+
+
+def print_approximate_commenters(top_50:List[topk.HeavyHitter], summary:topk.SpaceSaving):
+    """
+    Prints the approximate top commenters with the bounds of their counts.
+    """
+    print(f'Top {len(top_50)} commenters of {summary.total} comments, counted with {summary.capacity} counters '
+          f'(counts are at most {summary.max_error} too high)')
+    print(f"{'No.':<3} | {'Commenter':<30} | {'Comments':>8} | {'Error':>5} | In top {len(top_50)}")
+    print('-' * 70)
+    for idx, hitter in enumerate(top_50, start=1):
+        print(f"{idx:<3} | {hitter.item:<30} | {hitter.count:>8} | {hitter.error:>5} | "
+              f"{'yes' if hitter.guaranteed else 'likely'}")
+
+
+def plot_top_commenters(creators, counts, errors=None):
+    """
+    Creates the bar plot of the top commenters. With errors (approximate
+    counts), each bar shows the range its true count lies in.
+    """
+    plt.figure(figsize=(15, 10))
+    bars = plt.bar(creators, counts, yerr=None if errors is None else [errors, [0] * len(errors)])
+    plt.title('Top 50 Commenters' if errors is None else 'Top 50 Commenters (approximate)')
+    plt.xlabel('Creator')
+    plt.ylabel('Number of Comments')
+    plt.xticks(rotation=90)
+
+    # Add frequency count on top of each bar
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height}',
+                ha='center', va='bottom')
+
+    plt.tight_layout()
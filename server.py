@@ -0,0 +1,316 @@
+"""
+Serves the analyses as JSON endpoints over HTTP so that repeated questions
+do not pay for starting a process and loading the dataset. The dataset,
+its frames, indexes, aggregates and search index are loaded at startup. Requests
+are handled concurrently on an asyncio event loop: results found by the
+memo layer (see memo.py) are answered right away, while computations run
+in a pool of worker processes (forked after loading, so they share the
+dataset) and never block other requests. The server only listens on
+localhost. It is started with:
+
+    python run.py --serve --port 8611
+
+Endpoints (GET, all parameters optional unless noted; since and until are
+ISO-8601 dates selecting the issues created in [since, until)):
+
+    /health                                   number of issues, dataset version
+    /example?user=&label=&since=&until=       events and issues, top creators (feature 0)
+    /authors?label=&since=&until=             events per author (feature 1)
+    /event-types?user=&label=&since=&until=   events per type by a user (feature 1, user required)
+    /commenters?label=&since=&until=          top 50 commenters (feature 2)
+    /event-impact?label=&since=&until=        days to labeling/assignment vs. resolution (feature 3)
+    /issues-per-year?user=&label=&since=&until=   issues created per year (feature 4)
+    /issues-over-time?granularity=&user=&label=&since=&until=
+                                              issues created and closed, open backlog per
+                                              day, week, month or year (feature 4)
+    /search?q=&state=&label=&user=&limit=     issues containing all words and "phrases" of q
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import asyncio
+import functools
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import config
+import memo
+import resolution
+import search
+import timeseries
+from data_loader import DataLoader
+from example_analysis import count_issues_and_events
+from first_analysis import count_author_events, count_event_types
+from fourth_analysis import issues_over_time, issues_per_year
+from second_analysis import top_commenters
+from third_analysis import IMPACT_EVENTS, event_impact
+
+# The server is only reachable from this machine
+HOST:str = '127.0.0.1'
+
+DEFAULT_PORT:int = 8611
+
+
+class BadRequest(Exception):
+    """
+    Raised for requests with unknown or invalid parameters.
+    """
+
+
+class NotFound(Exception):
+    """
+    Raised for requests to unknown endpoints.
+    """
+
+
+def _parse_date(value:str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f'Invalid date {value!r}, expected ISO-8601 (e.g., 2024-01-31)')
+
+
+def _parse_int(value:str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f'Invalid number {value!r}')
+
+
+def _parse_granularity(value:str) -> str:
+    if value not in timeseries.FREQUENCIES:
+        raise BadRequest(f'Invalid granularity {value!r}, expected one of {", ".join(timeseries.FREQUENCIES)}')
+    return value
+
+
+def _parse_state(value:str) -> str:
+    if value not in ('open', 'closed'):
+        raise BadRequest(f'Invalid state {value!r}, expected open or closed')
+    return value
+
+
+# Parsers of the query parameters
+_PARAMETERS:Dict[str, Callable[[str], any]] = {
+    'user': str,
+    'label': str,
+    'since': _parse_date,
+    'until': _parse_date,
+    'top_n': _parse_int,
+    'granularity': _parse_granularity,
+    'q': str,
+    'state': _parse_state,
+    'limit': _parse_int,
+}
+
+
+def _format_example(result:tuple) -> dict:
+    total_events, issue_count, top_creators = result
+    return {'events': total_events, 'issues': issue_count, 'top_creators': top_creators.to_dict()}
+
+
+def _format_commenters(result:tuple) -> dict:
+    creators, counts = result
+    return {'commenters': [{'author': creator, 'comments': count} for creator, count in zip(creators, counts)]}
+
+
+def _format_event_impact(event_impact_df:pd.DataFrame) -> dict:
+    summary = {'issues': len(event_impact_df)}
+    # Missing percentiles (NaN) become null
+    days = resolution.percentiles(event_impact_df).astype(object)
+    summary['percentiles'] = days.where(days.notna(), None).to_dict(orient='index')
+    for column in IMPACT_EVENTS.values():
+        stats = resolution.correlation(event_impact_df[column], event_impact_df[resolution.RESOLUTION_TIME])
+        summary[f'{column}_correlation'] = {key: None if value != value else value for key, value in stats.items()}
+    return summary
+
+
+def _format_issues_over_time(counts_df:pd.DataFrame) -> dict:
+    return {'buckets': [{'bucket': str(bucket), **row} for bucket, row in counts_df.to_dict(orient='index').items()]}
+
+
+def search_issues(q:str, state:str=None, label:str=None, user:str=None, limit:int=20) -> List[search.SearchHit]:
+    """
+    Returns the issues best matching the query (see search.py).
+    """
+    return search.search(q, state=state, label=label, creator=user, limit=limit)
+
+
+def _format_search(hits:List[search.SearchHit]) -> dict:
+    issues = DataLoader().get_issues()
+    return {'issues': [{'number': issues[hit.position].number, 'title': issues[hit.position].title,
+                        'state': issues[hit.position].state, 'url': issues[hit.position].url, 'score': hit.score}
+                       for hit in hits]}
+
+
+def _format_issues_per_year(result:tuple) -> dict:
+    years, counts = result
+    return {'issues_per_year': {str(year): count for year, count in zip(years, counts)}}
+
+
+# Endpoints as (name in the memo, function computing the result, accepted
+# parameters, required parameters, conversion of the result to JSON)
+ROUTES:Dict[str, Tuple[str, Callable, Tuple[str, ...], Tuple[str, ...], Callable[[any], dict]]] = {
+    '/example': ('example_analysis', count_issues_and_events, ('user', 'label', 'since', 'until', 'top_n'),
+                 (), _format_example),
+    '/authors': ('first_analysis.author_events', count_author_events, ('label', 'since', 'until'),
+                 (), lambda counts: {'events_per_author': counts}),
+    '/event-types': ('first_analysis.event_types', count_event_types, ('user', 'label', 'since', 'until'),
+                     ('user',), lambda counts: {'event_types': counts}),
+    '/commenters': ('second_analysis', top_commenters, ('label', 'since', 'until'),
+                    (), _format_commenters),
+    '/event-impact': ('third_analysis', event_impact, ('label', 'since', 'until'),
+                      (), _format_event_impact),
+    '/issues-per-year': ('fourth_analysis', issues_per_year, ('user', 'label', 'since', 'until'),
+                         (), _format_issues_per_year),
+    '/issues-over-time': ('fourth_analysis.over_time', issues_over_time,
+                          ('granularity', 'user', 'label', 'since', 'until'), (), _format_issues_over_time),
+    '/search': ('search', search_issues, ('q', 'state', 'label', 'user', 'limit'), ('q',), _format_search),
+}
+
+
+def _json_default(value):
+    """
+    Converts the numpy and pandas values found in results to JSON.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Cannot convert {type(value).__name__} to JSON')
+
+
+class QueryServer:
+    """
+    Answers the requests for the analyses over the dataset loaded at startup.
+    """
+
+    def __init__(self, workers:int):
+        """
+        Constructor. Loads the dataset and starts the worker pool.
+        """
+        loader = DataLoader()
+        self.issue_count:int = len(loader.get_issues())
+        loader.get_index()
+        loader.get_aggregates()
+        search.get_search_index()
+        # Workers forked after loading share the dataset with the server
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        self.pool:ProcessPoolExecutor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        # Computations in flight, so that identical concurrent requests share one
+        self.pending:Dict[tuple, asyncio.Future] = {}
+
+    async def query(self, path:str, query:Dict[str, list]) -> dict:
+        """
+        Returns the JSON result of a request to one of the ROUTES.
+        """
+        if path == '/health':
+            return {'status': 'ok', 'issues': self.issue_count, 'version': DataLoader().get_version()}
+        if path not in ROUTES:
+            raise NotFound(path)
+        name, compute, accepted, required, to_json = ROUTES[path]
+
+        params = {}
+        for param, values in query.items():
+            if param not in accepted:
+                raise BadRequest(f'Unknown parameter {param!r} for {path}, expected one of {", ".join(accepted)}')
+            params[param] = _PARAMETERS[param](values[-1])
+        for param in required:
+            if param not in params:
+                raise BadRequest(f'Missing parameter {param!r} for {path}')
+
+        key = memo.make_key(name, compute, params)
+        found, result = memo.lookup(key)
+        if not found:
+            if key not in self.pending:
+                self.pending[key] = asyncio.ensure_future(self._compute(key, compute, params))
+            result = await asyncio.shield(self.pending[key])
+        return to_json(result)
+
+    async def _compute(self, key:tuple, compute:Callable, params:Dict[str, any]):
+        """
+        Computes a result in the worker pool and memoizes it.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.pool, functools.partial(compute, **params))
+            memo.store(key, result)
+            return result
+        finally:
+            del self.pending[key]
+
+    async def handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        """
+        Handles one HTTP request on a connection and closes it.
+        """
+        try:
+            request_line = await reader.readline()
+            # Skip the headers, requests do not have a body
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            try:
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            except ValueError:
+                status, body = HTTPStatus.BAD_REQUEST, {'error': 'Malformed request'}
+            else:
+                status, body = await self._respond(method, target)
+            payload = json.dumps(body, default=_json_default).encode('utf-8')
+            writer.write((f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                          f'Content-Type: application/json\r\n'
+                          f'Content-Length: {len(payload)}\r\n'
+                          f'Connection: close\r\n\r\n').encode('latin-1') + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method:str, target:str) -> Tuple[HTTPStatus, dict]:
+        """
+        Returns the status and JSON body of the response to a request.
+        """
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Only GET is supported'}
+        url = urlsplit(target)
+        try:
+            return HTTPStatus.OK, await self.query(url.path, parse_qs(url.query))
+        except NotFound:
+            return HTTPStatus.NOT_FOUND, {'error': f'Unknown endpoint {url.path}',
+                                          'endpoints': ['/health'] + list(ROUTES)}
+        except BadRequest as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        except Exception as e:
+            logger.exception(f'Request {target} failed')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'{type(e).__name__}: {e}'}
+
+
+async def _serve(port:int, workers:int):
+    query_server = QueryServer(workers)
+    server = await asyncio.start_server(query_server.handle, HOST, port)
+    print(f'Serving {query_server.issue_count} issues on http://{HOST}:{port} (Ctrl+C to stop)')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        query_server.pool.shutdown(cancel_futures=True)
+
+
+def serve(port:int=None):
+    """
+    Runs the server until interrupted. The port and the number of worker
+    processes are taken from the config (--port, --serve-workers).
+    """
+    port = int(port or config.get_parameter('port') or config.get_parameter('ENPM611_PROJECT_PORT', DEFAULT_PORT))
+    workers = int(config.get_parameter('serve_workers') or config.get_parameter('ENPM611_PROJECT_SERVE_WORKERS', 2))
+    try:
+        asyncio.run(_serve(port, workers))
+    except KeyboardInterrupt:
+        print('Server stopped.')
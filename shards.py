@@ -0,0 +1,205 @@
+"""
+Datasets made of many data files (shards), e.g., one per repository.
+Each shard is tagged with its repository and loaded on its own through
+DataLoader, with its own cache, so shards can be added or updated
+independently.
+
+Analyses over the shards run as map-reduce: a mapper computes a partial
+result over one shard in a pool of worker processes, and the partial
+results are merged in the main process as they arrive. The dataset is
+never held in one list, so cross-repository reports scale with the
+number of cores rather than with the total size of the shards. The
+cross-repository report (print_report) and features 1, 2 and 4 run this
+way: the features compute their counts through memoize(), which maps
+the computation over the shards given with --shards (memoized per
+shard) and adds up the counts. Features 0 and 3 analyze a single data
+file, and other analyses need their own mapper and reducer to run over
+the shards.
+
+Shards are configured with ENPM611_PROJECT_SHARDS in config.json, either
+a list of paths and glob patterns (the repository being the file name
+without its extension and an `_issues` suffix, e.g., poetry_issues.json
+is poetry) or a dict from repository to paths or patterns, or from the
+command line:
+
+    python run.py --shards 'data/*_issues.json' --shard-workers 4
+    python run.py --shards 'data/*_issues.json' --feature 1,2,4
+"""
+
+import functools
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Hashable, Iterator, List, NamedTuple, Tuple, TypeVar
+
+import config
+import data_loader
+import memo
+from aggregates import Aggregates
+from data_loader import DataLoader
+
+T = TypeVar('T')
+
+
+class Shard(NamedTuple):
+    """
+    A data file of the dataset and the repository it belongs to.
+    """
+    repo: str
+    path: str
+
+
+def _repo_name(path:str) -> str:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name[:-len('_issues')] if name.endswith('_issues') and name != '_issues' else name
+
+
+def _expand(pattern:str) -> List[str]:
+    """
+    Returns the files matching a glob pattern in order, or the pattern
+    itself if it is a path without wildcards.
+    """
+    if glob.has_magic(pattern):
+        return sorted(glob.glob(pattern))
+    return [pattern]
+
+
+def get_shards() -> List[Shard]:
+    """
+    Returns the shards of the dataset (--shards or ENPM611_PROJECT_SHARDS),
+    or an empty list if none are configured.
+    """
+    patterns = config.get_parameter('shards') or config.get_parameter('ENPM611_PROJECT_SHARDS')
+    if not patterns:
+        return []
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if isinstance(patterns, dict):
+        shards = [Shard(repo, path) for repo, repo_patterns in patterns.items()
+                  for pattern in ([repo_patterns] if isinstance(repo_patterns, str) else repo_patterns)
+                  for path in _expand(pattern)]
+    else:
+        shards = [Shard(_repo_name(path), path) for pattern in patterns for path in _expand(pattern)]
+    missing = [shard.path for shard in shards if not os.path.isfile(shard.path)]
+    if missing:
+        raise FileNotFoundError(f'Missing shards: {", ".join(missing)}')
+    return shards
+
+
+def get_workers(shard_count:int) -> int:
+    """
+    Returns the number of processes mapping the shards (--shard-workers or
+    ENPM611_PROJECT_SHARD_WORKERS, by default one per core).
+    """
+    workers = config.get_parameter('shard_workers') or config.get_parameter('ENPM611_PROJECT_SHARD_WORKERS')
+    return max(1, min(shard_count, int(workers) if workers else os.cpu_count() or 1))
+
+
+def _map_shard(mapper:Callable[[], T], shard:Shard) -> T:
+    """
+    Runs the mapper over a shard in a worker process, which may have
+    mapped another shard before.
+    """
+    config.set_parameter('ENPM611_PROJECT_DATA_PATH', shard.path)
+    data_loader.reset()
+    return mapper()
+
+
+def map_shards(mapper:Callable[[], T], shards:List[Shard], workers:int=None) -> Iterator[Tuple[Shard, T]]:
+    """
+    Runs the mapper in worker processes, once per shard with DataLoader()
+    loading that shard, and yields each shard with the result of the
+    mapper as they complete. The mapper must be a module-level function
+    so that it can be sent to the workers.
+    """
+    workers = workers or get_workers(len(shards))
+    # Workers start with the parameters of this process (see config.install)
+    with ProcessPoolExecutor(max_workers=workers, initializer=config.install,
+                             initargs=(config.get_snapshot(),)) as pool:
+        futures = {pool.submit(_map_shard, mapper, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def map_reduce(mapper:Callable[[], T], reducer:Callable[[T, T], T], shards:List[Shard],
+               workers:int=None) -> Tuple[Dict[str, T], T]:
+    """
+    Runs the mapper over every shard (see map_shards) and merges the
+    partial results with the reducer, by repository and in total.
+    Returns the results by repository and the total (None without shards).
+    """
+    by_repo:Dict[str, T] = {}
+    total:T = None
+    for shard, result in map_shards(mapper, shards, workers):
+        by_repo[shard.repo] = result if shard.repo not in by_repo else reducer(by_repo[shard.repo], result)
+        total = result if total is None else reducer(total, result)
+    return by_repo, total
+
+
+def memoize(name:str, compute:Callable[..., T], reducer:Callable[[T, T], T], **params) -> T:
+    """
+    Returns the result of compute(**params) like memo.memoize. If shards
+    are given with --shards, compute is the mapper over every shard,
+    memoized per shard, and the partial results are merged with the
+    reducer in the order of the shards, so the result does not depend on
+    which shard completes first.
+    """
+    # Shards configured in config.json alone only apply to the report
+    shards = get_shards() if config.get_parameter('shards') else []
+    if not shards:
+        return memo.memoize(name, compute, **params)
+    results = dict(map_shards(functools.partial(memo.memoize, name, compute, **params), shards))
+    return functools.reduce(reducer, (results[shard] for shard in shards))
+
+
+def add_counts(left:Dict[Hashable, int], right:Dict[Hashable, int]) -> Dict[Hashable, int]:
+    """
+    Reducer adding up counts by key (e.g., events per author) of two sets
+    of shards. Keys keep the order in which they first appear.
+    """
+    merged = dict(left)
+    for key, count in right.items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def shard_aggregates() -> Aggregates:
+    """
+    Mapper returning the counts over the issues of a shard (see aggregates.py).
+    """
+    return DataLoader().get_aggregates()
+
+
+def merge_aggregates(left:Aggregates, right:Aggregates) -> Aggregates:
+    """
+    Reducer adding up the counts of two sets of shards.
+    """
+    merged = Aggregates()
+    merged.merge(left)
+    merged.merge(right)
+    return merged
+
+
+def print_report(shards:List[Shard], top_n:int=10):
+    """
+    Prints the issues and events of each repository and in total, and
+    the most active authors across the repositories.
+    """
+    by_repo, total = map_reduce(shard_aggregates, merge_aggregates, shards)
+    if total is None:
+        print('No shards to report on.')
+        return
+    print(f'{len(shards)} shards of {len(by_repo)} repositories')
+    print(f"{'Repository':<30} | {'Issues':>8} | {'Open':>8} | {'Closed':>8} | {'Events':>9} | {'Authors':>8}")
+    print('-' * 86)
+    for repo, aggregates in sorted(by_repo.items()) + [('Total', total)]:
+        if repo == 'Total':
+            print('-' * 86)
+        states = aggregates.issues_per_state
+        print(f"{repo:<30} | {sum(states.values()):>8} | {states['open']:>8} | {states['closed']:>8} | "
+              f"{sum(aggregates.events_per_event_type.values()):>9} | {len(aggregates.events_per_author):>8}")
+
+    print(f'\nTop {top_n} authors of events across repositories:')
+    for author, count in total.events_per_author.most_common(top_n):
+        repos = [repo for repo, aggregates in sorted(by_repo.items()) if author in aggregates.events_per_author]
+        print(f'{author:<30} | {count:>8} | {", ".join(repos)}')
@@ -0,0 +1,175 @@
+"""
+Stores the frames of the dataset (see frames.py) in a compact binary file
+next to the data file (<data file>.store) that is opened with a memory
+map instead of being read. Opening it costs the same regardless of the
+size of the dataset, the columns are only paged in as analyses touch
+them, and every process opening it (features run with --parallel, the
+workers of the query server, ...) shares the same pages of the OS cache
+instead of holding its own copy.
+
+Columns are stored with a fixed width: issue numbers, positions and
+counts as integers, timestamps as integers in their pandas unit (UTC),
+and authors, event types, labels, creators and states as dictionary
+codes, their distinct values being stored in the header. The frames
+are rebuilt from the mapped columns without copying them, so they are
+read-only.
+
+The file starts with a magic number and the length of a JSON header
+describing the columns and recording the version of the dataset (see
+DataLoader.get_version) they were built from, so the store is rebuilt
+after the data file changes or a delta is merged.
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+_STORE_SUFFIX:str = '.store'
+
+_MAGIC:bytes = b'ENPM611S'
+
+# Bump whenever the layout of the file changes
+_STORE_VERSION:int = 1
+
+# Columns start at multiples of this many bytes
+_ALIGNMENT:int = 64
+
+_FRAMES:List[str] = ['issues', 'events', 'labels']
+
+
+def get_store_path(data_path:str) -> str:
+    """
+    Returns the location of the store for the given data file.
+    """
+    return data_path + _STORE_SUFFIX
+
+
+def _aligned(size:int) -> int:
+    """
+    Rounds size up to a multiple of the alignment.
+    """
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _describe(series:pd.Series) -> Dict[str, any]:
+    """
+    Describes how a column is stored, without its offset.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        return {'kind': 'category', 'dtype': str(series.cat.codes.dtype),
+                'categories': categories.tolist(), 'categories_dtype': str(categories.dtype)}
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        return {'kind': 'date', 'dtype': 'int64', 'unit': series.dtype.unit}
+    return {'kind': 'plain', 'dtype': str(series.dtype)}
+
+
+def _values(series:pd.Series) -> np.ndarray:
+    """
+    Returns the fixed-width values stored for a column.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        # Missing dates are stored as NaT, the smallest int64
+        return series.dt.tz_localize(None).to_numpy().view(np.int64)
+    return series.to_numpy()
+
+
+def save_frames(path:str, frames:Dict[str, pd.DataFrame], version:str):
+    """
+    Writes the frames to path, recording the version of the dataset.
+    Failing to write them is logged but otherwise ignored.
+    """
+    header = {'store_version': _STORE_VERSION, 'dataset_version': version, 'frames': {}}
+    columns:List[np.ndarray] = []
+    offset = 0
+    for name in _FRAMES:
+        frame = frames[name]
+        described = []
+        for column in frame.columns:
+            values = np.ascontiguousarray(_values(frame[column]))
+            described.append(dict(_describe(frame[column]), name=column, offset=offset))
+            columns.append(values)
+            offset += _aligned(values.nbytes)
+        header['frames'][name] = {'length': len(frame), 'columns': described}
+
+    encoded = json.dumps(header).encode('utf-8')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as fout:
+            fout.write(_MAGIC + struct.pack('<Q', len(encoded)) + encoded)
+            # Columns are aligned relative to the file as well as to each other
+            for values in columns:
+                fout.write(b'\0' * (-fout.tell() % _ALIGNMENT))
+                fout.write(values.tobytes())
+        # Replace atomically so that concurrent runs never map a partial file
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f'Could not write store {path}: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_header(path:str) -> Tuple[Dict[str, any], int]:
+    """
+    Returns the header of the store and the position of its first column.
+    """
+    with open(path, 'rb') as fin:
+        if fin.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError('not a store file')
+        length, = struct.unpack('<Q', fin.read(8))
+        header = json.loads(fin.read(length).decode('utf-8'))
+    return header, _aligned(len(_MAGIC) + 8 + length)
+
+
+def _column(data:np.ndarray, length:int, column:Dict[str, any]) -> any:
+    """
+    Wraps the mapped values of a column into a pandas array without
+    copying them.
+    """
+    dtype = np.dtype(column['dtype'])
+    values = data[column['offset']:column['offset'] + length * dtype.itemsize].view(dtype)
+    if column['kind'] == 'category':
+        categories = pd.Index(column['categories'], dtype=column['categories_dtype'])
+        return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+    if column['kind'] == 'date':
+        dates = values.view(f"M8[{column['unit']}]")
+        dtype = pd.DatetimeTZDtype(column['unit'], 'UTC')
+        try:
+            # Unlike the public constructors, this does not copy the values to attach the timezone
+            return pd.arrays.DatetimeArray._simple_new(dates, dtype=dtype)
+        except AttributeError:
+            return pd.array(dates).tz_localize('UTC')
+    return values
+
+
+def open_frames(path:str, version:str) -> Dict[str, pd.DataFrame]:
+    """
+    Maps the frames stored at path, or returns None if there is no store
+    or it was built from another version of the dataset.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        header, data_start = _read_header(path)
+        if header['store_version'] != _STORE_VERSION or header['dataset_version'] != version:
+            logger.info(f'Store {path} is stale')
+            return None
+        data = np.memmap(path, dtype=np.uint8, mode='r')[data_start:]
+        frames = {}
+        for name in _FRAMES:
+            frame = header['frames'][name]
+            frames[name] = pd.DataFrame({column['name']: _column(data, frame['length'], column)
+                                         for column in frame['columns']}, copy=False)
+        return frames
+    except Exception as e:
+        logger.warning(f'Ignoring unreadable store {path}: {e}')
+        return None
@@ -0,0 +1,166 @@
+"""
+Generates synthetic issue dumps with the same schema as the data files
+produced by the GitHub scraper (e.g., poetry_small.json) so that loading
+and the analyses can be benchmarked at sizes beyond the shipped data.
+
+The output only depends on the number of issues and the seed. Authors
+follow a Zipf distribution (a few very active maintainers, a long tail of
+one-time reporters), labels and event types are drawn with frequencies
+resembling those of real issue trackers, and event dates increase within
+each issue. It can be invoked from the command line, e.g.:
+
+    python synthetic.py --issues 50000 --output synthetic_50000.json
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Sequence, Tuple
+
+# Labels and their relative frequency on issues
+LABELS:List[Tuple[str, float]] = [
+    ('Needs Triage', 30), ('Bug', 25), ('Enhancement', 12), ('Documentation', 8),
+    ('New Feature', 6), ('Question', 5), ('API', 4), ('Performance', 3),
+    ('Regression', 2), ('Easy', 2), ('good first issue', 2), ('help wanted', 2),
+    ('module:metrics', 2), ('module:linear_model', 2), ('module:tree', 1),
+    ('module:preprocessing', 1), ('module:ensemble', 1), ('Build / CI', 1),
+    ('Hard', 0.5), ('Security', 0.2),
+]
+
+# Event types (besides the labeling when an issue is opened and the final
+# closing) and their relative frequency
+EVENT_TYPES:List[Tuple[str, float]] = [
+    ('commented', 45), ('mentioned', 10), ('subscribed', 10), ('cross-referenced', 9),
+    ('referenced', 5), ('labeled', 6), ('unlabeled', 3), ('assigned', 4),
+    ('unassigned', 1), ('renamed', 2), ('milestoned', 1), ('reopened', 1),
+]
+
+# Bots that label new issues and comment on them
+BOTS:List[str] = ['github-actions[bot]', 'scikit-learn-bot']
+
+# Exponent of the Zipf distribution of activity among authors
+_ZIPF_EXPONENT:float = 1.1
+
+_WORDS:List[str] = (
+    'the a to of and in is it that for with on this not be when error fit model data '
+    'estimator array value warning test build install version python numpy pandas '
+    'should would expected actual result raise return shape input output parameter '
+    'default behavior docs example fix pull request release bug feature support '
+    'memory slow fast performance regression windows linux macos'
+).split()
+
+_START:datetime = datetime(2019, 1, 1, tzinfo=timezone.utc)
+_SPAN:timedelta = timedelta(days=6 * 365)
+
+
+def _cumulative(weights:Sequence[float]) -> List[float]:
+    total, result = 0.0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def _sentence(rng:random.Random, min_words:int, max_words:int) -> str:
+    return ' '.join(rng.choices(_WORDS, k=rng.randint(min_words, max_words))).capitalize()
+
+
+def _format_date(date:datetime) -> str:
+    return date.isoformat(timespec='seconds')
+
+
+def generate_issues(count:int, seed:int=0, repo:str='scikit-learn/scikit-learn') -> Iterator[dict]:
+    """
+    Generates count issues in the JSON format of the data files,
+    newest first like the scraper writes them.
+    """
+    rng = random.Random(seed)
+    # Larger trackers have more distinct people involved
+    authors = [f'user{i}' for i in range(max(20, count // 3))]
+    author_weights = _cumulative([1 / (rank + 1) ** _ZIPF_EXPONENT for rank in range(len(authors))])
+    label_names = [label for label, _ in LABELS]
+    label_weights = _cumulative([weight for _, weight in LABELS])
+    event_types = [event_type for event_type, _ in EVENT_TYPES]
+    event_weights = _cumulative([weight for _, weight in EVENT_TYPES])
+
+    def author() -> str:
+        return rng.choices(authors, cum_weights=author_weights)[0]
+
+    for i in range(count):
+        number = count - i
+        created = _START + _SPAN * (number / count) - timedelta(seconds=rng.randint(0, 3600))
+        creator = author()
+        labels = sorted(set(rng.choices(label_names, cum_weights=label_weights, k=rng.choice([1, 1, 2, 2, 3]))))
+
+        # Labels applied when the issue is opened
+        date = created + timedelta(seconds=rng.randint(0, 15))
+        labeler = rng.choice([creator, BOTS[0]])
+        events = [{'event_type': 'labeled', 'author': labeler, 'event_date': _format_date(date), 'label': label}
+                  for label in labels]
+
+        # Activity with gaps between events of a few hours to a few weeks
+        for _ in range(int(rng.expovariate(1 / 5))):
+            date += timedelta(seconds=int(rng.expovariate(1 / (3 * 24 * 3600))) + 1)
+            event_type = rng.choices(event_types, cum_weights=event_weights)[0]
+            event = {'event_type': event_type, 'author': rng.choice([creator, author(), author()]),
+                     'event_date': _format_date(date)}
+            if event_type == 'commented':
+                event['comment'] = '. '.join(_sentence(rng, 4, 16) for _ in range(rng.randint(1, 6))) + '.'
+            elif event_type in ('labeled', 'unlabeled'):
+                event['label'] = rng.choices(label_names, cum_weights=label_weights)[0]
+            events.append(event)
+
+        state = 'closed' if rng.random() < 0.7 else 'open'
+        if state == 'closed':
+            date += timedelta(seconds=int(rng.expovariate(1 / (14 * 24 * 3600))) + 1)
+            events.append({'event_type': 'closed', 'author': rng.choice([creator, author()]),
+                           'event_date': _format_date(date)})
+
+        yield {
+            'url': f'https://github.com/{repo}/issues/{number}',
+            'creator': creator,
+            'labels': labels,
+            'state': state,
+            'assignees': [event['author'] for event in events if event['event_type'] == 'assigned'][:1],
+            'title': _sentence(rng, 4, 12),
+            'text': '\r\n\r\n'.join(_sentence(rng, 10, 40) for _ in range(rng.randint(1, 8))),
+            'number': number,
+            'created_date': _format_date(created),
+            'updated_date': _format_date(date),
+            'timeline_url': f'https://api.github.com/repos/{repo}/issues/{number}/timeline',
+            'events': events,
+        }
+
+
+def write_dump(path:str, count:int, seed:int=0):
+    """
+    Writes a synthetic data file with count issues. The issues are written
+    one at a time so arbitrarily large files can be generated.
+    """
+    with open(path, 'w') as fout:
+        fout.write('[')
+        for i, issue in enumerate(generate_issues(count, seed)):
+            fout.write(',\n' if i > 0 else '\n')
+            fout.write(json.dumps(issue))
+        fout.write('\n]\n')
+
+
+def parse_args():
+    """
+    Parses the command line arguments describing the data file to generate.
+    """
+    ap = argparse.ArgumentParser("synthetic.py")
+    ap.add_argument('--issues', '-n', type=int, required=True,
+                    help='Number of issues to generate')
+    ap.add_argument('--output', '-o', type=str, required=True,
+                    help='Path of the data file to write')
+    ap.add_argument('--seed', type=int, default=0,
+                    help='Seed of the random generator')
+    return ap.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    write_dump(args.output, args.issues, args.seed)
+    print(f'Wrote {args.issues} issues to {args.output}')
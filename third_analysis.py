@@ -1,12 +1,19 @@
-from typing import List
+from datetime import datetime
+from typing import Dict
+
 import matplotlib.pyplot as plt
 import pandas as pd
 import config
 from data_loader import DataLoader
-from model import Issue, Event
-from collections import Counter
+import memo
+import output
+import predicates
+import resolution
 import numpy as np
 
+# Events whose timing is related to the resolution time, and their columns
+IMPACT_EVENTS:Dict[str, str] = {'labeled': 'labeled_time', 'assigned': 'assigned_time'}
+
 class ThirdFeatureAnalysis:
     """
     Implements an analysis of GitHub issues that outputs the result of that analysis.
@@ -16,10 +23,13 @@ class ThirdFeatureAnalysis:
         """
         Constructor
         """
-        # Initialize configuration and data loader
+        # Initialize configuration
         config._init_config()
-        self.issues: List[Issue] = DataLoader().get_issues()
-        # self.output_path = "/Users/wangyu/Desktop/ENPM611_group_project/enpm611_team1_project-application-template" 
+        # Parameter is passed in via command line (--label)
+        self.LABEL:str = config.get_parameter('label')
+        # Parameters are passed in via command line (--since, --until)
+        self.SINCE:datetime = predicates.get_date_parameter('since')
+        self.UNTIL:datetime = predicates.get_date_parameter('until')
 
     def run(self):
         """
@@ -31,52 +41,18 @@ class ThirdFeatureAnalysis:
         """
         Analyzes how specific events impact the time taken to resolve issues, providing insights into what actions are most effective.
         """
-        event_impact_data = []
-
-        for issue in self.issues:
-            if issue.state in ['closed', 'open']:  # Considering both closed and open issues
-                # Extract the event types and their timestamps
-                event_types = [event.event_type for event in issue.events if event.event_type]
-                event_dates = [event.event_date for event in issue.events if event.event_date]
-                
-                # Ensure event_types and event_dates have the same length
-                if len(event_types) != len(event_dates):
-                    continue
-                
-                if issue.created_date:
-                    resolution_time = (issue.updated_date - issue.created_date).days if issue.updated_date else None
-                    
-                    # Check if certain key events like 'labeled' or 'assigned' occurred early or late in the process
-                    labeled_time = None
-                    assigned_time = None
-                    for i, event in enumerate(event_types):
-                        if event == 'labeled' and labeled_time is None:
-                            labeled_time = (event_dates[i] - issue.created_date).days
-                        elif event == 'assigned' and assigned_time is None:
-                            assigned_time = (event_dates[i] - issue.created_date).days
-                    
-                    event_impact_data.append({
-                        'resolution_time': resolution_time if resolution_time is not None else float('nan'),
-                        'labeled_time': labeled_time if labeled_time is not None else float('nan'),
-                        'assigned_time': assigned_time if assigned_time is not None else float('nan')
-                    })
-        
-        # Convert to DataFrame for analysis
-        event_impact_df = pd.DataFrame(event_impact_data)
+        event_impact_df = memo.memoize('third_analysis', event_impact, label=self.LABEL, since=self.SINCE,
+                                        until=self.UNTIL)
         
         # Ensure columns exist before attempting to drop NaNs
         if 'labeled_time' in event_impact_df.columns:
             labeled_df = event_impact_df.dropna(subset=['labeled_time'])
             if not labeled_df.empty:
                 # Plot the impact of 'labeled' time on resolution time
-                plt.figure(figsize=(12, 6))
-                plt.scatter(labeled_df['labeled_time'], labeled_df['resolution_time'], color='orange', alpha=0.6)
-                plt.title('Impact of Labeling Time on Issue Resolution Time')
-                plt.xlabel('Days Since Creation to Labeling')
-                plt.ylabel('Resolution Time (Days)')
-                plt.tight_layout()
-                # plt.savefig(f"{self.output_path}/impact_of_labeling_time.png")
-                plt.show()
+                output.render('impact_of_labeling_time', plot_event_impact,
+                              labeled_df['labeled_time'].tolist(), labeled_df['resolution_time'].tolist(),
+                              'orange', 'Impact of Labeling Time on Issue Resolution Time',
+                              'Days Since Creation to Labeling')
             else:
                 print("No labeled events available for plotting.")
         else:
@@ -86,18 +62,64 @@ class ThirdFeatureAnalysis:
             assigned_df = event_impact_df.dropna(subset=['assigned_time'])
             if not assigned_df.empty:
                 # Plot the impact of 'assigned' time on resolution time
-                plt.figure(figsize=(12, 6))
-                plt.scatter(assigned_df['assigned_time'], assigned_df['resolution_time'], color='green', alpha=0.6)
-                plt.title('Impact of Assignment Time on Issue Resolution Time')
-                plt.xlabel('Days Since Creation to Assignment')
-                plt.ylabel('Resolution Time (Days)')
-                plt.tight_layout()
-                # plt.savefig(f"{self.output_path}/impact_of_assignment_time.png")
-                plt.show()
+                output.render('impact_of_assignment_time', plot_event_impact,
+                              assigned_df['assigned_time'].tolist(), assigned_df['resolution_time'].tolist(),
+                              'green', 'Impact of Assignment Time on Issue Resolution Time',
+                              'Days Since Creation to Assignment')
             else:
                 print("No assigned events available for plotting.")
         else:
             print("No assigned events found in the data.")
+        
+        print_event_impact_summary(event_impact_df)
+
+
+def event_impact(label:str=None, since:datetime=None, until:datetime=None) -> pd.DataFrame:
+    """
+    Returns the resolution time of each issue with the label created in
+    [since, until) and the days from its creation to its first labeling
+    and assignment.
+    """
+    where = predicates.IssuePredicate(label=label, created_since=since, created_until=until)
+    index = DataLoader().get_index(where)
+    all_issues_df: pd.DataFrame = index.issues(label=label, since=since, until=until)
+    all_events_df: pd.DataFrame = index.events(label=label, since=since, until=until)
+
+    # Considering both closed and open issues, and when the first
+    # 'labeled' and 'assigned' events occurred after their creation
+    issues_df = all_issues_df[all_issues_df['state'].isin(['closed', 'open'])]
+    event_impact_df = resolution.time_to_first_event(issues_df, all_events_df, list(IMPACT_EVENTS))
+    return event_impact_df.rename(columns=IMPACT_EVENTS)
+
+
+def print_event_impact_summary(event_impact_df:pd.DataFrame):
+    """
+    Prints the percentiles of the resolution time and of the time to each
+    event, and how the resolution time changes with the time to each event.
+    """
+    print('\nDays since creation (percentiles):')
+    print(resolution.percentiles(event_impact_df).round(1).to_string())
+    for column in IMPACT_EVENTS.values():
+        # Nothing to relate if all issues reached the event after the same time
+        if event_impact_df[column].nunique() < 2:
+            continue
+        stats = resolution.correlation(event_impact_df[column], event_impact_df[resolution.RESOLUTION_TIME])
+        print(f"\nResolution time by {column} ({stats['count']} issues, "
+              f"Pearson {stats['pearson']:.2f}, Spearman {stats['spearman']:.2f}):")
+        binned = resolution.binned_correlation(event_impact_df[column], event_impact_df[resolution.RESOLUTION_TIME])
+        print(binned.round(1).to_string(index=False))
+
+
+def plot_event_impact(event_times, resolution_times, color, title, xlabel):
+    """
+    Creates a scatter plot of the time until an event against the resolution time.
+    """
+    plt.figure(figsize=(12, 6))
+    plt.scatter(event_times, resolution_times, color=color, alpha=0.6)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel('Resolution Time (Days)')
+    plt.tight_layout()
 
 if __name__ == "__main__":
     # Invoke run method when running this module directly
@@ -0,0 +1,158 @@
+"""
+Aggregates the issues and events over time, by day, week, month or year.
+The dataset is scanned once to build daily counts of the issues created
+and closed and of the events of each type. Coarser granularities
+are rolled up from finer ones (weeks and months from days, years from
+months) and kept, so switching granularities does not rescan the frames.
+
+An issue counts as closed on the day of its last 'closed' event if it is
+closed now (at its last update if that event is missing), and the open
+backlog at the end of each bucket is the number of issues created so far
+minus those closed so far. Issues that were reopened are only counted as
+closed once, so the backlog never drops below zero.
+
+Buckets are pandas Periods in UTC (weeks start on Monday), and buckets
+without any activity between the first and last active ones are kept
+with zero counts so that the series can be plotted directly.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DataLoader
+from predicates import IssuePredicate
+
+# Granularities and their pandas period frequency
+FREQUENCIES:Dict[str, str] = {'day': 'D', 'week': 'W-SUN', 'month': 'M', 'year': 'Y'}
+
+# Granularity each granularity is rolled up from
+_ROLLUP_SOURCES:Dict[str, str] = {'week': 'day', 'month': 'day', 'year': 'month'}
+
+# Counts per bucket besides the events by type
+METRICS:List[str] = ['created', 'closed', 'backlog']
+
+_DAY_NS:int = 24 * 3600 * 10**9
+
+
+def _days(dates:pd.Series) -> np.ndarray:
+    """
+    Returns the days since the epoch (UTC) of the dates, which must not
+    be missing.
+    """
+    return dates.to_numpy(dtype='datetime64[ns]').view(np.int64) // _DAY_NS
+
+
+class TimeSeries:
+    """
+    Counts of issues and events per bucket of time, rolled up on demand.
+    """
+
+    def __init__(self, created_days:np.ndarray, closed_days:np.ndarray, event_days:np.ndarray,
+                 event_type_codes:np.ndarray, event_types:List[str]):
+        """
+        Constructor. Builds the daily counts from the days (since the epoch)
+        on which issues were created and closed and on which events
+        occurred, and the position of each event's type in event_types
+        (which every event must have).
+        """
+        all_days = np.concatenate([created_days, closed_days, event_days])
+        first_day = int(all_days.min()) if len(all_days) else 0
+        day_count = int(all_days.max()) - first_day + 1 if len(all_days) else 0
+        index = pd.PeriodIndex.from_ordinals(np.arange(first_day, first_day + day_count), freq='D')
+        self._counts:Dict[str, pd.DataFrame] = {
+            'day': pd.DataFrame({
+                'created': np.bincount(created_days - first_day, minlength=day_count),
+                'closed': np.bincount(closed_days - first_day, minlength=day_count),
+            }, index=index),
+        }
+
+        # Events of each type per day, counted in one pass with a dense (day, type) key
+        keys = (event_days - first_day) * len(event_types) + event_type_codes
+        event_counts = np.bincount(keys, minlength=day_count * len(event_types))
+        self.event_types:List[str] = list(event_types)
+        self._events:Dict[str, pd.DataFrame] = {
+            'day': pd.DataFrame(event_counts.reshape(day_count, len(event_types)),
+                                index=index, columns=self.event_types),
+        }
+
+    @classmethod
+    def from_frames(cls, issues_df:pd.DataFrame, events_df:pd.DataFrame) -> 'TimeSeries':
+        """
+        Builds the series of the issues of issues_df (a selection of the
+        rows of the issues frame) and of their events among events_df,
+        skipping undated issues and events as well as events without a
+        type.
+        """
+        issues_df = issues_df[issues_df['created_date'].notna()]
+        # Only count the events of the selected issues (events without a type have no column)
+        in_selection = issues_df.index.get_indexer(events_df['issue_index'].to_numpy()) >= 0
+        events_df = events_df[in_selection & events_df['event_date'].notna().to_numpy()
+                              & events_df['event_type'].notna().to_numpy()]
+
+        # Closed issues were closed by their last 'closed' event, or at their
+        # last update if the event is missing
+        closed_issues = issues_df[(issues_df['state'] == 'closed').to_numpy()]
+        closed_events = events_df[(events_df['event_type'] == 'closed').to_numpy()]
+        last_closed = closed_events.groupby('issue_index')['event_date'].max()
+        closed_dates = last_closed.reindex(closed_issues.index).fillna(closed_issues['updated_date']).dropna()
+
+        return cls(_days(issues_df['created_date']), _days(closed_dates), _days(events_df['event_date']),
+                   events_df['event_type'].cat.codes.to_numpy().astype(np.int64),
+                   list(events_df['event_type'].cat.categories))
+
+    def _rollup(self, table:Dict[str, pd.DataFrame], granularity:str) -> pd.DataFrame:
+        """
+        Returns the counts of the table at the granularity, summing those
+        of the granularity it is rolled up from.
+        """
+        if granularity not in FREQUENCIES:
+            raise ValueError(f'Unknown granularity {granularity!r}, expected one of {", ".join(FREQUENCIES)}')
+        if granularity not in table:
+            finer = self._rollup(table, _ROLLUP_SOURCES[granularity])
+            table[granularity] = finer.groupby(finer.index.asfreq(FREQUENCIES[granularity], how='start')).sum()
+        return table[granularity]
+
+    def counts(self, granularity:str='day') -> pd.DataFrame:
+        """
+        Returns the number of issues created and closed in each bucket,
+        and the open backlog at the end of each bucket.
+        """
+        counts = self._rollup(self._counts, granularity).copy()
+        counts['backlog'] = (counts['created'] - counts['closed']).cumsum()
+        return counts[METRICS]
+
+    def events(self, granularity:str='day') -> pd.DataFrame:
+        """
+        Returns the number of events of each type (columns) in each bucket.
+        """
+        return self._rollup(self._events, granularity).copy()
+
+
+def merge_counts(left:pd.DataFrame, right:pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds up the counts of two series at the same granularity (see
+    TimeSeries.counts), e.g., of two shards of the dataset, keeping the
+    buckets between the first and last active ones and recomputing the
+    open backlog at the end of each bucket.
+    """
+    if left.empty or right.empty:
+        return right if left.empty else left
+    buckets = pd.period_range(min(left.index[0], right.index[0]), max(left.index[-1], right.index[-1]))
+    merged = (left[['created', 'closed']].reindex(buckets, fill_value=0)
+              + right[['created', 'closed']].reindex(buckets, fill_value=0))
+    merged['backlog'] = (merged['created'] - merged['closed']).cumsum()
+    return merged[METRICS]
+
+
+def build(user:str=None, label:str=None, since:datetime=None, until:datetime=None) -> TimeSeries:
+    """
+    Builds the series of the issues created by the user with the label
+    in [since, until), and of their events.
+    """
+    index = DataLoader().get_index(IssuePredicate(creator=user, label=label, created_since=since,
+                                                  created_until=until))
+    return TimeSeries.from_frames(index.issues(creator=user, label=label, since=since, until=until),
+                                  index.events(label=label, since=since, until=until))
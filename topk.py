@@ -0,0 +1,172 @@
+"""
+Finds the most frequent items of a stream (e.g., the most active authors)
+in bounded memory with the Space-Saving algorithm (Metwally et al., 2005).
+The summary keeps at most capacity counters. When a new item arrives while
+all counters are taken, the item with the smallest count is replaced and
+the new item inherits its count as its possible overestimation. Hence:
+
+- the estimated count of each tracked item is at most its error above its
+  true count, and no error exceeds total / capacity;
+- every item occurring more than total / capacity times is tracked.
+
+An item is guaranteed to be among the true top k when its lower bound
+(count - error) is at least the estimate of the (k+1)-th item, since no
+untracked item can occur more often than that.
+
+Features 1 and 2 count authors this way in one streaming pass over the
+issues (DataLoader().iter_matching_issues) when a capacity is configured
+(--approximate or ENPM611_PROJECT_TOPK_CAPACITY), without loading the
+dataset or building its frames. Their exact counts remain the default and
+the reference to validate the estimates against (see `benchmark.py topk`).
+"""
+
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, List, NamedTuple
+
+import config
+from data_loader import DataLoader
+
+
+class HeavyHitter(NamedTuple):
+    """
+    An item of the top k, with its estimated count and error bound.
+    """
+    item: Hashable
+    # Estimated count, at least the true count
+    count: int
+    # Maximum overestimation, the true count is in [count - error, count]
+    error: int
+    # Whether the item is certainly among the true top k
+    guaranteed: bool
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the frequencies of the items of a stream.
+    """
+
+    def __init__(self, capacity:int):
+        """
+        Constructor. capacity is the maximum number of items tracked.
+        """
+        if capacity < 1:
+            raise ValueError(f'The capacity must be at least 1, got {capacity}')
+        self.capacity:int = capacity
+        # Number of items added
+        self.total:int = 0
+        # Estimated count and error of each tracked item
+        self._counts:Dict[Hashable, int] = {}
+        self._errors:Dict[Hashable, int] = {}
+        # Tracked items by estimated count, to find the one to replace
+        self._buckets:Dict[int, Dict[Hashable, None]] = {}
+        self._min_count:int = 0
+        # Number of tracked items replaced by new ones
+        self.evictions:int = 0
+
+    def add(self, item:Hashable, count:int=1):
+        """
+        Adds count occurrences of the item.
+        """
+        self.total += count
+        if item in self._counts:
+            old_count = self._counts[item]
+            self._unbucket(item, old_count)
+        elif len(self._counts) < self.capacity:
+            old_count = 0
+            self._errors[item] = 0
+        else:
+            # Replace the (oldest) item with the smallest count
+            old_count = self._min_count
+            evicted = next(iter(self._buckets[old_count]))
+            self._unbucket(evicted, old_count)
+            del self._counts[evicted], self._errors[evicted]
+            self._errors[item] = old_count
+            self.evictions += 1
+        new_count = old_count + count
+        self._counts[item] = new_count
+        self._buckets.setdefault(new_count, {})[item] = None
+        if len(self._counts) == 1 or new_count < self._min_count:
+            self._min_count = new_count
+        elif old_count == self._min_count and old_count not in self._buckets:
+            # No count lies between the old and the new one for single occurrences
+            self._min_count = new_count if count == 1 else min(self._buckets)
+
+    def _unbucket(self, item:Hashable, count:int):
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+
+    def update(self, items:Iterable[Hashable]):
+        """
+        Adds one occurrence of each item.
+        """
+        for item in items:
+            self.add(item)
+
+    @property
+    def max_error(self) -> int:
+        """
+        Bound on the overestimation of any count: zero as long as no item
+        was replaced, and at most total / capacity.
+        """
+        return self._min_count if self.evictions else 0
+
+    def estimate(self, item:Hashable) -> int:
+        """
+        Returns the estimated count of the item (an upper bound), which is
+        max_error for items that are not tracked.
+        """
+        return self._counts.get(item, self.max_error)
+
+    def counts(self) -> Dict[Hashable, int]:
+        """
+        Returns the estimated counts of all tracked items.
+        """
+        return dict(self._counts)
+
+    def top(self, k:int) -> List[HeavyHitter]:
+        """
+        Returns the k items with the largest estimated counts, largest first.
+        """
+        ranked = sorted(self._counts.items(), key=lambda item_count: item_count[1], reverse=True)
+        # No item outside the top k can occur more often than this
+        threshold = ranked[k][1] if len(ranked) > k else self.max_error
+        return [HeavyHitter(item, count, self._errors[item], count - self._errors[item] >= threshold)
+                for item, count in ranked[:k]]
+
+
+def exact_top(counts:Dict[Hashable, int], k:int) -> List[HeavyHitter]:
+    """
+    Returns the k items with the largest exact counts in the same form
+    as SpaceSaving.top().
+    """
+    ranked = sorted(counts.items(), key=lambda item_count: item_count[1], reverse=True)[:k]
+    return [HeavyHitter(item, count, 0, True) for item, count in ranked]
+
+
+def get_capacity() -> int:
+    """
+    Returns the number of counters for approximate counting, or None if
+    counts are exact.
+    """
+    capacity = config.get_parameter('approximate')
+    if capacity is None:
+        capacity = config.get_parameter('ENPM611_PROJECT_TOPK_CAPACITY')
+    return None if capacity is None else int(capacity)
+
+
+def event_authors(capacity:int, event_type:str=None, label:str=None, since:datetime=None,
+                  until:datetime=None) -> SpaceSaving:
+    """
+    Counts the authors of the events (of the event type) on the issues with
+    the label created in [since, until) in one streaming pass, tracking at
+    most capacity authors.
+    """
+    summary = SpaceSaving(capacity)
+    for issue in DataLoader().iter_matching_issues(label=label, since=since, until=until,
+                                                    fields=['events']):
+        for event in issue.events:
+            if event.author is not None and (event_type is None or event.event_type == event_type):
+                summary.add(event.author)
+    return summary